@@ -1,9 +1,19 @@
+import argparse
+import os
+import sys
+import time
+
 import app_functions as af
+import contact_validator as cv
+import metrics as mt
+import snapshot as ss
 from contact import Contact
 
 # define global list of approved commands, displayed before asking for 
 # the user input
-command_list = ["LIST","ADD","EDIT","DELETE","IMPORT","EXPORT","HELP","DONE"]
+command_list = ["LIST","SEARCH","ADD","EDIT","DELETE","IMPORT","EXPORT",
+    "SAVE","LOAD","COMPACT","DEDUPE","DIFF","REPORT","WATCH",
+    "STATS","HELP","DONE"]
 
 def welcome_screen():
     '''
@@ -37,58 +47,222 @@ def get_user_input():
     return input("Command: ").upper()
   
 
-def start_app():
+def load_startup_contacts(database:str=None, shared:bool=False):
+    '''
+    Load the contact list used when the application starts. If a database
+    file is provided, the contacts are kept in that SQLite database, and
+    the default test file is imported into it when it is empty. Otherwise 
+    the change journal's base file is loaded and its changes replayed. 
+    Without a journal, a saved snapshot starts almost instantly and keeps
+    its IDs, otherwise the default test file is imported. A shared 
+    database can be used by more than one thread. An empty database name
+    opens the default database file.
+    '''
+    default_filepath = "test.txt"
+    if database is not None:
+        # sqlite3 is only imported when a database is used
+        import sqlite_store as sq
+        database = database or sq.DATABASE_FILE
+        print("LOG: Opening database: '{}' ...".format(database))
+        contact_list = sq.SqliteContactStore(database, shared)
+        if len(contact_list) == 0:
+            print("LOG: Loading default test file: '{}' ...".format(
+                default_filepath))
+            af.import_csv_file(default_filepath, contact_list)
+        return contact_list
+
+    if os.path.isfile(ss.SNAPSHOT_FILE):
+        default_filepath = ss.SNAPSHOT_FILE
+    return af.open_journal(default_filepath)
+
+def start_batch(filepath:str, database:str=None):
+    '''
+    Apply the ADD, EDIT and DELETE operations in a batch file to the 
+    contact list without any prompts, then print a summary. The result of
+    every line is written to a csv report next to the batch file.
+    '''
+    # the batch module is only imported when it is used
+    import batch
+
+    contact_list = load_startup_contacts(database)
+    report_filepath = batch.report_path(filepath)
+    with mt.METRICS.measure("BATCH"):
+        counts = batch.run_batch(contact_list, filepath, report_filepath)
+    if contact_list.journal is not None:
+        contact_list.journal.close()
+    if contact_list.persistent:
+        contact_list.close()
+    print("LOG: Batch complete: {} applied, {} failed, {} skipped.".format(
+        counts["applied"], counts["failed"], counts["skipped"]))
+    print("LOG: Results written to: {}".format(report_filepath))
+
+def start_server(host:str=None, port:int=None, database:str=None):
+    '''
+    Serve the contact list to local clients over a JSON API until Ctrl+C
+    is pressed, then make sure every change is on disk. The server's 
+    default host and port are used if they are not provided.
+    '''
+    # the server module is only imported when it is used
+    import server
+
+    contact_list = load_startup_contacts(database, shared=True)
+    server.serve(contact_list, host if host is not None else 
+        server.SERVER_HOST, port if port is not None else server.SERVER_PORT)
+    if contact_list.journal is not None:
+        contact_list.journal.close()
+    if contact_list.persistent:
+        contact_list.close()
+
+def start_background_load() -> object:
+    '''
+    Start loading the startup contacts on a background thread and return a
+    Future for the contact list, so the first prompt is shown immediately.
+    A database is never loaded in the background, since its connection 
+    can only be used by the thread which opened it.
+    '''
+    # thread pools are only imported when they are used, which keeps the
+    # application's start up fast
+    from concurrent.futures import ThreadPoolExecutor
+
+    executor = ThreadPoolExecutor(max_workers=1)
+    start = time.perf_counter()
+    future = executor.submit(load_startup_contacts)
+    future.add_done_callback(lambda done: mt.METRICS.set_gauge(
+        "startup_load_seconds", round(time.perf_counter() - start, 3)))
+    # the thread ends on its own once the contacts are loaded
+    executor.shutdown(wait=False)
+    return future
+
+def wait_for_contacts(future:object) -> object:
+    '''
+    Return the contact list loaded by start_background_load, waiting for
+    the load to finish if needed. If the load failed, the application 
+    continues with an empty contact list.
+    '''
+    if not future.done():
+        print("LOG: Waiting for the contacts to finish loading ...")
+    try:
+        return future.result()
+    except Exception:
+        print("ERROR: Unable to load the contacts, starting with an empty "
+            "list.")
+        return af.ContactStore()
+
+def start_app(profile_command:str=None, database:str=None,
+    fast_start:bool=False):
     '''
     Initiates app, shows welcome text, imports default data, and invokes 
     method to get user input, relevant function called based on user input.
+    Every command is timed for the 'STATS' command, and each run of 
+    profile_command is profiled with cProfile. If a database file is 
+    provided, the contacts are kept in that SQLite database instead of in
+    memory. With fast_start, the contacts are loaded on a background 
+    thread and the first prompt is shown at once. Commands which use the
+    contacts wait for the load only if it has not finished. A database 
+    is always opened before the first prompt, since a SQLite connection
+    can only be used by the thread which opened it.
     '''
     welcome_screen()
 
-    print("LOG: Loading default test file: 'test.txt' ...")
-    contact_list = af.import_csv_file("test.txt")
-    print("LOG: Calling 'LIST' method ... \n")
-    af.list_contacts(contact_list)
+    contact_list = None
+    if fast_start and database is None:
+        print("LOG: Loading contacts in the background ...")
+        contact_future = start_background_load()
+    else:
+        contact_list = load_startup_contacts(database)
+        print("LOG: Calling 'LIST' method ... \n")
+        af.list_contacts(contact_list, interactive=False)
     # define dictionary of functions to invoke based on key provided
     # arguments for functions defined in while loop
     command_functions = {
         "IMPORT": af.import_csv_file,
         "LIST": af.list_contacts,
+        "SEARCH": af.search_contacts,
         "ADD": af.add_contact,
         "EDIT": af.edit_contact,
         "DELETE": af.delete_contact,
         "EXPORT": af.export_contacts,
+        "SAVE": af.save_snapshot,
+        "LOAD": af.load_snapshot,
+        "COMPACT": af.compact_journal,
+        "DEDUPE": af.dedupe_contacts,
+        "DIFF": af.diff_contacts,
+        "REPORT": af.report_contacts,
+        "WATCH": af.watch_file,
+        "STATS": af.show_stats,
         "HELP": af.display_help_info
     }
 
     is_done = False
     while not is_done:
-        # get user input
-        command = get_user_input()
+        # get user input, any words after the command are its arguments
+        command_words = get_user_input().split()
+        command = command_words[0] if command_words else ""
+        arguments = command_words[1:]
+
+        # unrecognized commands are counted together so the metrics only
+        # hold one entry for them
+        metric_name = command
+        if command not in command_functions and command != "DONE":
+            metric_name = "UNKNOWN"
+        # every command except 'HELP' uses the contacts
+        elif contact_list is None and command != "HELP":
+            contact_list = wait_for_contacts(contact_future)
 
         # use command from user input and use it as a key in the 
         # command_functions dictionary to call a specific function
         try:
-            if command == "DONE":
-                is_done = True
-            elif command == "HELP":
-                command_functions[command]()
-            elif command == "IMPORT":
-                import_instructions = ''' 
-                Please enter a filepath to a file you wish to import. It 
-                must be a .csv or .txt file.Importing a new file
-                will replace the current data with data in the new file. \n
-                '''
-                print(import_instructions)
-                confirm_txt = "Do you still want to proceed (Yes/No)? "
-                confirm_input = af.confirm(confirm_txt)
-                if confirm_input == "YES":
-                    custom_filepath = input("Enter path of file to import: ")
-                    contact_list = command_functions[command](custom_filepath)
+            with mt.METRICS.measure(metric_name), mt.profile(
+                command == profile_command):
+                if command == "DONE":
+                    is_done = True
+                elif command == "HELP":
+                    command_functions[command]()
+                elif command == "IMPORT" and "MERGE" in arguments:
+                    # merged records are kept in the journal like any other
+                    # change, so the journal's base file stays the same
+                    merge_filepath = input("Enter path of file to merge: ")
+                    af.merge_csv_file(contact_list, merge_filepath)
+                elif command == "IMPORT":
+                    import_instructions = ''' 
+                    Please enter a filepath to a file you wish to import. It 
+                    must be a .csv or .txt file, or a directory or pattern 
+                    (such as data/*.csv) of them. Importing a new file
+                    will replace the current data with data in the new file. \n
+                    '''
+                    print(import_instructions)
+                    confirm_txt = "Do you still want to proceed (Yes/No)? "
+                    confirm_input = af.confirm(confirm_txt)
+                    if confirm_input == "YES":
+                        custom_filepath = input(
+                            "Enter path of file to import: ")
+                        imported_list = command_functions[command](
+                            custom_filepath, contact_list)
+                        # the journal is only started over on top of the
+                        # file which was really imported
+                        if imported_list is not None:
+                            contact_list = af.start_journal(imported_list,
+                                contact_list.journal, 
+                                af.import_source(custom_filepath))
+                    else:
+                        print("LOG: No file imported.")
+                elif command == "LOAD":
+                    filepath = input("Enter path of snapshot file (blank for "
+                        "'{}'): ".format(ss.SNAPSHOT_FILE))
+                    if filepath == "":
+                        filepath = ss.SNAPSHOT_FILE
+                    loaded_list = command_functions[command](filepath, 
+                        contact_list)
+                    if loaded_list is not None:
+                        contact_list = af.start_journal(loaded_list, 
+                            contact_list.journal, filepath)
+                elif command in ("LIST", "SEARCH", "EXPORT", "REPORT",
+                    "WATCH"):
+                    command_functions[command](contact_list, arguments)
                 else:
-                    print("LOG: No file imported.")
-            else:
-                # if command is list, add, edit, delete, or export
-                command_functions[command](contact_list)
+                    # if command is add, edit, delete, save, compact, dedupe,
+                    # diff
+                    command_functions[command](contact_list)
         except KeyError:
             # if an unrecognized key provided, then return message
             print("ERROR: Command not recognized, please try again.")
@@ -97,12 +271,25 @@ def start_app():
                 .format(command))
         except Exception:
             print("ERROR: An error occured. Please try again.")
+        if contact_list is not None:
+            af.record_gauges(contact_list)
 
-    # After exiting while loop print message and end application
+    # After exiting while loop make sure every change is on disk, then
+    # save the metrics, print message and end application
+    if contact_list.journal is not None:
+        contact_list.journal.close()
+    if contact_list.persistent:
+        contact_list.close()
+    mt.METRICS.write(mt.METRICS_FILE)
+    print("LOG: Metrics written to: {}".format(mt.METRICS_FILE))
     print("LOG: Thank you for using this application!")
 
-if __name__ == '__main__':
-
+def run_self_tests():
+    '''
+    Run the unit tests which confirm that the public Contact class methods,
+    the reading and writing of contact files, the journal and snapshots
+    are working as intended. An AssertionError is raised if one fails.
+    '''
     print("------------- Unit Tests (START) -------------")
     # UNIT TEST 1 - Testing Unique Check for the contact_list. Used before
     # the 'validate_new_contact' and after the 'validate_contact_field_update'
@@ -135,6 +322,176 @@ if __name__ == '__main__':
     # method should return True
     assert Contact(values3).validate_contact_field_update("TITLE", "CEO")
     print("UNIT TEST 3: validate_contact_field_update test -- PASS")
+
+    # the modules below are only imported when the tests are run
+    import contextlib
+    import io
+    import tempfile
+    import contact_writer as cw
+    import csv_filereader as fr
+    import journal as jn
+    with tempfile.TemporaryDirectory(prefix="self_test_") as directory:
+        # UNIT TEST 4 - Testing that a file with and without IDs is read in
+        # batches of the chunk size, in the order of the file, and that the
+        # lines without an ID are given IDs which no other line uses
+        mixed_path = os.path.join(directory, "mixed.txt")
+        with open(mixed_path, 'w') as file:
+            for index in range(2500):
+                line = "Test{},Mixed,555-555-5555,test{}@email.com,,,Friend"
+                if index % 2:
+                    # lines with an ID, a later line may use a new line's ID
+                    line = str(index + 1) + "," + line
+                file.write(line.format(index, index) + "\n")
+        batches = list(fr.iter_contacts(mixed_path, chunk_size=1000))
+        contacts = [contact for batch in batches for contact in batch]
+        assert [len(batch) for batch in batches] == [1000, 1000, 500]
+        assert [contact.first_name for contact in contacts] == [
+            "Test{}".format(index) for index in range(2500)]
+        assert len(set([contact.id for contact in contacts])) == 2500
+        assert all([contact.id == str(index + 1) 
+            for index, contact in enumerate(contacts) if index % 2])
+        print("UNIT TEST 4: iter_contacts batch order and IDs test -- PASS")
+
+        # UNIT TEST 5 - Testing that reading a file with a pool of workers
+        # gives the same Contacts as reading it serially, including the
+        # lines with invalid values which are rejected
+        with open(mixed_path, 'a') as file:
+            file.write("Bad,Phone,555-CALL-NOW,bad@email.com,,,Friend\n")
+            file.write("Bad,Relationship,555-555-5555,r@email.com,,,Pal\n")
+            # a duplicate of the second line
+            file.write("2,Test1,Mixed,555-555-5555,test1@email.com,,,"
+                "Friend\n")
+        serial_stats = dict()
+        parallel_stats = dict()
+        # the errors printed for the rejected lines are not shown
+        with contextlib.redirect_stdout(io.StringIO()):
+            serial = [contact.to_list() for batch in fr.iter_contacts(
+                mixed_path, stats=serial_stats, validate_fields=True) 
+                for contact in batch]
+            parallel = [contact.to_list() for contact in 
+                fr.read_file_parallel(mixed_path, workers=2, 
+                stats=parallel_stats, validate_fields=True)]
+        assert len(serial) == 2500 and serial == parallel
+        assert serial_stats == parallel_stats
+        assert serial_stats["rejected"] == 2 and serial_stats["deduped"] == 1
+        print("UNIT TEST 5: parallel read equals serial read test -- PASS")
+
+        # UNIT TEST 6 - Testing that IMPORT validates through the shared
+        # validation cache, so importing the same file again only hits
+        cv.CACHE.clear()
+        with contextlib.redirect_stdout(io.StringIO()):
+            af.import_csv_file(mixed_path)
+            first = cv.CACHE.stats()
+            af.import_csv_file(mixed_path)
+            second = cv.CACHE.stats()
+        assert first["misses"] > 0 and second["misses"] == first["misses"]
+        assert second["hits"] - first["hits"] == first["misses"] + first[
+            "hits"]
+        cv.CACHE.clear()
+        print("UNIT TEST 6: IMPORT validation cache test -- PASS")
+
+        # UNIT TEST 7 - Testing that lines without an ID are given IDs above
+        # every ID in the file, even one on a later line, and that the next
+        # new contact's ID is above them all
+        ids_path = os.path.join(directory, "ids.txt")
+        with open(ids_path, 'w') as file:
+            file.write("Ann,Seven,555-555-0001,ann@email.com,,,Friend\n"
+                "10,Bob,Eight,555-555-0002,bob@email.com,,,Friend\n"
+                "Cal,Seven,555-555-0003,cal@email.com,,,Family\n"
+                "2,Dee,Eight,555-555-0004,dee@email.com,,,Family\n")
+        with contextlib.redirect_stdout(io.StringIO()):
+            contact_list = af.import_csv_file(ids_path)
+        assert contact_list.ids() == ["11", "10", "12", "2"]
+        assert contact_list.allocate_id() == "13"
+        print("UNIT TEST 7: ID allocation for 7 and 8 column lines test "
+            "-- PASS")
+
+        # UNIT TEST 8 - Testing that an export, including values with a
+        # comma, quotes and a line break, imports back to the same contacts
+        contact_list.add(Contact(["20", "Eve", "Quote", "555-555-0005",
+            "eve@email.com", "Acme, Inc.", 'The "Boss"\nof it', "Friend"]))
+        export_path = cw.export_file(contact_list, directory)
+        with contextlib.redirect_stdout(io.StringIO()):
+            imported_list = af.import_csv_file(export_path)
+        assert [contact.to_list() for contact in imported_list] == [
+            contact.to_list() for contact in contact_list]
+        print("UNIT TEST 8: export and import round trip test -- PASS")
+
+        # UNIT TEST 9 - Testing that the changes in a journal are replayed
+        # on its base file after a restart
+        journal = jn.Journal(os.path.join(directory, "test.journal"))
+        journal.reset(export_path)
+        new_contact = Contact(["21", "Fay", "Added", "555-555-0006",
+            "fay@email.com", "", "", "Family"])
+        edited_contact = Contact(["10", "Bob", "Edited", "555-555-0002",
+            "bob@email.com", "", "", "Friend"])
+        contact_list.add(new_contact)
+        journal.append("ADD", new_contact)
+        contact_list.replace("10", edited_contact)
+        journal.append("EDIT", edited_contact)
+        contact_list.remove("2")
+        journal.append("DELETE", id="2")
+        journal.close()
+        # a new journal object reads the file like the next start up
+        journal = jn.Journal(journal.filepath)
+        changes = journal.read()
+        with contextlib.redirect_stdout(io.StringIO()):
+            restored_list = af.load_file(journal.base)
+        journal.close()
+        assert jn.replay(restored_list, changes) == 3
+        assert [contact.to_list() for contact in restored_list] == [
+            contact.to_list() for contact in contact_list]
+        print("UNIT TEST 9: journal replay after restart test -- PASS")
+
+        # UNIT TEST 10 - Testing that a snapshot loads the same contacts, 
+        # with the same IDs, as the export of the same list
+        snapshot_path = os.path.join(directory, "test.snapshot")
+        ss.save_snapshot(contact_list, snapshot_path)
+        export_path = cw.export_file(contact_list, directory)
+        with contextlib.redirect_stdout(io.StringIO()):
+            snapshot_list = af.load_file(snapshot_path)
+            csv_list = af.load_file(export_path)
+        assert [contact.to_list() for contact in snapshot_list] == [
+            contact.to_list() for contact in csv_list]
+        assert [contact.to_list() for contact in snapshot_list] == [
+            contact.to_list() for contact in contact_list]
+        print("UNIT TEST 10: snapshot load equals csv load test -- PASS")
     print("------------- Unit Tests (END) -------------")
-    # call start_app method to start application
-    start_app()
\ No newline at end of file
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Contact List Manager")
+    parser.add_argument("--self-test", action="store_true",
+        help="run the unit tests and exit")
+    parser.add_argument("--fast-start", action="store_true",
+        help="show the first prompt at once and load the contacts in the "
+        "background")
+    parser.add_argument("--profile", metavar="COMMAND", type=str.upper,
+        help="profile every run of COMMAND with cProfile")
+    parser.add_argument("--sqlite", metavar="DATABASE", nargs="?",
+        const="", help="keep the contacts in a SQLite database file "
+        "(default 'contacts.db')")
+    parser.add_argument("--validation-cache", metavar="SIZE", type=int,
+        help="largest number of validation results to cache (default {}, "
+        "0 turns the cache off)".format(cv.CACHE_SIZE))
+    parser.add_argument("--serve", action="store_true", help="serve the "
+        "contacts over a local JSON API instead of the terminal")
+    parser.add_argument("--host", help="address the server listens on "
+        "(default 127.0.0.1)")
+    parser.add_argument("--port", type=int, help="port the server listens "
+        "on (default 8521, 0 picks a free port)")
+    parser.add_argument("--batch", metavar="FILE", help="apply the ADD, "
+        "EDIT and DELETE operations in FILE without prompts")
+    args = parser.parse_args()
+
+    if args.validation_cache is not None:
+        cv.CACHE.resize(args.validation_cache)
+    if args.self_test:
+        run_self_tests()
+        sys.exit(0)
+    # call start_app method to start application, or apply a batch file
+    if args.batch is not None:
+        start_batch(args.batch, args.sqlite)
+    elif args.serve:
+        start_server(args.host, args.port, args.sqlite)
+    else:
+        start_app(args.profile, args.sqlite, args.fast_start)
@@ -1,12 +1,38 @@
 import time
 import os
-import random
+import sys
 
 from contact import *
+from contact_store import ContactStore
 import csv_filereader as fr
+import contact_writer as cw
+import snapshot as ss
+import journal as jn
+import search_index as si
+import dedupe as dd
+import contact_diff as cd
+import contact_report as cr
+import contact_validator as cv
+import metrics as mt
 
-FIELD_NAMES = ["ID","FIRST_NAME", "LAST_NAME", "PHONE_NUMBER", "EMAIL", 
-    "COMPANY", "TITLE", "RELATIONSHIP"]
+# file imported when the file to import does not exist
+DEFAULT_FILE = "test.txt"
+# number of records shown on each page of the 'LIST' command
+PAGE_SIZE = 25
+# the 'LIST' table's column widths, its row format and its header are only
+# built once
+COLUMN_WIDTHS = [5, 15, 15, 15, 25, 30, 30, 30]
+ROW_FORMAT = " ".join(["{:<" + str(width) + "}" 
+    for width in COLUMN_WIDTHS]) + "\n"
+# largest number of records shown by the 'SEARCH' command
+SEARCH_LIMIT = 100
+# largest number of changes shown by the 'DIFF' command
+DIFF_LIMIT = 100
+# seconds between checks of the file followed by the 'WATCH' command
+WATCH_INTERVAL = 1.0
+HEADER_LINES = (ROW_FORMAT.format(*FIELD_NAMES) 
+    + ROW_FORMAT.format('----', '----------', '----------', '------------', 
+    '----------', '----------','----------', '-------------'))
 
 
 def display_help_info():
@@ -15,6 +41,13 @@ def display_help_info():
     '''
 
     command_descriptions = '''
+    "LIST" - Displays the contacts as a table, one page at a time. Add a 
+    field name to sort by that field, 'DESC' to reverse the order, and a 
+    number to set how many contacts are shown on each page, for example 
+    "LIST LAST_NAME DESC 50". When there is more than one page, enter 'N' 
+    or 'P' to move to the next or previous page, a page number to jump to
+    it, or nothing to stop.
+
     "ADD" - Allows the user to create a new Contact record based on their 
     input. This input is required to fill the first_name, last_name, 
     phone_number, email, and relationship. Values for the company and title 
@@ -44,16 +77,84 @@ def display_help_info():
     result in no record being deleted. Once the deletion occurs or the user
     does not confirm, the user is allowed to enter a new command.
 
+    "SEARCH" - Finds contacts by one or more FIELD=VALUE terms, which must 
+    all match. FIRST_NAME and LAST_NAME match the start of the name, and
+    EMAIL_DOMAIN (or DOMAIN), COMPANY and RELATIONSHIP match the whole 
+    value. Case is ignored and values with spaces can be quoted, for 
+    example: SEARCH LAST_NAME=sh DOMAIN=email.com RELATIONSHIP=family
+
+    "DEDUPE" - Finds groups of contacts which are likely to be the same 
+    person. Phone numbers are compared by their digits, emails and names 
+    ignore case, and names are also grouped by how they sound. Records are
+    likely duplicates when at least two of their name, phone number, email
+    and company agree. After the groups are shown, the user can confirm to 
+    merge each group into its first record.
+
+    "DIFF" - Compares an older contact file (such as an export) with a newer
+    file, or with the current contacts if no newer file is given. Records 
+    are matched by ID and every added and removed contact is shown, along
+    with each field of a changed contact. Files of any size can be compared,
+    since they are sorted in parts on disk instead of in memory.
+
+    "REPORT" - Counts the contacts by one or two fields and shows the 
+    largest groups, for example "REPORT COMPANY" or "REPORT COMPANY 
+    RELATIONSHIP". Add 'TOP' and a number to set how many groups are shown
+    (20 by default), and 'FILE' to count the contacts in an import or 
+    export file instead of the current contacts. Files of any size can be
+    counted, since groups which do not fit in memory are sorted on disk.
+
+    "WATCH" - Follows a contact file which another program appends to, 
+    such as a feed, and merges each new line into the current contacts 
+    like "IMPORT MERGE" until Ctrl+C is pressed ("WATCH 60" stops after 60
+    seconds). Only the lines added since the last check are read. If the 
+    file is replaced or truncated, it is read again from the start. The 
+    position reached is saved in 'contacts.watch', so watching the same
+    file later continues from where it stopped.
+
+    "STATS" - Shows how many times each command has run, how long it took
+    (mean, estimated 50th and 95th percentile and maximum milliseconds) and
+    how many errors it raised by type, along with the size of the contact
+    list, the validation cache's hits, misses and evictions, and the number
+    of lines accepted, rejected and deduplicated by imports. The metrics 
+    are also written to 'contact_metrics.json' when the application ends.
+
     "IMPORT" - Allows the user to import a new data file.  Only a .txt or .csv
     file will be accepted and the contents of the file will have to be comma
     separated values.  The user will have to confirm their choice to import
     a new data file, since their current data will be overwritten.  Once the 
-    import has completed, the user is allowed to enter a new command.
+    import has completed, the user is allowed to enter a new command. A 
+    directory or a pattern such as 'data/*.csv' imports every .txt and .csv
+    file it holds or matches at once, as a single deduplicated list.
+
+    "IMPORT MERGE" - Merges a data file into the current contacts instead of
+    replacing them. Lines with an ID update the contact with that ID, or 
+    are added if the ID is new. Lines without an ID are added unless the 
+    same contact already exists. Unchanged contacts are skipped, and the 
+    number of contacts inserted, updated and skipped is shown.
+
+    "SAVE" - Saves all contacts into a binary snapshot file (by default
+    'contacts.snapshot'). A snapshot keeps every contact's ID and is loaded
+    automatically the next time the application starts, which is much faster
+    than importing a text file.
+
+    "LOAD" - Replaces the current contacts with the contacts in a snapshot
+    file created by the 'SAVE' command.
+
+    "COMPACT" - Every add, edit and delete is recorded in a change journal
+    ('contacts.journal') which is replayed on top of the last snapshot or
+    export the next time the application starts, so changes are kept 
+    without exporting. 'COMPACT' writes a new export of all contacts and 
+    starts the journal over on top of it.
 
     "EXPORT" - This will export all contacts into a new 
-    contact_list__<unix_timestamp>.csv file. The last segment of the filename 
-    is a unique sequence of numbers which is also a timestamp, which will 
-    allow you to create a history of your contact list files. 
+    contact_list_export__<unix_timestamp>.txt file. The last segment of the 
+    filename is a unique sequence of numbers which is also a timestamp, which
+    will allow you to create a history of your contact list files. If an 
+    export with the same timestamp already exists, a counter is added to the
+    filename. Use "EXPORT GZIP" to create a compressed .txt.gz file instead.
+    "EXPORT PARTITION BY RELATIONSHIP" (or any other field) creates a folder
+    with one file for each value of the field, such as 'friend.txt', and a
+    manifest.json listing the rows and size of every file.
     '''
 
     faq_str = '''
@@ -67,77 +168,304 @@ def display_help_info():
     2. Why does my Unique ID value for records keep changing when I import my
         files? 
 
-        Answer: When data is loaded, a unique ID between 1 and 1000 is assigned
-        to ensure that each record has a unique identifier. This unique ID is 
-        generated when the file data is imported to ensure that the IDs are 
-        all of the same type and that data is not overwritten because multiple 
-        of multiple records with the same id.
+        Answer: When data is loaded, any record without an ID is assigned the
+        next unused number to ensure that each record has a unique 
+        identifier. New IDs always count up from the largest ID already in 
+        the file, so they never overwrite a record which already has an ID.
     '''
 
     print(command_descriptions)
     print("------------------------------")
     print(faq_str)
 
-def list_contacts(contact_list:list) -> None:
+def list_contacts(contact_list:ContactStore, arguments:list=None,
+    interactive:bool=True) -> None:
     '''
-        Takes in a contact_list parameter which is a list of Contact
-        objects and prints them as a table for the user to view.
+        Takes in a contact_list parameter which is a ContactStore of Contact
+        objects and prints them as a table for the user to view, one page
+        at a time. The optional arguments are a field name to sort by, 
+        'DESC' to reverse the order, and a number of records per page, in
+        any order. If interactive is True and there is more than one page,
+        the user can move to the next or previous page.
     '''
-    # print column headers based on FIELD_NAMES tuple
-    print("{:<5} {:<15} {:<15} {:<15} {:<25} {:<30} {:<30} {:<30}".format(
-        FIELD_NAMES[0], FIELD_NAMES[1], FIELD_NAMES[2], FIELD_NAMES[3], 
-        FIELD_NAMES[4], FIELD_NAMES[5], FIELD_NAMES[6], FIELD_NAMES[7]))
+    sort_field = None
+    descending = False
+    page_size = PAGE_SIZE
+    for argument in arguments or []:
+        if argument in FIELD_NAMES:
+            sort_field = argument
+        elif argument == "DESC":
+            descending = True
+        elif argument == "ASC":
+            descending = False
+        elif argument.isdecimal() and int(argument) > 0:
+            page_size = int(argument)
+        else:
+            print("ERROR: Invalid 'LIST' option: {}. Options are a field "
+                "name, ASC, DESC or a page size.".format(argument))
+            return
 
-    # print separator line between headers and data
-    print("{:<5} {:<15} {:<15} {:<15} {:<25} {:<30} {:<30} {:<30}"
-    .format('----', '----------', '----------', '------------', 
-    '----------', '----------','----------', '-------------'))
-    # print all data from the contact_list
+    page_count = max((len(contact_list) + page_size - 1) // page_size, 1)
+    page_number = 1
+    while True:
+        contacts = contact_list.page(page_number, page_size, sort_field, 
+            descending)
+        # the whole page is written at once instead of a print per record
+        sys.stdout.write(format_page(contacts) + "Page {} of {} ({} "
+            "contacts)\n".format(page_number, page_count, len(contact_list)))
+        if not interactive or page_count == 1:
+            return
+
+        choice = input("N (next), P (previous), a page number, or blank to "
+            "stop: ").upper()
+        if choice == "N" and page_number < page_count:
+            page_number += 1
+        elif choice == "P" and page_number > 1:
+            page_number -= 1
+        elif choice.isdecimal() and 1 <= int(choice) <= page_count:
+            page_number = int(choice)
+        elif choice not in ("N", "P"):
+            return
+
+def search_contacts(contact_list:ContactStore, arguments:list=None) -> list:
+    '''
+        Takes in a contact_list parameter and a search query, either from 
+        the arguments or typed by the user, and prints the Contacts which
+        match every term of the query. Returns the list of matches.
+    '''
+    query = " ".join(arguments or [])
+    if query == "":
+        query = input("Search (e.g. LAST_NAME=sm COMPANY=\"Paco Taco\"): ")
+    try:
+        terms = si.parse_query(query)
+    except ValueError as error:
+        print("ERROR: {}. Search terms are FIELD=VALUE, where FIELD is one "
+            "of {}.".format(error, ", ".join(si.SEARCH_FIELDS)))
+        return []
+    if not terms:
+        print("ERROR: No search terms provided.")
+        return []
+
+    start = time.perf_counter()
+    contacts = contact_list.search(terms)
+    elapsed = time.perf_counter() - start
+    sys.stdout.write(format_page(contacts[:SEARCH_LIMIT]))
+    print("LOG: Found {} contacts in {:.3f} ms.".format(len(contacts), 
+        elapsed * 1000))
+    if len(contacts) > SEARCH_LIMIT:
+        print("LOG: Only the first {} contacts are shown, add more terms "
+            "to narrow the search.".format(SEARCH_LIMIT))
+    return contacts
+
+def dedupe_contacts(contact_list:ContactStore) -> ContactStore:
+    '''
+        Takes in a contact_list parameter and prints every cluster of 
+        likely duplicate contacts, such as records whose phone numbers only
+        differ in punctuation or whose emails only differ in case. If the 
+        user confirms, each cluster is merged into its first record, with
+        empty fields filled from the other records, which are deleted.
+    '''
+    start = time.perf_counter()
+    finder = dd.DuplicateFinder()
     for contact in contact_list:
-        print ("{:<5} {:<15} {:<15} {:<15} {:<25} {:<30} {:<30} {:<30}"
-            .format(contact.id, contact.first_name, contact.last_name, 
-            contact.phone_number, contact.email, contact.company, 
-            contact.title, contact.relationship ))
+        finder.add(contact)
+    clusters = finder.clusters()
+    print("LOG: Found {} clusters of likely duplicates in {:.2f} seconds "
+        "({} comparisons).".format(len(clusters), time.perf_counter() - start,
+        finder.comparisons))
+    if finder.skipped_blocks > 0:
+        print("LOG: {} blocks with more than {} records were not compared."
+            .format(finder.skipped_blocks, dd.MAX_BLOCK_SIZE))
+    if not clusters:
+        return contact_list
+
+    for number, ids in enumerate(clusters[:SEARCH_LIMIT], 1):
+        print("\nCluster {}:".format(number))
+        sys.stdout.write(format_page([contact_list.get(id) for id in ids]))
+    if len(clusters) > SEARCH_LIMIT:
+        print("\nLOG: Only the first {} clusters are shown.".format(
+            SEARCH_LIMIT))
+
+    confirm_input = confirm("Merge every cluster into its first record "
+        "(Yes/No)? ")
+    if confirm_input != "YES":
+        print("LOG: No records merged.")
+        return contact_list
+
+    removed = 0
+    for ids in clusters:
+        contacts = [contact_list.get(id) for id in ids]
+        merged = Contact(dd.merge_values(contacts))
+        # the duplicates are removed first so the merged values can not 
+        # collide with one of them
+        for id in ids[1:]:
+            if contact_list.remove(id) is not None:
+                record_change(contact_list, "DELETE", id=id)
+                removed += 1
+        if merged.to_list() != contacts[0].to_list():
+            if contact_list.replace(ids[0], merged):
+                record_change(contact_list, "EDIT", merged)
+    print("LOG: Merged {} clusters, {} records deleted.".format(
+        len(clusters), removed))
+    return contact_list
+
+def diff_contacts(contact_list:ContactStore) -> dict:
+    '''
+        Takes in a contact_list parameter and prompts the user for an older
+        contact file and a newer one (blank for the current contacts), then
+        shows the contacts which were added, removed or changed between them
+        and returns the counts. Only the first DIFF_LIMIT changes are shown.
+    '''
+    old_filepath = input("Enter path of the older file: ")
+    if not os.path.isfile(old_filepath):
+        print("ERROR: File not found: {}".format(old_filepath))
+        return None
+    new_filepath = input("Enter path of the newer file (blank for the "
+        "current contacts): ")
+    if new_filepath != "" and not os.path.isfile(new_filepath):
+        print("ERROR: File not found: {}".format(new_filepath))
+        return None
+
+    start = time.perf_counter()
+    stats = dict()
+    old_stats = dict()
+    new_stats = dict()
+    new_rows = cd.list_rows(contact_list)
+    if new_filepath != "":
+        new_rows = cd.file_rows(new_filepath, new_stats)
+    shown = 0
+    for change in cd.diff(cd.file_rows(old_filepath, old_stats), new_rows,
+        stats):
+        if shown < DIFF_LIMIT:
+            print(cd.format_change(*change))
+            shown += 1
+    print("LOG: Compared in {:.2f} seconds: {}".format(
+        time.perf_counter() - start, cd.format_summary(stats)))
+    # lines without an ID can not be matched, so they are not compared
+    for filepath, file_stats in ((old_filepath, old_stats), 
+        (new_filepath, new_stats)):
+        if file_stats.get("no_id"):
+            print("LOG: {} lines without an ID were skipped in: {}".format(
+                file_stats["no_id"], filepath))
+    if stats["ADDED"] + stats["REMOVED"] + stats["CHANGED"] > shown:
+        print("LOG: Only the first {} changes are shown, use "
+            "'python contact_diff.py OLD NEW --output report.csv' for every"
+            " change.".format(DIFF_LIMIT))
+    return stats
+
+def report_contacts(contact_list:ContactStore, arguments:list=None) -> dict:
+    '''
+        Takes in a contact_list parameter and prints the number of contacts
+        in each group of the fields in the arguments, largest groups first.
+        The arguments 'TOP <number>' set how many groups are shown, and 
+        'FILE' prompts for a contact file which is counted instead of the
+        contact list. Returns the report.
+    '''
+    arguments = arguments if arguments is not None else []
+    fields = []
+    top = cr.TOP_N
+    from_file = False
+    index = 0
+    while index < len(arguments):
+        argument = arguments[index]
+        if argument in cr.GROUP_FIELDS and argument not in fields:
+            fields.append(argument)
+        elif argument == "TOP" and arguments[index + 1:index + 2] and (
+            arguments[index + 1].isdecimal()):
+            index += 1
+            top = int(arguments[index])
+        elif argument == "FILE":
+            from_file = True
+        else:
+            fields = []
+            break
+        index += 1
+    if not fields or len(fields) > cr.MAX_FIELDS or top < 1:
+        print("ERROR: Use 'REPORT <field> [<field>] [TOP <number>] [FILE]' "
+            "with one or two of the fields: {}".format(
+            ", ".join(cr.GROUP_FIELDS)))
+        return None
+
+    stats = dict()
+    keys = cr.list_keys(contact_list, fields)
+    if from_file:
+        filepath = input("Enter path of the file to count: ")
+        if not os.path.isfile(filepath):
+            print("ERROR: File not found: {}".format(filepath))
+            return None
+        keys = cr.file_keys(filepath, fields, stats)
 
+    start = time.perf_counter()
+    report = cr.report(keys, top, stats=stats)
+    sys.stdout.write(cr.format_report(fields, report))
+    print("LOG: Counted in {:.2f} seconds.".format(
+        time.perf_counter() - start))
+    if stats.get("rejected"):
+        print("LOG: {} lines with the wrong number of values were skipped."
+            .format(stats["rejected"]))
+    if stats["runs"]:
+        print("LOG: {} sorted runs were written to disk and merged.".format(
+            stats["runs"]))
+    return report
 
-def add_contact(contact_list:list) -> list:
+def format_page(contacts:list) -> str:
+    '''
+        Format a page of Contacts as a table with a header, returned as a 
+        single string.
+    '''
+    lines = [HEADER_LINES]
+    for contact in contacts:
+        lines.append(ROW_FORMAT.format(contact.id, contact.first_name, 
+            contact.last_name, contact.phone_number, contact.email, 
+            contact.company, contact.title, contact.relationship))
+    return "".join(lines)
+
+
+def add_contact(contact_list:ContactStore) -> ContactStore:
     '''
         Takes a contact_list parameter and creates a new Contact object. 
-        A unique ID is created based on the current ids in the contact_list
+        A unique ID is allocated by the contact_list's IDAllocator
         and the user is prompted for input for each Contact attribute.
     '''
-    id_list = list()
     new_contact_values = list()
-    new_contact = None
-
-    # create list of current contact id values, then generate a new unique id
-    id_list.append((c.id) for c in contact_list)
-    id = generateUniqueID(id_list)
 
     # create list of new contact values provided by user
-    new_contact_values.append(id)
     for field in FIELD_NAMES[1:]:
         value = input("{}: ".format(field))
         new_contact_values.append(value)
 
+    messages = apply_add(contact_list, new_contact_values)
+    if not messages:
+        print("Successfully added new Contact!")
+    else:
+        print(messages)    
+    return contact_list
+
+def apply_add(contact_list:ContactStore, values:list, id:str=None) -> list:
+    '''
+        Validate a new Contact made from values (every field except ID) and
+        add it to contact_list with the provided ID, or the next unique ID.
+        Does not ask the user for anything. Returns a list of error 
+        messages, which is empty if the Contact was added.
+    '''
+    if id is None:
+        id = contact_list.allocate_id()
     # initialize new Contact instance and call the 'validate_new_contact' 
     # to validate all provided values, and ensure that this new instance
     # is unique
-    new_contact = Contact(new_contact_values)
+    new_contact = Contact([id] + list(values))
     if new_contact.is_unique(contact_list):
         new_contact.validate_new_contact()
     
-    # if new_contact is not None, then add instance to contact_list
-    if new_contact._Contact__is_valid:
-        contact_list.append(new_contact)
-        print("Successfully added new Contact!")
-    else:
-        messages = list(filter(None, 
-            new_contact._Contact__error_message))
-        print(messages)    
-    return contact_list
+    # if new_contact is valid, then add instance to contact_list
+    if new_contact._Contact__is_valid and contact_list.add(new_contact):
+        record_change(contact_list, "ADD", new_contact)
+        return []
+    mt.METRICS.increment("validation_failures")
+    messages = list(filter(None, new_contact._Contact__error_message))
+    return messages or ["Duplicate Contact detected."]
 
-def edit_contact(contact_list:list) -> list:
+def edit_contact(contact_list:ContactStore) -> ContactStore:
     '''
         Takes a contact_list parameter, and prompts user for an id within the 
         list. If found, the user can edit the entire record or just a single
@@ -145,99 +473,93 @@ def edit_contact(contact_list:list) -> list:
         is updated based on if it is valid or not.
     '''
     edit_contact = None
-    id_found = False
-    contact_list_index = 0
     input_str = str(input("Enter ID: "))
-    for index,con in enumerate(contact_list):
-        if(con.id == input_str):
-            id_found = True
-            contact_list_index = index
-            # re-instantiate Contact object to prevent modifying object before
-            # all validations have occurred
-            edit_contact = Contact(con.__repr__().split(","))
-            
-            edit_instructions = '''
-            Please specify what field you want to update.  If you would like
-            to update the entire record, please specify the 'ALL' option.
-            Providing no value for a field that already has value will not 
-            update the field.
-            '''
-            print(edit_instructions)
-            print("List of all 'EDIT' options: {}".format(
-                    FIELD_NAMES[1:] + ["ALL"]))
-            edit_type = input("FIELD: ").upper()
-
-            # edit contact information based on edit_type (field or ALL)
-            if edit_type == "ALL":
-                # loop through all fields, except id
-                for field in FIELD_NAMES[1:]:
-                    print("Current Value for field {}: {}".format(edit_type, 
-                        edit_contact.__dict__[field.lower()]))
-                    new_value = input("New Value for field {}: ".format(field))
-                    # validate that new_value is actually different from the
-                    # current value and passes its field-specific validations
-                    is_valid = edit_contact.validate_contact_field_update(
-                        field, new_value)
-                    if is_valid and new_value == "":
-                        # if its valid and the new_value is empty, then keep
-                        # the current value for that field.
-                        pass
-                    elif is_valid and new_value != "":
-                        edit_contact.__dict__[field.lower()] = new_value
-                    else:
-                        messages = list(filter(None, 
-                            edit_contact._Contact__error_message))
-                        print(messages)
-                        return contact_list
-
-            elif edit_type in FIELD_NAMES:
-                print("Current Value for field {}: {}".format(edit_type, 
-                    edit_contact.__dict__[edit_type.lower()]))
-                new_value = input("New Value for field {}: ".format(edit_type))
-                # validate that new_value is actually different from the
-                # current value and passes its field-specific validations
-                if edit_contact.validate_contact_field_update(edit_type, 
-                    new_value):
-                    edit_contact.__dict__[edit_type.lower()] = new_value
-                else:
-                    print(edit_contact._Contact__error_message)
-                    return contact_list
-            else:
-                print("Invalid column specified. Record not updated.")
-                edit_contact = None
-    
-    if not id_found:
+    con = contact_list.get(input_str)
+    if con is None:
         print("Invalid ID value. No record modified")
+        return contact_list
+
+    # re-instantiate Contact object to prevent modifying object before
+    # all validations have occurred
+    edit_contact = Contact(con.to_list())
+    
+    edit_instructions = '''
+    Please specify what field you want to update.  If you would like
+    to update the entire record, please specify the 'ALL' option.
+    Providing no value for a field that already has value will not 
+    update the field.
+    '''
+    print(edit_instructions)
+    print("List of all 'EDIT' options: {}".format(
+            FIELD_NAMES[1:] + ["ALL"]))
+    edit_type = input("FIELD: ").upper()
+
+    # edit contact information based on edit_type (field or ALL)
+    if edit_type == "ALL":
+        # loop through all fields, except id
+        for field in FIELD_NAMES[1:]:
+            print("Current Value for field {}: {}".format(edit_type, 
+                getattr(edit_contact, field.lower())))
+            new_value = input("New Value for field {}: ".format(field))
+            # validate that new_value is actually different from the
+            # current value and passes its field-specific validations
+            is_valid = edit_contact.validate_contact_field_update(
+                field, new_value)
+            if is_valid and new_value == "":
+                # if its valid and the new_value is empty, then keep
+                # the current value for that field.
+                pass
+            elif is_valid and new_value != "":
+                setattr(edit_contact, field.lower(), new_value)
+            else:
+                mt.METRICS.increment("validation_failures")
+                messages = list(filter(None, 
+                    edit_contact._Contact__error_message))
+                print(messages)
+                return contact_list
+
+    elif edit_type in FIELD_NAMES[1:]:
+        print("Current Value for field {}: {}".format(edit_type, 
+            getattr(edit_contact, edit_type.lower())))
+        new_value = input("New Value for field {}: ".format(edit_type))
+        # validate that new_value is actually different from the
+        # current value and passes its field-specific validations
+        if edit_contact.validate_contact_field_update(edit_type, 
+            new_value):
+            setattr(edit_contact, edit_type.lower(), new_value)
+        else:
+            mt.METRICS.increment("validation_failures")
+            print(edit_contact._Contact__error_message)
+            return contact_list
+    else:
+        print("Invalid column specified. Record not updated.")
+        edit_contact = None
 
     # Verifies that the edit_contact is not None and that it is unique from 
-    # other contacts in the contact_list
-    if edit_contact != None and edit_contact.is_unique(contact_list):
-        contact_list[contact_list_index] = edit_contact
-        print("Successfully edited Contact: {}".format(input_str))
+    # other contacts in the contact_list, then replaces the record in place
+    if edit_contact is not None:
+        if contact_list.replace(input_str, edit_contact):
+            record_change(contact_list, "EDIT", edit_contact)
+            print("Successfully edited Contact: {}".format(input_str))
+        else:
+            print("Duplicate Contact detected. Record not updated.")
     return contact_list
         
 
 
-def delete_contact(contact_list:list) -> list:
+def delete_contact(contact_list:ContactStore) -> ContactStore:
     '''
         Takes in a contact_list parameter and prompts the user for an id in
         that list. User must confirm they want to delete the record, since 
         this action is permanent. Once confirmed, the record is deleted and
         removed from the contact_list.
     '''
-    del_contact = None
     input_str = input("Enter ID: ")
     
     confirm_input = confirm("Are you sure (Yes/No): ")
     if confirm_input == "YES":
-
-        for con in contact_list:
-            if con.id == input_str:
-                del_contact = con
-                break
-        if del_contact != None:    
-            print("Successfully Deleted Contact ID: {}".format(del_contact.id))
-            contact_list.remove(del_contact)
+        if not apply_delete(contact_list, input_str):    
+            print("Successfully Deleted Contact ID: {}".format(input_str))
         else:
             print("Invalid ID value. No records deleted.")
     else:
@@ -246,64 +568,467 @@ def delete_contact(contact_list:list) -> list:
     return contact_list
 
 
-def import_csv_file(filepath:str) -> list:
+def apply_edit(contact_list:ContactStore, id:str, values:list) -> list:
+    '''
+        Update the Contact with the provided ID with values (every field 
+        except ID), where an empty value keeps the current value. Every 
+        changed value is validated with the same rules as the 'EDIT' 
+        command. Does not ask the user for anything. Returns a list of
+        error messages, which is empty if the Contact was updated.
+    '''
+    con = contact_list.get(id)
+    if con is None:
+        return ["Invalid ID value: {}".format(id)]
+
+    # re-instantiate Contact object so the record is not modified before
+    # all validations have passed
+    edit_contact = Contact(con.to_list())
+    for field, new_value in zip(FIELD_NAMES[1:], values):
+        if new_value == "" or new_value == getattr(edit_contact, 
+            field.lower()):
+            continue
+        if not edit_contact.validate_contact_field_update(field, new_value):
+            mt.METRICS.increment("validation_failures")
+            return list(filter(None, edit_contact._Contact__error_message))
+        setattr(edit_contact, field.lower(), new_value)
+
+    if not contact_list.replace(id, edit_contact):
+        return ["Duplicate Contact detected."]
+    record_change(contact_list, "EDIT", edit_contact)
+    return []
+
+def apply_delete(contact_list:ContactStore, id:str) -> list:
     '''
-    Import a csv file with user contacts.  
-    If no file selected, then a default 'test.txt' will be loaded.
+        Delete the Contact with the provided ID from contact_list. Does not
+        ask the user for anything. Returns a list of error messages, which
+        is empty if the Contact was deleted.
+    '''
+    del_contact = contact_list.remove(id)
+    if del_contact is None:
+        return ["Invalid ID value: {}".format(id)]
+    record_change(contact_list, "DELETE", id=del_contact.id)
+    return []
+
+def import_csv_file(filepath:str, 
+    contact_list:ContactStore=None) -> ContactStore:
+    '''
+    Import a csv file with user contacts into a new ContactStore, or into
+    contact_list if it is a persistent store. A directory or glob pattern
+    imports every .txt and .csv file it holds or matches, in parallel.
+    Lines with invalid field values are rejected.
+    If no file selected, then a default 'test.txt' will be loaded. Returns
+    None, and nothing is imported, if the file has the wrong type.
     '''
     error_txt = "ERROR: Invalid file type discovered. File extension must be: "
-    contact_list = []
-    extension = filepath.split(".")[1]
-    if filepath != "" and os.path.isfile(filepath):
-        if extension.lower() == "txt" or extension.lower() == "csv":
-            contact_list = fr.read_file(filepath)
-            print("LOG: Successfully loaded {} contacts!".format(
-                len(contact_list)))
-        else:
-            print(error_txt, "{}".format(".txt or .csv"))
-    else:
+    source = import_source(filepath)
+    if source is None:
+        print(error_txt, "{}".format(".txt or .csv"))
+        return None
+    if contact_list is None or not contact_list.persistent:
+        contact_list = ContactStore()
+    filepaths = fr.expand_paths(filepath)
+    if source != filepath:
         # use provided test file
-        print("LOG: Provided test file 'test.txt' used.")
-        contact_list = fr.read_file('test.txt')
+        print("LOG: Provided test file '{}' used.".format(DEFAULT_FILE))
+        contact_list.load([fr.read_file(DEFAULT_FILE, validate_fields=True)])
         print(error_txt, "{}".format(".txt or .csv"))
+    elif filepaths != [filepath]:
+        contact_list = load_contact_files(filepaths, contact_list)
+        print("LOG: Successfully loaded {} contacts!".format(
+            len(contact_list)))
+    else:
+        contact_list = load_contacts(filepath, contact_list)
+        print("LOG: Successfully loaded {} contacts!".format(
+            len(contact_list)))
 
     return contact_list
+
+def import_source(filepath:str) -> str:
+    '''
+    Return the path import_csv_file loads for filepath: filepath itself if
+    it is a contact file or a directory or pattern of them, the default
+    'test.txt' if no such file exists, or None if it is a file with the
+    wrong type.
+    '''
+    filepaths = fr.expand_paths(filepath)
+    if filepaths and filepaths != [filepath]:
+        return filepath
+    if filepath != "" and os.path.isfile(filepath):
+        return filepath if fr.is_contact_file(filepath) else None
+    return DEFAULT_FILE
+
+def merge_csv_file(contact_list:ContactStore, filepath:str) -> dict:
+    '''
+        Merge a csv file into contact_list instead of replacing it. Each 
+        line of the file is joined against the list by its ID (8 column 
+        lines) or by its values (7 column lines) with hash lookups, so the
+        cost depends on the size of the file and not the size of the list.
+        New records are inserted, changed records are updated in place and
+        unchanged or conflicting records are skipped. Lines with invalid 
+        values are rejected. Returns a dictionary of the counts.
+    '''
+    counts = {"inserted": 0, "updated": 0, "skipped": 0, "rejected": 0}
+    if not os.path.isfile(filepath):
+        print("ERROR: File not found: {}".format(filepath))
+        return counts
+    if not fr.is_contact_file(filepath):
+        print("ERROR: Invalid file type discovered. File extension must be: "
+            ".txt or .csv")
+        return counts
+
+    stats = dict()
+    for rows in fr.iter_rows(filepath, stats=stats, validate_fields=True):
+        merge_rows(contact_list, rows, counts)
+    counts["rejected"] = stats["rejected"]
+    for key, value in counts.items():
+        mt.METRICS.increment("merge_" + key, value)
+    print("LOG: Read {} lines in file: {}".format(stats["lines"], filepath))
+    print("LOG: Merged file: {} inserted, {} updated, {} skipped, {} "
+        "rejected.".format(counts["inserted"], counts["updated"], 
+        counts["skipped"], counts["rejected"]))
+    return counts
+
+def merge_rows(contact_list:ContactStore, rows:list, counts:dict) -> None:
+    '''
+        Merge a list of validated (line_number, values) rows into 
+        contact_list, as read by fr.iter_rows, adding each row to the
+        inserted, updated or skipped count in counts.
+    '''
+    for line_counter, line in rows:
+        if len(line) == 8:
+            contact = Contact(line)
+            existing = contact_list.get(contact.id)
+        else:
+            contact = Contact([None] + line)
+            existing = None
+
+        if existing is None:
+            # a 7 column line, or an ID which is not in the list yet. 
+            # Records whose values are already in the list are skipped.
+            if not contact_list.is_unique(contact):
+                counts["skipped"] += 1
+                continue
+            if contact.id is None or contact.id in contact_list:
+                contact.id = contact_list.allocate_id()
+            contact_list.add(contact)
+            record_change(contact_list, "ADD", contact)
+            counts["inserted"] += 1
+        elif existing.to_list()[1:] == contact.to_list()[1:]:
+            counts["skipped"] += 1
+        elif contact_list.replace(contact.id, contact):
+            record_change(contact_list, "EDIT", contact)
+            counts["updated"] += 1
+        else:
+            # the new values duplicate a different record
+            counts["skipped"] += 1
+
+def watch_file(contact_list:ContactStore, arguments:list=None) -> dict:
+    '''
+        Takes in a contact_list parameter and prompts the user for a file
+        to watch, then checks it every WATCH_INTERVAL seconds until the user
+        presses Ctrl+C, or for the number of seconds in the arguments. Lines
+        appended to the file are merged into contact_list like 'IMPORT 
+        MERGE'. If the file is rotated, truncated or rewritten, the whole 
+        file is merged again. The position reached is saved, so watching
+        the same file again only reads the lines added since. Returns a 
+        dictionary of the counts.
+    '''
+    arguments = arguments if arguments is not None else []
+    seconds = None
+    if arguments and arguments[0].isdecimal():
+        seconds = int(arguments[0])
+    elif arguments:
+        print("ERROR: Use 'WATCH' or 'WATCH <seconds>'.")
+        return None
+    filepath = input("Enter path of the file to watch: ")
+    if not os.path.isfile(filepath):
+        print("ERROR: File not found: {}".format(filepath))
+        return None
+    if not fr.is_contact_file(filepath) or filepath.lower().endswith(".gz"):
+        print("ERROR: Invalid file type discovered. File extension must be: "
+            ".txt or .csv")
+        return None
+
+    watcher = fr.FileWatcher.resume(filepath)
+    counts = {"inserted": 0, "updated": 0, "skipped": 0, "rejected": 0}
+    print("LOG: Watching file: {} from line {}, press Ctrl+C to stop."
+        .format(filepath, watcher.lines + 1))
+    end = time.monotonic() + seconds if seconds is not None else None
+    last_status = None
+    try:
+        while True:
+            status = watcher.poll()
+            if status == watcher.MISSING:
+                if last_status != watcher.MISSING:
+                    print("LOG: File not found, waiting for: {}".format(
+                        filepath))
+            elif status != watcher.UNCHANGED:
+                if status == watcher.RELOADED:
+                    print("LOG: File was replaced or truncated, reading it "
+                        "again from the start.")
+                change_counts = {"inserted": 0, "updated": 0, "skipped": 0}
+                stats = dict()
+                for rows in watcher.iter_rows(stats=stats):
+                    merge_rows(contact_list, rows, change_counts)
+                change_counts["rejected"] = stats["rejected"]
+                watcher.save()
+                if stats["lines"] > 0:
+                    for key, value in change_counts.items():
+                        counts[key] += value
+                        mt.METRICS.increment("merge_" + key, value)
+                    print("LOG: Read {} new lines: {} inserted, {} updated,"
+                        " {} skipped, {} rejected.".format(stats["lines"],
+                        change_counts["inserted"], change_counts["updated"],
+                        change_counts["skipped"], change_counts["rejected"]))
+            last_status = status
+            if end is not None and time.monotonic() >= end:
+                break
+            time.sleep(WATCH_INTERVAL)
+    except KeyboardInterrupt:
+        pass
+    watcher.save()
+    print("LOG: Stopped watching file: {} inserted, {} updated, {} skipped,"
+        " {} rejected.".format(counts["inserted"], counts["updated"],
+        counts["skipped"], counts["rejected"]))
+    return counts
+
+
+def load_contacts(filepath:str, 
+    contact_list:ContactStore=None) -> ContactStore:
+    '''
+        Stream the file at filepath into a new ContactStore one batch of
+        Contacts at a time, so the whole file is never held in memory. Each
+        batch is checked by the batch validator and lines with invalid
+        field values are rejected. Very large files are parsed with a 
+        process pool when fr.use_parallel allows it, other files are 
+        streamed. If contact_list is a persistent store (such as a SQLite
+        database), the file replaces its records instead, in a single 
+        transaction.
+    '''
+    if contact_list is None or not contact_list.persistent:
+        contact_list = ContactStore()
+    stats = dict()
+    try:
+        # very large files are parsed on every cpu core, in a single batch
+        if fr.use_parallel(filepath):
+            batches = [fr.read_file_parallel(filepath, stats=stats,
+                validate_fields=True)]
+        else:
+            batches = fr.iter_contacts(filepath, stats=stats,
+                validate_fields=True)
+        contact_list.load(batches)
+        # the search index is built once the whole file has been read
+        contact_list.build_index()
+    except Exception:
+        print("Invalid Data detected and no data has been imported.")
+        if not contact_list.persistent:
+            contact_list = ContactStore()
+    else:
+        mt.METRICS.record_import(stats)
+        print("LOG: Read {} lines in file: {}".format(stats["lines"],
+            filepath))
+    return contact_list
     
 
-def export_contacts(contact_list:list) -> None:
+def load_contact_files(filepaths:list,
+    contact_list:ContactStore=None) -> ContactStore:
+    '''
+        Read every file in filepaths at once on a pool of workers and merge
+        them, in the order of filepaths, into one deduplicated ContactStore
+        (or into contact_list if it is a persistent store). IDs are 
+        assigned as if the files were one file, so the same files always 
+        give the same IDs. A file which cannot be read is skipped.
+    '''
+    if contact_list is None or not contact_list.persistent:
+        contact_list = ContactStore()
+    stats = dict()
+    start = time.perf_counter()
+    try:
+        contact_list.load(fr.iter_files_parallel(filepaths, stats=stats,
+            validate_fields=True))
+        contact_list.build_index()
+    except Exception:
+        print("Invalid Data detected and no data has been imported.")
+        if not contact_list.persistent:
+            contact_list = ContactStore()
+    else:
+        mt.METRICS.record_import(stats)
+        print("LOG: Read {} lines in {} files in {:.2f} seconds ({} files "
+            "failed).".format(stats["lines"], len(filepaths), 
+            time.perf_counter() - start, stats["failed_files"]))
+        if stats["replaced_ids"]:
+            print("LOG: {} IDs used by an earlier line were replaced.".format(
+                stats["replaced_ids"]))
+    return contact_list
+
+def save_snapshot(contact_list:ContactStore) -> None:
+    '''
+        Takes in a contact_list parameter and prompts the user for a file
+        path, then saves the list to that file as a binary snapshot which
+        can be loaded again almost instantly with the 'LOAD' command.
+    '''
+    filepath = input("Enter path of snapshot file (blank for '{}'): "
+        .format(ss.SNAPSHOT_FILE))
+    if filepath == "":
+        filepath = ss.SNAPSHOT_FILE
+    count = ss.save_snapshot(contact_list, filepath)
+    print("LOG: Saved {} contacts to snapshot: {}".format(count, filepath))
+    # the snapshot holds every change so far, so the journal starts over
+    if contact_list.journal is not None:
+        contact_list.journal.reset(filepath)
+
+def load_snapshot(filepath:str, 
+    contact_list:ContactStore=None) -> ContactStore:
+    '''
+        Open the snapshot file at filepath and return a ContactStore over
+        it. Records are decoded as they are used, and the IDs are the same
+        as when the snapshot was saved. If contact_list is a persistent 
+        store, the snapshot's records replace its records instead. Returns
+        None if the file is not a valid snapshot.
+    '''
+    try:
+        reader = ss.load_snapshot(filepath)
+    except (OSError, ss.SnapshotError):
+        print("ERROR: Unable to load snapshot file: {}".format(filepath))
+        return None
+    print("LOG: Loaded snapshot of {} contacts: {}".format(len(reader),
+        filepath))
+    if contact_list is not None and contact_list.persistent:
+        contact_list.load([reader])
+        reader.close()
+        return contact_list
+    return ContactStore.from_sequence(reader)
+
+def export_contacts(contact_list:ContactStore, arguments:list=None) -> None:
     '''
         Takes in a contact_list parameter and exports that list in the form
         of a text file where each Contact is a line with comma separated 
-        values. Creates a unique filename using a unix timestamp.
-    '''
-    uid = int(time.time())
-    export_filename = "contact_list_export__" + str(uid) + ".txt"
-    file = open(export_filename, 'w')
-    file.write(",".join(FIELD_NAMES))
-    for item in contact_list:
-        file.write("\n" + item.__repr__())
-    file.close()
-    print("Filename: {} created!".format(export_filename))
-
-def generateUniqueID(id_list:list) -> str:
-    '''
-        Creates a random int between 1 and 1000 (arbitrary limit). 
-        Then check if that id exists in the id_list parameter.
-        If True, then generate new random id value
-        If False, return unique id value
-    '''
-    is_unique = True
-    # create loop to ensure a unique id is provided to every entry
-    while is_unique:
-        # create random ID value (int)
-        randId = random.randint(1, 1000)
-        # check to see if dictionary already has that key,
-        # if True, then repeat loop and generate new ID
-        # if False, then exit loop with unique ID
-        is_unique = randId in id_list
-
-    return str(randId)
+        values. Creates a unique filename using a unix timestamp. The file is
+        streamed through a buffered csv writer (gzip compressed if the 
+        arguments include 'GZIP') and only given its final name once it is
+        complete. The arguments 'PARTITION BY <field>' write a folder with 
+        one file for each value of the field and a manifest instead.
+    '''
+    arguments = arguments if arguments is not None else []
+    compress = "GZIP" in arguments
+    if "PARTITION" not in arguments:
+        export_filename = cw.export_file(contact_list, compress=compress)
+        print("Filename: {} created!".format(export_filename))
+        return
+
+    index = arguments.index("PARTITION")
+    field = None
+    if arguments[index + 1:index + 2] == ["BY"]:
+        field = (arguments[index + 2:index + 3] or [None])[0]
+    if field not in FIELD_NAMES[1:]:
+        print("ERROR: Use 'EXPORT PARTITION BY <field>' with one of the "
+            "fields: {}".format(", ".join(FIELD_NAMES[1:])))
+        return
+    start = time.perf_counter()
+    folder = cw.export_partitions(contact_list, field, compress=compress)
+    print("Folder: {} created in {:.2f} seconds, see {} for every "
+        "partition!".format(folder, time.perf_counter() - start, 
+        cw.MANIFEST_FILE))
+
+def record_change(contact_list:ContactStore, op:str, contact:Contact=None,
+    id:str=None) -> None:
+    '''
+        Append an ADD, EDIT or DELETE to the contact_list's journal, if it
+        has one, so the change survives a restart without an export.
+    '''
+    if contact_list.journal is not None:
+        contact_list.journal.append(op, contact, id)
+
+def open_journal(default_filepath:str) -> ContactStore:
+    '''
+        Open the change journal and return the contact list it describes.
+        The journal's base file (a snapshot or export) is loaded and every
+        change recorded since is replayed on top of it. If there is no
+        journal, or its base file is missing, default_filepath is loaded.
+        A new journal is only started on top of it if the journal holds no
+        changes, otherwise its changes are replayed on default_filepath and
+        kept, so they are never thrown away.
+    '''
+    journal = jn.Journal()
+    changes = journal.read()
+    contact_list = None
+    # the base can be a directory or glob pattern of imported files
+    if journal.base is not None and fr.expand_paths(journal.base):
+        print("LOG: Loading journal base file: '{}' ...".format(
+            journal.base))
+        contact_list = load_file(journal.base)
+    if contact_list is None:
+        print("LOG: Loading file: '{}' ...".format(default_filepath))
+        contact_list = load_file(default_filepath)
+        if changes:
+            print("ERROR: Journal base file not found: '{}'. Its {} changes "
+                "are kept in '{}' and replayed on top of '{}', use 'COMPACT'"
+                " to fold them into a new export.".format(journal.base, 
+                len(changes), journal.filepath, default_filepath))
+        else:
+            journal.reset(default_filepath)
+    if changes:
+        applied = jn.replay(contact_list, changes)
+        print("LOG: Replayed {} of {} journal changes.".format(applied, 
+            len(changes)))
+        if journal.count > jn.COMPACT_THRESHOLD:
+            print("LOG: The journal holds {} changes, use 'COMPACT' to "
+                "fold them into a new export.".format(journal.count))
+    contact_list.journal = journal
+    return contact_list
+
+def load_file(filepath:str, contact_list:ContactStore=None) -> ContactStore:
+    '''
+        Load a snapshot or a text file, based on the file's contents.
+    '''
+    if ss.is_snapshot(filepath):
+        return load_snapshot(filepath, contact_list)
+    return import_csv_file(filepath, contact_list)
+
+def start_journal(contact_list:ContactStore, journal:object, 
+    base:str) -> ContactStore:
+    '''
+        Attach journal to a newly imported or loaded contact_list and start
+        it over on top of the file the list was loaded from.
+    '''
+    if journal is not None:
+        journal.reset(base)
+        contact_list.journal = journal
+    return contact_list
 
+def compact_journal(contact_list:ContactStore) -> None:
+    '''
+        Takes in a contact_list parameter and folds its journal into a new
+        export file. The export becomes the journal's base file and the 
+        journal starts over empty, so the next start up does not have to 
+        replay every change.
+    '''
+    if contact_list.journal is None:
+        print("ERROR: There is no journal to compact.")
+        return
+    count = contact_list.journal.count
+    export_filename = cw.export_file(contact_list)
+    contact_list.journal.reset(export_filename)
+    print("LOG: Compacted {} journal changes into: {}".format(count,
+        export_filename))
+
+def show_stats(contact_list:ContactStore) -> None:
+    '''
+        Takes in a contact_list parameter and prints the metrics collected
+        since the application started: the latency, calls and errors of 
+        every command, the size of the contact list and the import counts.
+    '''
+    record_gauges(contact_list)
+    sys.stdout.write(mt.METRICS.report())
+
+def record_gauges(contact_list:ContactStore) -> None:
+    '''
+        Set the gauges which describe the current state of the application:
+        the size of the contact list and the validation cache's counters.
+    '''
+    mt.METRICS.set_gauge("contact_list_size", len(contact_list))
+    for key, value in cv.CACHE.stats().items():
+        mt.METRICS.set_gauge("validation_cache_" + key, value)
 
 def confirm(instructions:str) -> str:
     ''' 
@@ -0,0 +1,77 @@
+import csv
+import os
+
+import app_functions as af
+
+# number of values after the operation on each line of a batch file
+OPERATION_VALUES = {"ADD": 7, "EDIT": 8, "DELETE": 1}
+REPORT_HEADER = ["LINE", "OP", "ID", "RESULT", "MESSAGE"]
+# size of the read and write buffers of the batch and report files
+BUFFER_SIZE = 1024 * 1024
+
+
+def report_path(filepath:str) -> str:
+    '''
+        Return the path of the result report for the batch file at filepath.
+    '''
+    return os.path.splitext(filepath)[0] + "_results.csv"
+
+def run_batch(contact_list, filepath:str, report_filepath:str=None) -> dict:
+    '''
+        Apply every operation in the batch file at filepath to contact_list
+        in one pass, and write a result line for each one to a csv report.
+        Each line of the batch file is one of:
+
+            ADD,first_name,last_name,phone_number,email,company,title,
+                relationship
+            EDIT,id,first_name,last_name,phone_number,email,company,title,
+                relationship (an empty value keeps the current value)
+            DELETE,id
+
+        Blank lines, lines starting with '#' and a header line starting
+        with 'OP' are skipped. Operations are validated with the same rules
+        as the interactive commands, and nothing is printed per line.
+        Returns a dictionary counting the lines which were applied, failed
+        or skipped.
+    '''
+    if report_filepath is None:
+        report_filepath = report_path(filepath)
+    counts = {"applied": 0, "failed": 0, "skipped": 0}
+
+    with open(filepath, 'r', newline='', buffering=BUFFER_SIZE) as file, \
+        open(report_filepath, 'w', newline='',
+        buffering=BUFFER_SIZE) as report_file:
+        report = csv.writer(report_file, lineterminator="\n")
+        report.writerow(REPORT_HEADER)
+        for line_counter, line in enumerate(csv.reader(file), 1):
+            if (not line or line[0].startswith("#")
+                or line[0].strip().upper() == "OP"):
+                counts["skipped"] += 1
+                continue
+
+            op = line[0].strip().upper()
+            values = [value.strip() for value in line[1:]]
+            id = ""
+            if op not in OPERATION_VALUES:
+                messages = ["Unknown operation: {}".format(line[0])]
+            elif len(values) != OPERATION_VALUES[op]:
+                messages = ["{} requires {} values, found {}".format(op,
+                    OPERATION_VALUES[op], len(values))]
+            elif op == "ADD":
+                id = contact_list.allocate_id()
+                messages = af.apply_add(contact_list, values, id)
+            elif op == "EDIT":
+                id = values[0]
+                messages = af.apply_edit(contact_list, id, values[1:])
+            else:
+                id = values[0]
+                messages = af.apply_delete(contact_list, id)
+
+            if messages:
+                counts["failed"] += 1
+                report.writerow([line_counter, op, id, "ERROR",
+                    "; ".join(messages)])
+            else:
+                counts["applied"] += 1
+                report.writerow([line_counter, op, id, "OK", ""])
+    return counts
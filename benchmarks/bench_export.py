@@ -0,0 +1,71 @@
+'''
+    Benchmark for exporting contacts. Times the original one write per
+    record export against the buffered contact_writer export, with and
+    without gzip compression, and prints the rows per second of each.
+
+    Usage: python benchmarks/bench_export.py [rows]   (default 1,000,000)
+'''
+import os
+import sys
+import tempfile
+import time
+
+# allow the benchmark to be run from the project folder or this folder
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+    ".."))
+
+import app_functions as af
+import contact_writer as cw
+from contact import Contact
+
+
+def make_contacts(rows:int) -> list:
+    '''
+        Create a list of rows Contacts with repetitive values. One in every
+        hundred companies contains a comma which needs quoting.
+    '''
+    companies = ["Test Company", "FAANG Company", "", "Paco Taco"]
+    relationships = ["Friend", "Family", "Colleauge", "Former Supervisor"]
+    contacts = []
+    for i in range(rows):
+        contacts.append(Contact([str(i + 1), "First{}".format(i % 5000),
+            "Last{}".format(i % 1000), "555-{:03d}-{:04d}".format(i % 1000,
+            i % 10000), "user{}@email.com".format(i),
+            "Acme, Inc." if i % 100 == 0 else companies[i % 4],
+            "Title {}".format(i % 50), relationships[i % 4]]))
+    return contacts
+
+def legacy_export(contacts:list, directory:str) -> str:
+    '''
+        The original export: one small write per record using __repr__.
+    '''
+    export_filename = os.path.join(directory, "legacy_export.txt")
+    file = open(export_filename, 'w')
+    file.write(",".join(af.FIELD_NAMES))
+    for item in contacts:
+        file.write("\n" + item.__repr__())
+    file.close()
+    return export_filename
+
+def time_export(name:str, function, rows:int) -> None:
+    '''
+        Run an export function once and print its time and throughput.
+    '''
+    start = time.perf_counter()
+    path = function()
+    elapsed = time.perf_counter() - start
+    print("{:<20} {:>8.2f}s {:>12,.0f} rows/s {:>10,.1f} MB".format(name,
+        elapsed, rows / elapsed, os.path.getsize(path) / 1e6))
+
+if __name__ == '__main__':
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    print("Creating {:,} contacts ...".format(rows))
+    contacts = make_contacts(rows)
+
+    with tempfile.TemporaryDirectory() as directory:
+        time_export("legacy", lambda: legacy_export(contacts, directory),
+            rows)
+        time_export("buffered csv", lambda: cw.export_file(contacts,
+            directory), rows)
+        time_export("buffered csv gzip", lambda: cw.export_file(contacts,
+            directory, compress=True), rows)
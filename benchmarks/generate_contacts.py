@@ -0,0 +1,96 @@
+'''
+    Seeded generator of synthetic contact files for the benchmarks. Files
+    have 7 columns (no ID) or 8 columns (with an ID), and a fraction of the
+    lines can be made deliberately invalid. The same seed always produces
+    the same file.
+
+    Usage: python benchmarks/generate_contacts.py ROWS PATH [--columns 8]
+               [--invalid 0.05] [--seed 1]
+'''
+import argparse
+import csv
+import random
+
+FIRST_NAMES = ["John", "Jane", "Bob", "Jerry", "Billy", "Matt", "Brian",
+    "Melinda", "David", "Maria", "Wei", "Aisha", "Carlos", "Priya", "Olga",
+    "Kenji", "Fatima", "Liam", "Sofia", "Noah"]
+LAST_NAMES = ["Doe", "Deer", "Smith", "Sanchez", "Wilson", "Schmidt",
+    "Sharp", "Garcia", "Chen", "Khan", "Silva", "Patel", "Ivanova", "Sato",
+    "Haddad", "Murphy", "Rossi", "Nguyen", "Kim", "Brown"]
+DOMAINS = ["email.com", "test.com", "faang.com", "mail.org", "school.edu"]
+COMPANIES = ["Test Company", "FAANG Company", "Paco Taco", "Home Depot",
+    "Fairfield Elementary School", "Yale Alumni Association", "Acme, Inc.",
+    ""]
+TITLES = ["Technical Lead", "Software Developer", "General Manager",
+    "Sales Associate", "4th Grade Teacher", "Director", "Senior Software "
+    "Developer", ""]
+RELATIONSHIPS = ["Family", "Friend", "Supervisor", "Colleauge",
+    "Former Supervisor", "Former Colleauge"]
+HEADER = ["ID", "FIRST_NAME", "LAST_NAME", "PHONE_NUMBER", "EMAIL",
+    "COMPANY", "TITLE", "RELATIONSHIP"]
+
+
+def generate_rows(rows:int, seed:int=1, columns:int=7,
+    invalid_rate:float=0.0):
+    '''
+        Generate rows lists of contact values. Each row is unique, has an
+        ID first if columns is 8, and is made invalid with a probability of
+        invalid_rate (bad phone number, missing name, unknown relationship,
+        a value which is too long or the wrong number of columns).
+    '''
+    generator = random.Random(seed)
+    for index in range(rows):
+        first_name = generator.choice(FIRST_NAMES)
+        last_name = generator.choice(LAST_NAMES)
+        # the index in the email keeps every row unique
+        row = [first_name, last_name, "{:03d}-{:03d}-{:04d}".format(
+            generator.randrange(200, 1000), generator.randrange(1000),
+            generator.randrange(10000)), "{}.{}{}@{}".format(
+            first_name.lower(), last_name.lower(), index,
+            generator.choice(DOMAINS)), generator.choice(COMPANIES),
+            generator.choice(TITLES), generator.choice(RELATIONSHIPS)]
+        if columns == 8:
+            row.insert(0, str(index + 1))
+
+        if invalid_rate > 0 and generator.random() < invalid_rate:
+            offset = columns - 7
+            problem = generator.randrange(5)
+            if problem == 0:
+                row[offset + 2] = "555-CALL-NOW"
+            elif problem == 1:
+                row[offset] = ""
+            elif problem == 2:
+                row[offset + 6] = "Acquaintance"
+            elif problem == 3:
+                row[offset + 5] = "Chief " * 6
+            else:
+                row = row[:-2]
+        yield row
+
+def write_file(filepath:str, rows:int, seed:int=1, columns:int=7,
+    invalid_rate:float=0.0) -> str:
+    '''
+        Write a generated contact file to filepath and return the path. 
+        Like an export, 8 column files start with a header line.
+    '''
+    with open(filepath, 'w', newline='') as file:
+        writer = csv.writer(file, lineterminator="\n")
+        if columns == 8:
+            writer.writerow(HEADER)
+        writer.writerows(generate_rows(rows, seed, columns, invalid_rate))
+    return filepath
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generate a synthetic "
+        "contact file.")
+    parser.add_argument("rows", type=int, help="number of rows")
+    parser.add_argument("path", help="file to write")
+    parser.add_argument("--columns", type=int, choices=(7, 8), default=7,
+        help="7 columns, or 8 with an ID (default 7)")
+    parser.add_argument("--invalid", type=float, default=0.0,
+        help="fraction of invalid rows (default 0)")
+    parser.add_argument("--seed", type=int, default=1,
+        help="random seed (default 1)")
+    args = parser.parse_args()
+    write_file(args.path, args.rows, args.seed, args.columns, args.invalid)
+    print("Wrote {:,} rows to {}".format(args.rows, args.path))
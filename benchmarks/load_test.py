@@ -0,0 +1,200 @@
+'''
+    Load test for the contact server ('python app.py --serve'). Starts a
+    server in a temporary folder over a generated contact file (or uses a
+    running server with --url), then runs client threads which send a mix
+    of LIST, SEARCH, ADD, EDIT and DELETE requests for a fixed time. Prints
+    the requests per second and the p50 and p99 latency of each request.
+
+    Usage: python benchmarks/load_test.py [--clients 8] [--seconds 10]
+               [--contacts 100000] [--writes 0.1] [--url http://host:port]
+'''
+import argparse
+import http.client
+import json
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(BENCHMARK_DIR, "..", "app.py")
+sys.path.insert(0, BENCHMARK_DIR)
+
+from generate_contacts import write_file
+
+# seconds to wait for a started server to accept connections
+START_TIMEOUT = 120
+SEED = 1
+
+
+def percentile(latencies:list, fraction:float) -> float:
+    '''
+        Return the latency below which fraction of the sorted latencies
+        fall.
+    '''
+    if not latencies:
+        return 0.0
+    return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))]
+
+def free_port() -> int:
+    '''
+        Return a local port which is not in use.
+    '''
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_server(directory:str, contacts:int) -> tuple:
+    '''
+        Write a generated contact file to directory and start a server over
+        it, so the server's journal is also kept in directory. Returns the
+        server process and its port once it accepts connections.
+    '''
+    write_file(os.path.join(directory, "test.txt"), contacts, SEED,
+        columns=8)
+    port = free_port()
+    process = subprocess.Popen([sys.executable, os.path.abspath(APP_PATH),
+        "--serve", "--port", str(port)], cwd=directory,
+        stdout=subprocess.DEVNULL)
+    deadline = time.time() + START_TIMEOUT
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("The server stopped while starting.")
+        try:
+            socket.create_connection(("127.0.0.1", port), 1).close()
+            return (process, port)
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("The server did not start in time.")
+
+def run_client(host:str, port:int, seconds:float, writes:float, ids:list,
+    seed:int, results:dict) -> None:
+    '''
+        Send requests on one keep-alive connection for seconds. A fraction
+        writes of the requests add, edit or delete a contact, the rest list
+        a page or look up a contact by ID. Latencies are added to results
+        by request name.
+    '''
+    generator = random.Random(seed)
+    connection = http.client.HTTPConnection(host, port)
+    added = []
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        if generator.random() < writes:
+            choice = generator.random()
+            if choice < 0.4 or not added:
+                name, method, path = "ADD", "POST", "/contacts"
+                body = {"first_name": "Load", "last_name": "Test{}".format(
+                    seed), "phone_number": "555-555-5555", "email":
+                    "load{}.{}@test.com".format(seed, len(added)),
+                    "relationship": "Friend"}
+            elif choice < 0.8:
+                name, method = "EDIT", "PUT"
+                path = "/contacts/{}".format(generator.choice(added))
+                body = {"title": "Title {}".format(generator.randrange(100))}
+            else:
+                name, method = "DELETE", "DELETE"
+                path = "/contacts/{}".format(added.pop())
+                body = None
+        elif generator.random() < 0.2:
+            name, method, body = "LIST", "GET", None
+            path = "/contacts?page={}&sort=LAST_NAME".format(
+                generator.randrange(1, 50))
+        else:
+            name, method, body = "SEARCH", "GET", None
+            path = "/contacts/{}".format(generator.choice(ids))
+
+        data = json.dumps(body) if body is not None else None
+        start = time.perf_counter()
+        connection.request(method, path, data,
+            {"Content-Type": "application/json"})
+        response = connection.getresponse()
+        payload = response.read()
+        latency = time.perf_counter() - start
+        if name == "ADD" and response.status == 201:
+            added.append(json.loads(payload)["id"])
+        results.setdefault(name, []).append(latency)
+        if response.status >= 500:
+            results.setdefault("ERRORS", []).append(latency)
+    connection.close()
+
+def run_load(host:str, port:int, clients:int, seconds:float, writes:float,
+    ids:list) -> None:
+    '''
+        Run clients threads against the server and print the results.
+    '''
+    results = [dict() for client in range(clients)]
+    threads = [threading.Thread(target=run_client, args=(host, port,
+        seconds, writes, ids, SEED + client, results[client]))
+        for client in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    by_name = dict()
+    for client_results in results:
+        for name, latencies in client_results.items():
+            by_name.setdefault(name, []).extend(latencies)
+    errors = len(by_name.pop("ERRORS", []))
+    every = sorted([latency for latencies in by_name.values()
+        for latency in latencies])
+    print("{:<8} {:>9} {:>10} {:>10} {:>10}".format("REQUEST", "COUNT",
+        "REQ/S", "P50_MS", "P99_MS"))
+    for name, latencies in sorted(by_name.items()) + [("TOTAL", every)]:
+        latencies.sort()
+        print("{:<8} {:>9,} {:>10,.0f} {:>10.2f} {:>10.2f}".format(name,
+            len(latencies), len(latencies) / elapsed,
+            percentile(latencies, 0.50) * 1000,
+            percentile(latencies, 0.99) * 1000))
+    print("{} clients for {:.1f} seconds, {} server errors.".format(clients,
+        elapsed, errors))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Load test the contact "
+        "server.")
+    parser.add_argument("--clients", type=int, default=8,
+        help="number of client threads (default 8)")
+    parser.add_argument("--seconds", type=float, default=10,
+        help="length of the test (default 10)")
+    parser.add_argument("--contacts", type=int, default=100000,
+        help="number of contacts in the started server (default 100000)")
+    parser.add_argument("--writes", type=float, default=0.1,
+        help="fraction of requests which are writes (default 0.1)")
+    parser.add_argument("--url", help="test a running server instead of "
+        "starting one, such as http://127.0.0.1:8521")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        process = None
+        if args.url is not None:
+            url = urlsplit(args.url)
+            host, port = url.hostname, url.port
+        else:
+            print("Starting a server with {:,} contacts ...".format(
+                args.contacts))
+            process, port = start_server(directory, args.contacts)
+            host = "127.0.0.1"
+
+        # the IDs looked up by SEARCH requests
+        connection = http.client.HTTPConnection(host, port)
+        connection.request("GET", "/contacts?size=1000")
+        ids = [contact["id"] for contact
+            in json.loads(connection.getresponse().read())["contacts"]]
+        connection.close()
+        try:
+            run_load(host, port, args.clients, args.seconds, args.writes,
+                ids)
+        finally:
+            if process is not None:
+                process.send_signal(signal.SIGINT)
+                process.wait()
@@ -0,0 +1,208 @@
+'''
+    Benchmark suite for the contact list. Generates seeded synthetic files
+    of each size, then times and memory profiles reading, importing, the
+    uniqueness check used by ADD, the lookups used by EDIT and DELETE,
+    LIST rendering and EXPORT. Results are written to a JSON file which
+    can be compared with the results of another revision.
+
+    Usage: python benchmarks/run_benchmarks.py [--sizes 1000 100000 1000000]
+               [--output results.json] [--compare old_results.json]
+'''
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# allow the benchmarks to be run from the project folder or this folder
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARK_DIR, ".."))
+
+import app_functions as af
+import contact_writer as cw
+import csv_filereader as fr
+from contact import Contact
+from generate_contacts import write_file
+
+DEFAULT_SIZES = [1000, 100000, 1000000]
+# number of lookups timed by the ADD, EDIT and DELETE benchmarks
+LOOKUPS = 1000
+# fraction of invalid lines in the invalid files
+INVALID_RATE = 0.05
+SEED = 1
+
+
+def measure(name:str, size:int, rows:int, function,
+    memory:bool=True) -> dict:
+    '''
+        Run function, which handles rows records of a list of size records,
+        once to time it and, if memory is True, once more under tracemalloc
+        to find its peak memory use. Anything printed by the function is
+        discarded. Returns a result dictionary.
+    '''
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        function()
+        seconds = time.perf_counter() - start
+        peak = None
+        if memory:
+            tracemalloc.start()
+            function()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+    result = {"name": name, "size": size, "rows": rows,
+        "seconds": round(seconds, 6),
+        "rows_per_second": round(rows / seconds) if seconds > 0 else None,
+        "peak_memory_mb": round(peak / 1e6, 3) if peak is not None else None}
+    print("{:<26} {:>9,} rows {:>10.4f}s {:>14} {:>12}".format(name, rows,
+        seconds, "{:,} rows/s".format(result["rows_per_second"] or 0),
+        "{} MB".format(result["peak_memory_mb"]) if memory else ""))
+    return result
+
+def run_size(rows:int, directory:str, memory:bool=True) -> list:
+    '''
+        Generate the files for one size and run every benchmark on them.
+    '''
+    print("\n--- {:,} rows ---".format(rows))
+    valid_7 = write_file(os.path.join(directory, "valid_7.txt"), rows, SEED)
+    valid_8 = write_file(os.path.join(directory, "valid_8.txt"), rows, SEED,
+        columns=8)
+    invalid_7 = write_file(os.path.join(directory, "invalid_7.txt"), rows,
+        SEED, invalid_rate=INVALID_RATE)
+    invalid_8 = write_file(os.path.join(directory, "invalid_8.txt"), rows,
+        SEED, columns=8, invalid_rate=INVALID_RATE)
+
+    results = []
+    results.append(measure("read_file", rows, rows,
+        lambda: fr.read_file(valid_7), memory))
+    results.append(measure("read_file_invalid", rows, rows,
+        lambda: fr.read_file(invalid_7, validate_fields=True), memory))
+    results.append(measure("read_file_invalid_8_column", rows, rows,
+        lambda: fr.read_file(invalid_8, validate_fields=True), memory))
+    results.append(measure("import_csv_file", rows, rows,
+        lambda: af.import_csv_file(valid_7), memory))
+    results.append(measure("import_csv_file_8_column", rows, rows,
+        lambda: af.import_csv_file(valid_8), memory))
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        contact_list = af.import_csv_file(valid_8)
+    generator = random.Random(SEED)
+    ids = contact_list.ids()
+    sample_ids = [generator.choice(ids) for i in range(LOOKUPS)]
+    # half of the new contacts duplicate an existing record
+    new_contacts = [Contact(contact_list.get(id).to_list()) if index % 2
+        else Contact(["", "New", "Contact", "555-555-5555",
+        "new{}@email.com".format(index), "", "", "Friend"])
+        for index, id in enumerate(sample_ids)]
+
+    def add_lookups():
+        for contact in new_contacts:
+            contact.is_unique(contact_list)
+
+    def edit_lookups():
+        for id in sample_ids:
+            contact = contact_list.get(id)
+            contact_list.replace(id, Contact(contact.to_list()))
+
+    def delete_lookups():
+        for id in sample_ids:
+            contact = contact_list.remove(id)
+            if contact is not None:
+                contact_list.add(contact)
+
+    results.append(measure("add_unique_check", rows, LOOKUPS, add_lookups,
+        memory))
+    results.append(measure("edit_lookup", rows, LOOKUPS, edit_lookups,
+        memory))
+    results.append(measure("delete_lookup", rows, LOOKUPS, delete_lookups,
+        memory))
+    # LIST only renders a single page, so its rate is of the rows rendered
+    page_rows = min(af.PAGE_SIZE, rows)
+    results.append(measure("list_first_page", rows, page_rows,
+        lambda: af.list_contacts(contact_list, interactive=False), memory))
+    results.append(measure("list_sorted_page", rows, page_rows,
+        lambda: af.list_contacts(contact_list, ["LAST_NAME"],
+        interactive=False), memory))
+
+    export_directory = os.path.join(directory, "exports")
+    os.makedirs(export_directory, exist_ok=True)
+    results.append(measure("export_contacts", rows, rows,
+        lambda: cw.export_file(contact_list, export_directory), memory))
+    results.append(measure("export_contacts_gzip", rows, rows,
+        lambda: cw.export_file(contact_list, export_directory, True),
+        memory))
+    for name in os.listdir(export_directory):
+        os.unlink(os.path.join(export_directory, name))
+    return results
+
+def git_revision() -> str:
+    '''
+        Return the current git revision of the project, or None.
+    '''
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+            cwd=BENCHMARK_DIR, capture_output=True, text=True,
+            check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(results:list, filepath:str) -> None:
+    '''
+        Print the change in time of each benchmark against the results in
+        an earlier results file.
+    '''
+    with open(filepath) as file:
+        old = json.load(file)
+    old_results = {(result["name"], result["size"]): result
+        for result in old["results"]}
+    print("\nCompared with revision {} ({}):".format(old.get("revision"),
+        filepath))
+    for result in results:
+        old_result = old_results.get((result["name"], result["size"]))
+        if old_result is None or not old_result["seconds"]:
+            continue
+        ratio = result["seconds"] / old_result["seconds"]
+        print("{:<26} {:>9,} rows {:>10.4f}s -> {:>10.4f}s  {:>6.2f}x".format(
+            result["name"], result["size"], old_result["seconds"],
+            result["seconds"], ratio))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run the contact list "
+        "benchmarks.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+        help="numbers of rows to benchmark (default 1000 100000 1000000)")
+    parser.add_argument("--output", help="results file (default "
+        "benchmarks/results/<revision>_<timestamp>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare "
+        "against")
+    parser.add_argument("--no-memory", action="store_true",
+        help="skip the memory profiling runs")
+    args = parser.parse_args()
+
+    revision = git_revision()
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for rows in args.sizes:
+            results.extend(run_size(rows, directory, not args.no_memory))
+
+    output = args.output
+    if output is None:
+        output = os.path.join(BENCHMARK_DIR, "results", "{}_{}.json".format(
+            revision or "unknown", int(time.time())))
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as file:
+        json.dump({"revision": revision, "timestamp": int(time.time()),
+            "python": platform.python_version(),
+            "platform": platform.platform(), "cpu_count": os.cpu_count(),
+            "results": results}, file, indent=2)
+    print("\nResults written to: {}".format(output))
+    if args.compare is not None:
+        compare(results, args.compare)
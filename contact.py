@@ -1,5 +1,9 @@
 import string as s
-import app_functions as af
+import sys
+import contact_validator as cv
+
+FIELD_NAMES = ["ID","FIRST_NAME", "LAST_NAME", "PHONE_NUMBER", "EMAIL", 
+    "COMPANY", "TITLE", "RELATIONSHIP"]
 
 class Contact(object):
     '''
@@ -9,6 +13,11 @@ class Contact(object):
        created / modified. 
     '''
 
+    # fixed attributes instead of an instance __dict__ keep each Contact
+    # small when millions of records are loaded
+    __slots__ = ("id", "first_name", "last_name", "phone_number", "email",
+        "company", "title", "relationship", "__validation")
+
     def __init__(self, line:list=None):
         '''
             Initialize new instance of the Contact class using a line (list)
@@ -22,19 +31,56 @@ class Contact(object):
         self.last_name = line[2] if not str(line[2]).isspace() else ""
         self.phone_number = line[3] if not str(line[3]).isspace() else ""
         self.email = line[4] if not str(line[4]).isspace() else ""
-        self.company = line[5] if not str(line[5]).isspace() else ""
-        self.title = line[6] if not str(line[6]).isspace() else ""
-        self.relationship = line[7] if not str(line[7]).isspace() else ""
+        # company, title and relationship repeat across many records, so
+        # every record shares a single interned copy of each value
+        self.company = _intern(line[5]) if not str(line[5]).isspace() else ""
+        self.title = _intern(line[6]) if not str(line[6]).isspace() else ""
+        self.relationship = (_intern(line[7]) 
+            if not str(line[7]).isspace() else "")
+
+        # private validation state (add / edit) is only created when the
+        # Contact is validated, imported records never carry it
+        self.__validation = None
+
+    @property
+    def __is_valid(self) -> bool:
+        '''
+            Result of the last validation, False if never validated.
+        '''
+        return self.__validation_state()[0]
+
+    @__is_valid.setter
+    def __is_valid(self, value:bool) -> None:
+        self.__validation_state()[0] = value
+
+    @property
+    def __error_message(self) -> list:
+        '''
+            Error messages created by validation, used during add / edit.
+        '''
+        return self.__validation_state()[1]
 
-        # defining private attributes, used during validation (add / edit)
-        self.__is_valid = False
-        self.__error_message = list()
+    @__error_message.setter
+    def __error_message(self, value) -> None:
+        self.__validation_state()[1] = value
+
+    def __validation_state(self) -> list:
+        '''
+            Return the [is_valid, error_message] list of the instance, 
+            creating it on first use.
+        '''
+        if self.__validation is None:
+            self.__validation = [False, list()]
+        return self.__validation
 
     def __str__(self):
         '''
             Return custom string when printing a Contact class
         '''
-        return str(self.__class__) + ": " + str(self.__dict__)
+        values = dict()
+        for field in FIELD_NAMES:
+            values[field.lower()] = getattr(self, field.lower())
+        return str(self.__class__) + ": " + str(values)
 
     def __repr__(self) -> str:
         '''
@@ -45,80 +91,61 @@ class Contact(object):
             self.last_name, self.phone_number,self.email, self.company, 
             self.title, self.relationship)
     
+    def to_list(self) -> list:
+        '''
+            Return a list of the Contact's values in FIELD_NAMES order, which
+            can be used to create a copy of the Contact.
+        '''
+        return [self.id, self.first_name, self.last_name, self.phone_number,
+            self.email, self.company, self.title, self.relationship]
+
     def __eq__(self, __o: object) -> bool:
         '''
             custom implementation of the equals operator for the Contact
-            class. Uses the repr method to compare comma separated strings
-            (excluding the first value which is ID and is always unique)
+            class. Compares the dedup keys of both instances (every value
+            excluding ID, which is always unique)
         '''
-        # getting list of values excluding id (which will always be unique)
-        self_values = self.__repr__().split(',')[1:]
-        other_values = __o.__repr__().split(',')[1:]
-        return self_values == other_values
+        if not isinstance(__o, Contact):
+            return False
+        return self.dedup_key() == __o.dedup_key()
+
+    def dedup_key(self) -> tuple:
+        '''
+            Return a tuple of every value except ID. Two contacts with the
+            same dedup key are considered duplicates.
+        '''
+        return (self.first_name, self.last_name, self.phone_number, 
+            self.email, self.company, self.title, self.relationship)
 
     def __validate_input(self, field: str, user_input: str) -> tuple:
         '''
             Validates a user_input against specific validations per field.
             If a validation fails, return a false boolean and an error message
-            string.
-        '''
-        isValid = True
-        message = ""
-        # Global validation for every field
-        if len(user_input) >= 30:
-            isValid = False
-            message = "Error: Field length must be less than 30"
-        
-        # Validation for FIRST NAME, LAST_NAME and RELATIONSHIP,
-        # Value cannot be None or empty String
-        if field in (af.FIELD_NAMES[1],af.FIELD_NAMES[2],af.FIELD_NAMES[7]):
-            if user_input == "" or user_input == " " or user_input == None:
-                isValid = False
-                message = "Error: {} must have a value".format(field)
-            
-            # Validation for RELATIONSHIP
-            # Value must be one of the accepted values
-            if field == "RELATIONSHIP":
-                accepted_values = ["FAMILY", "FRIEND", 
-                    "SUPERVISOR", "COLLEAUGE", 
-                    "FORMER SUPERVISOR", "FORMER COLLEAUGE"]
-                if not user_input.upper() in accepted_values:
-                    isValid = False
-                    message = "Error: {} must be one of the ".format(field)
-                    message += "following values: {}".format(accepted_values)
-
-        # Validation for PHONE NUMBER
-        # Value must follow format 'XXX-XXX-XXXX' and have a length of 12
-        # using lower case comparison to check for alpha characters
-        elif field == "PHONE_NUMBER":
-            if (user_input.lower() != user_input) or len(user_input) != 12:
-                isValid = False
-                message = ("Error: {} value must follow format: {}"
-                    .format(field, "XXX-XXX-XXXX"))
-        
-        # Validation for EMAIL
-        # Value must contain an '@' and a '.' character to be considered valid
-        elif field == "EMAIL":
-            if not "@" in user_input or not "." in user_input:
-                isValid = False
-                message = "Error: Invalid format for field {}".format(field)
-        else:
-            pass
-        
+            string. The validations and their cache are shared with the 
+            batch validator in contact_validator.py.
+        '''
+        message = cv.validate_cached(field, user_input)
         # return tuple of bool 'isValid' and str 'message'
-        return (isValid, message)
+        return (message == "", message)
 
-    def is_unique(self, contact_list:list) -> bool:
+    def is_unique(self, contact_list) -> bool:
         '''
-            Returns boolean based on if the __repr__ of the instance matches
-            the __repr__ of any contact in contact_list. Equals operation 
-            excludes id, since it will always be unique.
+            Returns boolean based on if the values of the instance (excluding
+            id) match the values of any contact in contact_list. When 
+            contact_list is a ContactStore, its dedup key index is used 
+            instead of checking every contact.
         '''
+        # a ContactStore can answer using its hash index
+        if hasattr(contact_list, "is_unique"):
+            return contact_list.is_unique(self)
+
         result = True
+        key = self.dedup_key()
         for c in contact_list:
             # checks contact_list to check if new instance is a duplicate
-            if c.__repr__() == self.__repr__():
+            if c.dedup_key() == key:
                 result = False
+                break
         return result
 
     def validate_new_contact(self) -> object:
@@ -128,13 +155,16 @@ class Contact(object):
             related error message.
         '''
         
-        # if instance values unique, then validate value in each field
-        for field in af.FIELD_NAMES[1:]:
-            value = self.__dict__[field.lower()]
+        # if instance values unique, then validate value in each field. The
+        # instance is only valid if every field passes its validations
+        self._Contact__is_valid = True
+        for field in FIELD_NAMES[1:]:
+            value = getattr(self, field.lower())
             # validate user input agains field-specific validations, two lines
             # to stay under 80 character line limit
             validation_results = tuple(self.__validate_input(field, value))
-            self._Contact__is_valid = validation_results[0]
+            self._Contact__is_valid = (self._Contact__is_valid 
+                and validation_results[0])
             self._Contact__error_message.append(validation_results[1])
         # if all validation passed, return Contact() instance
         return self
@@ -147,7 +177,7 @@ class Contact(object):
             set private variables in instance to be printed.
         '''
         result = False
-        current_value = self.__dict__[field.lower()]
+        current_value = getattr(self, field.lower())
         if new_value == "" and current_value != "":
             # allow for the user to not provide new input, if they do not want 
             # to.  This will set the new value 
@@ -167,4 +197,12 @@ class Contact(object):
             self._Contact__error_message = "Duplicate value detected. "
             self._Contact__error_message += "Field not updated."
 
-        return result
\ No newline at end of file
+        return result
+
+
+def _intern(value):
+    '''
+        Return the interned copy of a string value, other values are 
+        returned unchanged.
+    '''
+    return sys.intern(value) if type(value) is str else value
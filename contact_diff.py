@@ -0,0 +1,249 @@
+'''
+    Streaming diff between two contact files (such as two exports), or a
+    contact file and the live contact list. Records are matched by ID with
+    an external sort-merge: each side is sorted in runs of at most RUN_SIZE
+    records, the runs are written to temporary files and merged back in ID
+    order, and the two sorted streams are then joined in a single pass.
+    Memory use is bounded by the run size, no matter how large the files.
+
+    Usage: python contact_diff.py OLD_FILE NEW_FILE [--output diff.csv]
+'''
+import argparse
+import csv
+import heapq
+import os
+import tempfile
+
+import csv_filereader as fr
+from contact import FIELD_NAMES
+from contact_store import id_sort_key
+
+# largest number of records sorted in memory at a time. Larger inputs are
+# written to sorted temporary runs which are then merged.
+RUN_SIZE = 100000
+# the kinds of change reported, in the order of the summary
+CHANGES = ("ADDED", "REMOVED", "CHANGED")
+REPORT_HEADER = ["CHANGE", "ID", "FIELD", "OLD", "NEW"]
+# size of the read and write buffers of the run and report files
+BUFFER_SIZE = 1024 * 1024
+
+
+def file_rows(filepath:str, stats:dict=None):
+    '''
+        Generator which streams the records of a contact file (optionally
+        gzip compressed) as lists of 8 string values. Lines without an ID
+        cannot be matched, so they are skipped and counted in stats under
+        'no_id'.
+    '''
+    if stats is None:
+        stats = dict()
+    stats.setdefault("no_id", 0)
+    for rows in fr.iter_rows(filepath, stats=stats):
+        for line_counter, line in rows:
+            if len(line) == 8:
+                yield line
+            else:
+                stats["no_id"] += 1
+
+def list_rows(contact_list):
+    '''
+        Generator which returns each Contact in contact_list as a list of 8
+        string values.
+    '''
+    for contact in contact_list:
+        yield [str(value) for value in contact.to_list()]
+
+def sort_rows(rows, directory:str, run_size:int=RUN_SIZE):
+    '''
+        Generator which returns an iterable of rows in ID order. If every
+        row fits in one run it is sorted in memory, otherwise each run is
+        sorted and written to a temporary file in directory and the runs
+        are merged, so only one row of each run is held at a time.
+    '''
+    run = []
+    run_paths = []
+    for row in rows:
+        run.append(row)
+        if len(run) >= run_size:
+            run_paths.append(_write_run(run, directory))
+            run = []
+    run.sort(key=_row_key)
+    if not run_paths:
+        yield from run
+        return
+
+    if run:
+        run_paths.append(_write_run(run, directory))
+    run = None
+    files = [open(path, 'r', newline='', buffering=BUFFER_SIZE)
+        for path in run_paths]
+    try:
+        yield from heapq.merge(*[csv.reader(file) for file in files],
+            key=_row_key)
+    finally:
+        for file in files:
+            file.close()
+            os.unlink(file.name)
+
+def diff_rows(old_rows, new_rows, stats:dict=None):
+    '''
+        Generator which joins two iterables of rows, each sorted in ID
+        order, in a single pass. Yields a (change, old_row, new_row) tuple
+        for each record which was ADDED (old_row is None), REMOVED (new_row
+        is None) or CHANGED. If a stats dictionary is provided, it counts
+        each kind of change, the unchanged records and any ID which appears
+        more than once on one side (only its first record is compared).
+    '''
+    if stats is None:
+        stats = dict()
+    for key in CHANGES + ("UNCHANGED", "DUPLICATE_IDS"):
+        stats.setdefault(key, 0)
+    old_rows = _unique_ids(old_rows, stats)
+    new_rows = _unique_ids(new_rows, stats)
+    old_row = next(old_rows, None)
+    new_row = next(new_rows, None)
+
+    while old_row is not None or new_row is not None:
+        if new_row is None or (old_row is not None
+            and _row_key(old_row) < _row_key(new_row)):
+            change = ("REMOVED", old_row, None)
+            old_row = next(old_rows, None)
+        elif old_row is None or _row_key(new_row) < _row_key(old_row):
+            change = ("ADDED", None, new_row)
+            new_row = next(new_rows, None)
+        else:
+            change = None
+            if old_row != new_row:
+                change = ("CHANGED", old_row, new_row)
+            else:
+                stats["UNCHANGED"] += 1
+            old_row = next(old_rows, None)
+            new_row = next(new_rows, None)
+        if change is not None:
+            stats[change[0]] += 1
+            yield change
+
+def diff(old_rows, new_rows, stats:dict=None, run_size:int=RUN_SIZE):
+    '''
+        Generator which sorts two iterables of rows by ID, spilling to
+        temporary files when they are larger than run_size, and yields the
+        changes between them (see diff_rows).
+    '''
+    with tempfile.TemporaryDirectory(prefix="contact_diff_") as directory:
+        yield from diff_rows(sort_rows(old_rows, directory, run_size),
+            sort_rows(new_rows, directory, run_size), stats)
+
+def changed_fields(old_row:list, new_row:list) -> list:
+    '''
+        Return a list of (field, old_value, new_value) tuples for every
+        field which differs between two rows with the same ID.
+    '''
+    return [(field, old_value, new_value) for field, old_value, new_value
+        in zip(FIELD_NAMES[1:], old_row[1:], new_row[1:])
+        if old_value != new_value]
+
+def format_change(change:str, old_row:list, new_row:list) -> str:
+    '''
+        Format one change for display: '+' and the values of an added
+        record, '-' and the values of a removed record, or '~' and each
+        field which changed.
+    '''
+    if change == "ADDED":
+        return "+ {}: {}".format(new_row[0], ", ".join(new_row[1:]))
+    if change == "REMOVED":
+        return "- {}: {}".format(old_row[0], ", ".join(old_row[1:]))
+    return "~ {}: {}".format(old_row[0], "; ".join([
+        "{} '{}' -> '{}'".format(field, old_value, new_value)
+        for field, old_value, new_value in changed_fields(old_row, new_row)]))
+
+def write_report(changes, filepath:str) -> None:
+    '''
+        Write an iterable of changes to a csv report with one line for each
+        added or removed record and one line for each changed field.
+    '''
+    with open(filepath, 'w', newline='', buffering=BUFFER_SIZE) as file:
+        report = csv.writer(file, lineterminator="\n")
+        report.writerow(REPORT_HEADER)
+        for change, old_row, new_row in changes:
+            if change == "ADDED":
+                report.writerow([change, new_row[0], "", "",
+                    ",".join(new_row[1:])])
+            elif change == "REMOVED":
+                report.writerow([change, old_row[0], "",
+                    ",".join(old_row[1:]), ""])
+            else:
+                for field, old_value, new_value in changed_fields(old_row,
+                    new_row):
+                    report.writerow([change, old_row[0], field, old_value,
+                        new_value])
+
+def format_summary(stats:dict) -> str:
+    '''
+        Return a one line summary of the counts filled by diff_rows.
+    '''
+    return "{} added, {} removed, {} changed, {} unchanged.".format(
+        stats["ADDED"], stats["REMOVED"], stats["CHANGED"],
+        stats["UNCHANGED"])
+
+def _write_run(run:list, directory:str) -> str:
+    '''
+        Sort a run of rows by ID, write it to a new temporary csv file in
+        directory and return the file's path.
+    '''
+    run.sort(key=_row_key)
+    file_handle, run_path = tempfile.mkstemp(dir=directory, prefix="run_",
+        suffix=".csv")
+    with os.fdopen(file_handle, 'w', newline='',
+        buffering=BUFFER_SIZE) as file:
+        csv.writer(file, lineterminator="\n").writerows(run)
+    return run_path
+
+def _row_key(row:list) -> tuple:
+    '''
+        Sort key of a row, its ID in the same order as the 'LIST' command.
+        The ID itself breaks ties, so IDs such as '7' and '07' never match.
+    '''
+    return id_sort_key(row[0]) + (row[0],)
+
+def _unique_ids(rows, stats:dict):
+    '''
+        Generator which skips every row whose ID is the same as the row
+        before it in a sorted iterable of rows, counting them in stats.
+    '''
+    last_id = None
+    for row in rows:
+        if row[0] == last_id:
+            stats["DUPLICATE_IDS"] += 1
+            continue
+        last_id = row[0]
+        yield row
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare two contact "
+        "files by ID.")
+    parser.add_argument("old", help="older contact file")
+    parser.add_argument("new", help="newer contact file")
+    parser.add_argument("--output", help="write every change to a csv "
+        "report instead of printing it")
+    parser.add_argument("--run-size", type=int, default=RUN_SIZE,
+        help="records sorted in memory at a time (default {})".format(
+        RUN_SIZE))
+    args = parser.parse_args()
+
+    stats = dict()
+    old_stats = dict()
+    new_stats = dict()
+    changes = diff(file_rows(args.old, old_stats), file_rows(args.new,
+        new_stats), stats, args.run_size)
+    if args.output is not None:
+        write_report(changes, args.output)
+        print("Report written to: {}".format(args.output))
+    else:
+        for change in changes:
+            print(format_change(*change))
+    print(format_summary(stats))
+    for filepath, file_stats in ((args.old, old_stats), 
+        (args.new, new_stats)):
+        if file_stats["no_id"]:
+            print("{} lines without an ID were skipped in: {}".format(
+                file_stats["no_id"], filepath))
@@ -0,0 +1,230 @@
+'''
+    Group and count contacts by one or two fields, such as the number of
+    contacts per COMPANY or per COMPANY and RELATIONSHIP, and show the
+    largest groups. Counts are aggregated in a hash table. When the table
+    holds more than MAX_GROUPS groups, which only happens for very large
+    files with many distinct values, its partial counts are sorted and
+    written to a temporary run and the table starts over. The runs are
+    merged back in group order and the counts of each group are added up,
+    so memory use is bounded no matter how large the file.
+
+    Usage: python contact_report.py FILE FIELD [FIELD] [--top 20]
+'''
+import argparse
+import csv
+import heapq
+import os
+import tempfile
+
+import csv_filereader as fr
+from contact import FIELD_NAMES
+from contact_diff import BUFFER_SIZE
+
+# largest number of groups counted in memory at a time. Larger tables are
+# written to sorted temporary runs which are then merged.
+MAX_GROUPS = 100000
+# largest number of runs merged at a time, more runs are first merged into
+# fewer, larger runs so the number of open files stays bounded
+MERGE_WIDTH = 64
+# number of groups shown by default, and the largest number of fields a
+# report can be grouped by
+TOP_N = 20
+MAX_FIELDS = 2
+# fields which can be grouped by, ID is unique so it is left out
+GROUP_FIELDS = FIELD_NAMES[1:]
+# shown in place of an empty value
+BLANK = "(blank)"
+# the report table's column widths
+FIELD_WIDTH = 30
+COUNT_WIDTH = 10
+
+
+def list_keys(contact_list, fields:list):
+    '''
+        Generator which returns the values of fields of each Contact in
+        contact_list as a tuple.
+    '''
+    attributes = [field.lower() for field in fields]
+    for contact in contact_list:
+        yield tuple([str(getattr(contact, attribute))
+            for attribute in attributes])
+
+def file_keys(filepath:str, fields:list, stats:dict=None):
+    '''
+        Generator which streams a contact file (optionally gzip compressed)
+        and returns the values of fields of each line as a tuple. Lines with
+        or without an ID are both read, lines with the wrong number of
+        values are counted in stats as rejected.
+    '''
+    # the last 7 values of a line are always the fields after ID, so a
+    # negative index finds a field in lines with and without an ID
+    indexes = [FIELD_NAMES.index(field) - len(FIELD_NAMES)
+        for field in fields]
+    for rows in fr.iter_rows(filepath, stats=stats):
+        for line_counter, line in rows:
+            yield tuple([line[index] for index in indexes])
+
+def count_groups(keys, directory:str, max_groups:int=MAX_GROUPS,
+    stats:dict=None):
+    '''
+        Generator which counts an iterable of key tuples and returns each
+        distinct key with its count as a (key, count) tuple. Keys are
+        counted in a dictionary of at most max_groups keys, and whenever it
+        is full its counts are written to a sorted run in directory. If
+        any run was written, the runs are merged and the (key, count)
+        tuples are returned in key order. If a stats dictionary is provided
+        it counts the runs written under 'runs'.
+    '''
+    if stats is None:
+        stats = dict()
+    stats.setdefault("runs", 0)
+    counts = dict()
+    run_paths = []
+    for key in keys:
+        counts[key] = counts.get(key, 0) + 1
+        if len(counts) >= max_groups:
+            run_paths.append(_write_run(counts, directory))
+            counts = dict()
+    stats["runs"] = len(run_paths)
+    if not run_paths:
+        yield from counts.items()
+        return
+
+    if counts:
+        run_paths.append(_write_run(counts, directory))
+        stats["runs"] = len(run_paths)
+    counts = None
+    while len(run_paths) > MERGE_WIDTH:
+        run_paths = [_write_run(_merge_runs(run_paths[start:start
+            + MERGE_WIDTH]), directory) for start in range(0, 
+            len(run_paths), MERGE_WIDTH)]
+    yield from _merge_runs(run_paths)
+
+def top_groups(groups, top:int=TOP_N) -> dict:
+    '''
+        Read an iterable of (key, count) tuples and return a report
+        dictionary with the top largest groups (ties in key order), the
+        total count and the number of distinct groups. Only top groups are
+        held at a time.
+    '''
+    report = {"total": 0, "distinct": 0}
+
+    def counted(groups):
+        for key, count in groups:
+            report["total"] += count
+            report["distinct"] += 1
+            yield (key, count)
+
+    report["groups"] = heapq.nsmallest(top, counted(groups),
+        key=lambda group: (-group[1], group[0]))
+    return report
+
+def report(keys, top:int=TOP_N, max_groups:int=MAX_GROUPS,
+    stats:dict=None) -> dict:
+    '''
+        Count an iterable of key tuples (see list_keys and file_keys),
+        spilling to temporary files when there are more than max_groups
+        distinct keys, and return the report of the top largest groups (see
+        top_groups).
+    '''
+    with tempfile.TemporaryDirectory(prefix="contact_report_") as directory:
+        return top_groups(count_groups(keys, directory, max_groups, stats),
+            top)
+
+def format_report(fields:list, report:dict) -> str:
+    '''
+        Format a report as a table with a column for each field, the count
+        of each group and its share of the total, returned as a single
+        string.
+    '''
+    row_format = ("{:<" + str(FIELD_WIDTH) + "} ") * len(fields) + (
+        "{:>" + str(COUNT_WIDTH) + "} {:>7}\n")
+    lines = [row_format.format(*fields, "COUNT", "PERCENT"),
+        row_format.format(*(["-" * len(field) for field in fields]
+        + ["-----", "-------"]))]
+    total = max(report["total"], 1)
+    for key, count in report["groups"]:
+        values = [value[:FIELD_WIDTH] if value.strip() else BLANK
+            for value in key]
+        lines.append(row_format.format(*values, count, "{:.1f}%".format(
+            count * 100 / total)))
+    lines.append("{} of {} groups shown, {} contacts.\n".format(
+        len(report["groups"]), report["distinct"], report["total"]))
+    return "".join(lines)
+
+def _merge_runs(run_paths:list):
+    '''
+        Generator which merges sorted runs and returns each key with the 
+        sum of its counts as a (key, count) tuple, in key order. The run
+        files are deleted once they are read.
+    '''
+    files = [open(path, 'r', newline='', buffering=BUFFER_SIZE)
+        for path in run_paths]
+    try:
+        # the same key can be in every run, its partial counts are next to
+        # each other once the runs are merged
+        merged = heapq.merge(*[csv.reader(file) for file in files],
+            key=lambda row: row[:-1])
+        key = None
+        count = 0
+        for row in merged:
+            row_key = tuple(row[:-1])
+            if row_key != key:
+                if key is not None:
+                    yield (key, count)
+                key = row_key
+                count = 0
+            count += int(row[-1])
+        if key is not None:
+            yield (key, count)
+    finally:
+        for file in files:
+            file.close()
+            os.unlink(file.name)
+
+def _write_run(counts, directory:str) -> str:
+    '''
+        Write counts, either a dictionary of key tuples to counts or an
+        iterable of (key, count) tuples already in key order, to a new 
+        temporary csv file in directory with one line for each key (its
+        values followed by its count) sorted by key. Returns the file's 
+        path.
+    '''
+    if isinstance(counts, dict):
+        counts = [(key, counts[key]) for key in sorted(counts)]
+    file_handle, run_path = tempfile.mkstemp(dir=directory, prefix="run_",
+        suffix=".csv")
+    with os.fdopen(file_handle, 'w', newline='',
+        buffering=BUFFER_SIZE) as file:
+        writer = csv.writer(file, lineterminator="\n")
+        for key, count in counts:
+            writer.writerow(key + (count,))
+    return run_path
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Count the contacts in a "
+        "file by one or two fields.")
+    parser.add_argument("file", help="contact file")
+    parser.add_argument("fields", nargs="+", type=str.upper,
+        choices=GROUP_FIELDS, metavar="FIELD", help="field to group by, one"
+        " of {}".format(", ".join(GROUP_FIELDS)))
+    parser.add_argument("--top", type=int, default=TOP_N,
+        help="number of groups shown (default {})".format(TOP_N))
+    parser.add_argument("--max-groups", type=int, default=MAX_GROUPS,
+        help="groups counted in memory at a time (default {})".format(
+        MAX_GROUPS))
+    args = parser.parse_args()
+    if len(args.fields) > MAX_FIELDS:
+        parser.error("at most {} fields can be grouped by".format(
+            MAX_FIELDS))
+
+    stats = dict()
+    result = report(file_keys(args.file, args.fields, stats), args.top,
+        args.max_groups, stats)
+    print(format_report(args.fields, result), end="")
+    if stats["rejected"]:
+        print("{} lines with the wrong number of values were skipped."
+            .format(stats["rejected"]))
+    if stats["runs"]:
+        print("{} sorted runs were written to disk and merged.".format(
+            stats["runs"]))
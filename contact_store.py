@@ -0,0 +1,278 @@
+from id_allocator import IDAllocator
+from search_index import ContactIndex
+
+class ContactStore(object):
+    '''
+       Container for Contact records used by the application in place of a
+       plain list. Keeps a hash index by ID and a hash index on the dedup
+       key (every field except ID) so that lookups, uniqueness checks, edits
+       and deletes do not need to walk every record. Iterating a store
+       returns the Contacts in the order they were added. A store can also
+       be created over a sequence of Contacts (such as a snapshot) whose
+       indexes are only built the first time they are needed.
+    '''
+
+    # the records only exist in memory, so replacing them (IMPORT or LOAD)
+    # creates a new store
+    persistent = False
+
+    def __init__(self, contacts=None):
+        '''
+            Initialize a new ContactStore, optionally populated from an
+            iterable of Contact objects. Duplicate records are skipped.
+        '''
+        # ID -> Contact, dictionaries preserve insertion order
+        self.__by_id = dict()
+        # dedup key (all fields except ID) -> ID
+        self.__by_key = dict()
+        # hands out IDs that do not collide with any ID in the store
+        self.allocator = IDAllocator()
+        # sequence of Contacts which have not been indexed yet
+        self.__pending = None
+        # Journal which every change to the store is recorded in, if any
+        self.journal = None
+        # counts changes to the store, so cached sort orders can tell if
+        # they are out of date
+        self.version = 0
+        # sort field -> (version, list of Contacts in sorted order)
+        self.__sort_cache = dict()
+        # ContactIndex used by search, built by build_index and then kept
+        # up to date by every change
+        self.__index = None
+
+        if contacts is not None:
+            for contact in contacts:
+                self.add(contact)
+
+    @classmethod
+    def from_sequence(cls, sequence) -> object:
+        '''
+            Create a ContactStore over a sequence of unique Contacts which
+            supports len() and indexing. Counting and iterating the store 
+            read the sequence directly, the indexes are built on first use.
+        '''
+        store = cls()
+        store.__pending = sequence
+        return store
+
+    def __len__(self) -> int:
+        '''
+            Return the number of Contact records in the store.
+        '''
+        if self.__pending is not None:
+            return len(self.__pending)
+        return len(self.__by_id)
+
+    def __iter__(self):
+        '''
+            Iterate through the Contact records in insertion order.
+        '''
+        if self.__pending is not None:
+            return iter(self.__pending)
+        return iter(self.__by_id.values())
+
+    def __contains__(self, id) -> bool:
+        '''
+            Returns True if a Contact with the provided ID is in the store.
+        '''
+        self.__materialize()
+        return str(id) in self.__by_id
+
+    def __repr__(self) -> str:
+        '''
+            Return a short string representation of the store.
+        '''
+        return "ContactStore({} contacts)".format(len(self))
+
+    def get(self, id:str) -> object:
+        '''
+            Return the Contact with the provided ID, or None if not found.
+        '''
+        self.__materialize()
+        return self.__by_id.get(str(id))
+
+    def is_unique(self, contact:object, ignore_id:str=None) -> bool:
+        '''
+            Returns True if no other Contact in the store has the same
+            values (excluding ID) as the contact parameter. The ignore_id
+            parameter allows a record being edited to not match itself.
+        '''
+        self.__materialize()
+        found_id = self.__by_key.get(contact.dedup_key())
+        return found_id is None or found_id == ignore_id
+
+    def add(self, contact:object) -> bool:
+        '''
+            Add a Contact to the end of the store. Returns False and does
+            not add the Contact if its ID or values are already present.
+        '''
+        self.__materialize()
+        id = str(contact.id)
+        key = contact.dedup_key()
+        if id in self.__by_id or key in self.__by_key:
+            return False
+        self.__by_id[id] = contact
+        self.__by_key[key] = id
+        self.allocator.observe(id)
+        if self.__index is not None:
+            self.__index.add(contact)
+        self.version += 1
+        return True
+
+    def replace(self, id:str, contact:object) -> bool:
+        '''
+            Replace the Contact with the provided ID with a new Contact,
+            keeping its position in the store. Returns False if the ID does
+            not exist or the new values duplicate another Contact.
+        '''
+        self.__materialize()
+        id = str(id)
+        old_contact = self.__by_id.get(id)
+        if old_contact is None or not self.is_unique(contact, id):
+            return False
+        del self.__by_key[old_contact.dedup_key()]
+        # keep the original ID so the record's position is unchanged
+        contact.id = id
+        self.__by_id[id] = contact
+        self.__by_key[contact.dedup_key()] = id
+        if self.__index is not None:
+            self.__index.remove(old_contact)
+            self.__index.add(contact)
+        self.version += 1
+        return True
+
+    def remove(self, id:str) -> object:
+        '''
+            Remove the Contact with the provided ID from the store and
+            return it, or return None if the ID does not exist.
+        '''
+        self.__materialize()
+        contact = self.__by_id.pop(str(id), None)
+        if contact is not None:
+            del self.__by_key[contact.dedup_key()]
+            if self.__index is not None:
+                self.__index.remove(contact)
+            self.version += 1
+        return contact
+
+    def allocate_id(self) -> str:
+        '''
+            Return a new ID value that is not used by any Contact which has
+            been added to the store.
+        '''
+        self.__materialize()
+        return self.allocator.allocate()
+
+    def clear(self) -> None:
+        '''
+            Remove all Contact records from the store.
+        '''
+        self.__pending = None
+        self.__by_id.clear()
+        self.__by_key.clear()
+        if self.__index is not None:
+            self.__index = ContactIndex()
+        self.version += 1
+
+    def load(self, batches) -> None:
+        '''
+            Replace every record in the store with the Contacts in an 
+            iterable of batches (lists) of Contacts. Duplicate records are
+            skipped.
+        '''
+        self.clear()
+        for batch in batches:
+            for contact in batch:
+                self.add(contact)
+
+    def ids(self) -> list:
+        '''
+            Return a list of every ID in the store, in insertion order.
+        '''
+        self.__materialize()
+        return list(self.__by_id.keys())
+
+    def build_index(self) -> None:
+        '''
+            Build the search index over every Contact in the store. Once
+            built, the index is updated by every add, replace and remove.
+        '''
+        if self.__index is None:
+            self.__materialize()
+            self.__index = ContactIndex(self.__by_id.values())
+
+    def search(self, terms:dict) -> list:
+        '''
+            Return a list of the Contacts which match every one of the 
+            search terms (see ContactIndex.search), in ID order. The index
+            is built first if it does not exist yet.
+        '''
+        self.build_index()
+        ids = sorted(self.__index.search(terms), key=id_sort_key)
+        return [self.__by_id[id] for id in ids]
+
+    def sorted_by(self, field:str=None) -> list:
+        '''
+            Return a list of every Contact sorted by field (one of the 
+            FIELD_NAMES), or in insertion order if field is None. IDs are
+            sorted by number and other fields ignore case. The list is 
+            cached until the store next changes, so paging through a sorted
+            list only sorts it once.
+        '''
+        cached = self.__sort_cache.get(field)
+        if cached is not None and cached[0] == self.version:
+            return cached[1]
+
+        if field is None:
+            contacts = list(self)
+        elif field.upper() == "ID":
+            contacts = sorted(self, key=id_sort_key)
+        else:
+            attribute = field.lower()
+            contacts = sorted(self, 
+                key=lambda contact: str(getattr(contact, attribute)).lower())
+        self.__sort_cache[field] = (self.version, contacts)
+        return contacts
+
+    def page(self, number:int, size:int, field:str=None, 
+        descending:bool=False) -> list:
+        '''
+            Return the Contacts on page number (starting at 1) when the 
+            store is sorted by field and split into pages of size records.
+            Pages of an unsorted store which has not been indexed yet are
+            read straight from its sequence.
+        '''
+        start = (number - 1) * size
+        end = start + size
+        if field is None and not descending and self.__pending is not None:
+            return [self.__pending[index] 
+                for index in range(start, min(end, len(self.__pending)))]
+
+        contacts = self.sorted_by(field)
+        if descending:
+            # slice the page from the end of the list instead of copying
+            # the whole list in reverse
+            count = len(contacts)
+            return contacts[max(count - end, 0):max(count - start, 0)][::-1]
+        return contacts[start:end]
+
+    def __materialize(self) -> None:
+        '''
+            Build the indexes from the pending sequence, if there is one.
+        '''
+        if self.__pending is not None:
+            pending = self.__pending
+            self.__pending = None
+            for contact in pending:
+                self.add(contact)
+
+
+def id_sort_key(contact:object) -> tuple:
+    '''
+        Sort key which puts numeric IDs in number order, followed by any
+        other IDs in text order. Takes a Contact or an ID.
+    '''
+    id = str(getattr(contact, "id", contact))
+    if id.isdecimal():
+        return (0, int(id), "")
+    return (1, 0, id)
@@ -0,0 +1,220 @@
+import re
+import threading
+from collections import OrderedDict
+
+# every field which is validated, in FIELD_NAMES order (ID is not validated)
+VALIDATED_FIELDS = ("FIRST_NAME", "LAST_NAME", "PHONE_NUMBER", "EMAIL",
+    "COMPANY", "TITLE", "RELATIONSHIP")
+# fields which cannot be empty
+REQUIRED_FIELDS = frozenset(("FIRST_NAME", "LAST_NAME", "RELATIONSHIP"))
+# accepted values for the RELATIONSHIP field (case-insensitive), the list
+# is kept in this order for the error message
+RELATIONSHIP_VALUES = ["FAMILY", "FRIEND", "SUPERVISOR", "COLLEAUGE",
+    "FORMER SUPERVISOR", "FORMER COLLEAUGE"]
+_RELATIONSHIP_SET = frozenset(RELATIONSHIP_VALUES)
+
+# fields whose validation results are kept in the shared cache. Phone 
+# numbers and emails are almost always unique, so caching them would only
+# evict the values which do repeat.
+CACHED_FIELDS = frozenset(("FIRST_NAME", "LAST_NAME", "COMPANY", "TITLE",
+    "RELATIONSHIP"))
+# default largest number of (field, value) results kept by the cache
+CACHE_SIZE = 65536
+
+MAX_LENGTH = 30
+# 'XXX-XXX-XXXX' format: 12 characters without any upper case letters
+_PHONE_PATTERN = re.compile(r"[^A-Z]{12}")
+
+
+def validate_field(field:str, value:str) -> str:
+    '''
+        Validates a value against the specific validations for a field.
+        Returns an empty string if the value is valid, otherwise the error
+        message of the last validation which failed.
+    '''
+    message = ""
+    # Global validation for every field
+    if len(value) >= MAX_LENGTH:
+        message = "Error: Field length must be less than 30"
+
+    # Validation for FIRST NAME, LAST_NAME and RELATIONSHIP,
+    # Value cannot be empty String
+    if field in REQUIRED_FIELDS:
+        if value == "" or value == " ":
+            message = "Error: {} must have a value".format(field)
+
+        # Validation for RELATIONSHIP
+        # Value must be one of the accepted values
+        if field == "RELATIONSHIP" and value.upper() not in _RELATIONSHIP_SET:
+            message = "Error: {} must be one of the ".format(field)
+            message += "following values: {}".format(RELATIONSHIP_VALUES)
+
+    # Validation for PHONE NUMBER
+    # Value must follow format 'XXX-XXX-XXXX' and have a length of 12
+    elif field == "PHONE_NUMBER":
+        if (_PHONE_PATTERN.fullmatch(value) is None
+            or value.lower() != value):
+            message = ("Error: {} value must follow format: {}"
+                .format(field, "XXX-XXX-XXXX"))
+
+    # Validation for EMAIL
+    # Value must contain an '@' and a '.' character to be considered valid
+    elif field == "EMAIL":
+        if "@" not in value or "." not in value:
+            message = "Error: Invalid format for field {}".format(field)
+
+    return message
+
+
+class ValidationCache(object):
+    '''
+       Bounded cache of validate_field results keyed by (field, value). 
+       When the cache is full the least recently used result is evicted.
+       Counts the hits, misses and evictions so callers can see how well
+       the cache is working. Safe to use from more than one thread.
+    '''
+
+    def __init__(self, max_size:int=CACHE_SIZE):
+        '''
+            Initialize a new, empty cache which holds at most max_size 
+            results. A max_size of 0 turns the cache off.
+        '''
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # (field, value) -> message, least recently used first
+        self.__results = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def __len__(self) -> int:
+        '''
+            Return the number of results in the cache.
+        '''
+        return len(self.__results)
+
+    def __repr__(self) -> str:
+        '''
+            Return a short string representation of the cache.
+        '''
+        return "ValidationCache({} of {} results)".format(len(self), 
+            self.max_size)
+
+    def validate(self, field:str, value:str) -> str:
+        '''
+            Return validate_field(field, value), from the cache if the same
+            value of the field was validated before.
+        '''
+        key = (field, value)
+        with self.__lock:
+            message = self.__results.get(key)
+            if message is not None:
+                self.__results.move_to_end(key)
+                self.hits += 1
+                return message
+            self.misses += 1
+
+        message = validate_field(field, value)
+        with self.__lock:
+            if self.max_size > 0:
+                self.__results[key] = message
+                if len(self.__results) > self.max_size:
+                    self.__results.popitem(last=False)
+                    self.evictions += 1
+        return message
+
+    def resize(self, max_size:int) -> None:
+        '''
+            Change the largest number of results kept, evicting the least
+            recently used results if the cache is now too large.
+        '''
+        with self.__lock:
+            self.max_size = max_size
+            while len(self.__results) > max(max_size, 0):
+                self.__results.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        '''
+            Remove every result and reset the counters.
+        '''
+        with self.__lock:
+            self.__results.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict:
+        '''
+            Return a dictionary of the cache's size and counters.
+        '''
+        with self.__lock:
+            return {"size": len(self.__results), "max_size": self.max_size,
+                "hits": self.hits, "misses": self.misses, 
+                "evictions": self.evictions}
+
+
+# validation cache shared by the add, edit and import paths. The workers of
+# a parallel import are other processes, which each have their own cache.
+CACHE = ValidationCache()
+
+
+def validate_cached(field:str, value:str) -> str:
+    '''
+        Validate a value like validate_field, using the shared cache for 
+        the fields which repeat (CACHED_FIELDS).
+    '''
+    if field in CACHED_FIELDS:
+        return CACHE.validate(field, value)
+    return validate_field(field, value)
+
+def validate_column(field:str, values:list) -> list:
+    '''
+        Validates every value of one field in a single pass. Returns a list
+        of (row_index, message) tuples for the values which failed. Values
+        of repetitive fields are only looked up once each per column, in 
+        the shared cache.
+    '''
+    errors = []
+    if field in CACHED_FIELDS:
+        # validate each distinct value once and reuse the result
+        results = dict()
+        for row, value in enumerate(values):
+            message = results.get(value)
+            if message is None:
+                message = CACHE.validate(field, value)
+                results[value] = message
+            if message:
+                errors.append((row, message))
+    else:
+        for row, value in enumerate(values):
+            message = validate_field(field, value)
+            if message:
+                errors.append((row, message))
+    return errors
+
+def validate_columns(columns:dict) -> dict:
+    '''
+        Validates whole columns of values, where columns is a dictionary of
+        field name to a list of values (one per row). Returns a report
+        dictionary of row_index to a dictionary of field name to error
+        message. Rows without errors are not in the report.
+    '''
+    report = dict()
+    for field in VALIDATED_FIELDS:
+        if field not in columns:
+            continue
+        for row, message in validate_column(field, columns[field]):
+            report.setdefault(row, dict())[field] = message
+    return report
+
+def validate_rows(rows:list) -> dict:
+    '''
+        Validates a list of 7 or 8 column rows, as read from an import
+        file, by splitting them into columns. Returns the same report as
+        validate_columns.
+    '''
+    columns = dict()
+    for index, field in enumerate(VALIDATED_FIELDS):
+        # the last 7 values of a row are always the validated fields
+        offset = index - len(VALIDATED_FIELDS)
+        columns[field] = [row[offset] for row in rows]
+    return validate_columns(columns)
@@ -0,0 +1,237 @@
+import csv
+import io
+import json
+import os
+import re
+import tempfile
+import time
+
+from contact import FIELD_NAMES
+
+# prefix of every export filename, followed by a unix timestamp
+EXPORT_PREFIX = "contact_list_export__"
+# number of rows formatted and written at a time
+BATCH_ROWS = 10000
+# size of the write buffer used for export files
+BUFFER_SIZE = 1024 * 1024
+# gzip compression level of compressed exports, the gzip command's default
+# is much faster than the maximum level for a slightly larger file
+GZIP_LEVEL = 6
+# number of partition files written at the same time by export_partitions.
+# Writing is mostly waiting on the disk and zlib, which release the GIL.
+PARTITION_WORKERS = 8
+# name of the file which lists every partition of a partitioned export
+MANIFEST_FILE = "manifest.json"
+# temporary files are created readable by their owner only, published files
+# are given this mode so other users can read them
+FILE_MODE = 0o644
+
+
+def export_file(contacts, directory:str=".", compress:bool=False,
+    prefix:str=EXPORT_PREFIX) -> str:
+    '''
+        Write an iterable of Contacts to a new export file in directory and
+        return its path. The file is named with a unix timestamp, and a
+        counter is added when another export already has that name, so an
+        existing export is never overwritten.
+    '''
+    extension = ".txt.gz" if compress else ".txt"
+    base_name = prefix + str(int(time.time()))
+    temp_path = write_contacts(contacts, directory, compress)
+    return publish_file(temp_path, directory, base_name, extension)
+
+def export_partitions(contacts, field:str, directory:str=".",
+    compress:bool=False, prefix:str=EXPORT_PREFIX, 
+    workers:int=PARTITION_WORKERS) -> str:
+    '''
+        Write an iterable of Contacts to a new folder in directory with one
+        export file for each value of field (one of the FIELD_NAMES, values
+        which only differ by case are grouped together). The Contacts are
+        grouped in a single pass, then the partitions are written at the 
+        same time by a pool of threads with the same buffered writer as
+        export_file. A manifest listing the value, file, rows and bytes of
+        every partition is written last. Returns the folder's path.
+    '''
+    attribute = field.lower()
+    # lowercase value -> list of Contacts, in the order of contacts
+    partitions = dict()
+    for contact in contacts:
+        key = str(getattr(contact, attribute)).lower()
+        partition = partitions.get(key)
+        if partition is None:
+            partition = partitions[key] = []
+        partition.append(contact)
+
+    folder = make_folder(directory, "{}{}_by_{}".format(prefix, 
+        int(time.time()), attribute))
+    extension = ".txt.gz" if compress else ".txt"
+    names = partition_names(partitions)
+    # thread pools are only imported when they are used
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        paths = executor.map(lambda key: publish_file(write_contacts(
+            partitions[key], folder, compress), folder, names[key], 
+            extension), sorted(partitions))
+        manifest = [{"value": str(getattr(partitions[key][0], attribute)),
+            "file": os.path.basename(path), "rows": len(partitions[key]),
+            "bytes": os.path.getsize(path)} 
+            for key, path in zip(sorted(partitions), paths)]
+
+    file_handle, temp_path = tempfile.mkstemp(dir=folder, 
+        prefix=".manifest_", suffix=".tmp")
+    set_file_mode(temp_path)
+    with os.fdopen(file_handle, 'w') as file:
+        json.dump({"field": field, "created": int(time.time()),
+            "compressed": compress, "rows": sum([partition["rows"] 
+            for partition in manifest]), "partitions": manifest}, file,
+            indent=2)
+    os.replace(temp_path, os.path.join(folder, MANIFEST_FILE))
+    return folder
+
+def partition_names(partitions:dict) -> dict:
+    '''
+        Return a file name (without extension) for each key of partitions.
+        Characters which are not letters or digits become '_', a blank 
+        value is named '_blank' and a counter is added to names which would
+        otherwise be the same.
+    '''
+    names = dict()
+    used = set()
+    for key in sorted(partitions):
+        base_name = re.sub(r"[^a-z0-9]+", "_", key).strip("_") or "_blank"
+        name = base_name
+        counter = 0
+        while name in used:
+            counter += 1
+            name = "{}_{}".format(base_name, counter)
+        used.add(name)
+        names[key] = name
+    return names
+
+def make_folder(directory:str, name:str) -> str:
+    '''
+        Create a new folder called name in directory and return its path.
+        Like publish_file, a counter is added to the name if a file or 
+        folder with that name already exists.
+    '''
+    counter = 0
+    while True:
+        path = os.path.join(directory, name)
+        if counter > 0:
+            path += "_{}".format(counter)
+        try:
+            os.mkdir(path)
+        except FileExistsError:
+            counter += 1
+            continue
+        return os.path.normpath(path)
+
+def write_contacts(contacts, directory:str=".", compress:bool=False,
+    header:bool=True) -> str:
+    '''
+        Write an iterable of Contacts to a new temporary file in directory.
+        Values are quoted by csv.writer, so values containing commas or
+        quotes can be read back with csv.reader. Rows are formatted and 
+        written in large batches through a buffered (and optionally gzip
+        compressed) file, which is flushed to disk before returning.
+        Returns the path of the temporary file.
+    '''
+    file_handle, temp_path = tempfile.mkstemp(dir=directory,
+        prefix=".export_", suffix=".tmp")
+    try:
+        with os.fdopen(file_handle, 'wb', buffering=BUFFER_SIZE) as raw:
+            binary = raw
+            if compress:
+                # gzip is only imported when a compressed file is written
+                import gzip
+                binary = gzip.GzipFile(fileobj=raw, mode='wb',
+                    compresslevel=GZIP_LEVEL)
+            text = io.TextIOWrapper(binary, newline='')
+            if header:
+                text.write(",".join(FIELD_NAMES) + "\n")
+
+            batch = []
+            for contact in contacts:
+                batch.append(contact)
+                if len(batch) >= BATCH_ROWS:
+                    text.write(format_rows(batch))
+                    batch = []
+            text.write(format_rows(batch))
+
+            # flush every layer, then make sure the data is on disk before
+            # the file is given its final name
+            text.flush()
+            text.detach()
+            if compress:
+                binary.close()
+            raw.flush()
+            os.fsync(raw.fileno())
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return temp_path
+
+def format_rows(contacts:list) -> str:
+    '''
+        Format a batch of Contacts as csv lines with csv.writer, so values
+        containing a comma, quote or line break are quoted and can be read
+        back with csv.reader.
+    '''
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerows(
+        [contact.to_list() for contact in contacts])
+    data = buffer.getvalue()
+    if "\r" in data:
+        # csv.writer only quotes the line terminator's characters, so the
+        # rare rows containing a carriage return have every value quoted
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        quote_all = csv.writer(buffer, lineterminator="\n", 
+            quoting=csv.QUOTE_ALL)
+        for contact in contacts:
+            values = contact.to_list()
+            if any(["\r" in str(value) for value in values]):
+                quote_all.writerow(values)
+            else:
+                writer.writerow(values)
+        data = buffer.getvalue()
+    return data
+
+def set_file_mode(path:str) -> None:
+    '''
+        Give a temporary file FILE_MODE, so other users can read it like
+        any other export once it is published.
+    '''
+    os.chmod(path, FILE_MODE)
+
+def publish_file(temp_path:str, directory:str, base_name:str,
+    extension:str) -> str:
+    '''
+        Give a finished temporary file its final name in directory without
+        ever replacing an existing file. If base_name + extension is taken,
+        a counter is added to the name until a free name is found. Returns
+        the final path.
+    '''
+    set_file_mode(temp_path)
+    counter = 0
+    while True:
+        name = base_name
+        if counter > 0:
+            name += "_{}".format(counter)
+        path = os.path.normpath(os.path.join(directory, name + extension))
+        try:
+            # linking fails if the name exists, even if another process
+            # creates it at the same moment
+            os.link(temp_path, path)
+        except FileExistsError:
+            counter += 1
+            continue
+        except OSError:
+            # file systems without hard links fall back to a rename
+            if os.path.exists(path):
+                counter += 1
+                continue
+            os.replace(temp_path, path)
+            return path
+        os.unlink(temp_path)
+        return path
@@ -1,74 +1,678 @@
 import csv
-from contact import Contact
-import app_functions as af
+import glob
+import io
+import json
+import locale
+import os
+import tempfile
 
-def read_file(filepath):
+from contact import Contact, FIELD_NAMES
+from contact_writer import set_file_mode
+from id_allocator import IDAllocator
+import contact_validator as cv
+
+# default number of Contacts yielded per batch by iter_contacts
+CHUNK_SIZE = 10000
+# number of byte ranges created per worker by read_file_parallel, more
+# ranges than workers keeps every worker busy when ranges parse unevenly
+RANGES_PER_WORKER = 4
+# files at least this size are imported with read_file_parallel when at
+# least PARALLEL_MIN_CPUS cores are available. The Contacts are still built
+# by one process, so with fewer cores the serial read is faster.
+PARALLEL_MIN_BYTES = 64 * 1024 * 1024
+PARALLEL_MIN_CPUS = 4
+# size of the blocks a file is searched in by has_quotes
+SCAN_BLOCK_SIZE = 1024 * 1024
+# extensions of the files which can be imported, optionally followed by .gz
+CONTACT_EXTENSIONS = (".txt", ".csv")
+# file the FileWatcher checkpoint of the 'WATCH' command is kept in
+WATCH_CHECKPOINT_FILE = "contacts.watch"
+
+INVALID_LINE_ERROR = ("ERROR: Invalid number of arguments on line {}. "
+    "Data on this line not imported.")
+# the first placeholder is filled with the invalid field names, the escaped
+# second placeholder is filled with the line number when printed
+INVALID_FIELD_ERROR = ("ERROR: Invalid value for {} on line {{}}. "
+    "Data on this line not imported.")
+
+def read_file(filepath, validate_fields:bool=False):
     '''
         Opens a file at a certain filepath using the csv module. Then each
         line is validated to ensure it has the correct number of arguments
-        to create a contact record. Each line is added to a set to ensure 
-        uniqueness and then a contact is created from each line in the set.
-        This list of contacts is then returned to the app.py
+        to create a contact record. Duplicate lines are skipped and a contact
+        is created from each remaining line, in the order of the file. If
+        validate_fields is True, lines with invalid field values are also
+        rejected. This list of contacts is then returned to the app.py
     '''
     data_list = []
-    contact_set = set()
-    id_list = []
+    stats = dict()
 
     try:
-        with open(filepath,'r') as file:
-            reader = csv.reader(file)
-            line_counter = 1
-            for line in reader:
-                # validate_line returns tuple(is_valid_bool, line_str)
-                validation_results = tuple(validate_line(line, 
-                    line_counter, id_list))
-                # if valid line, then add to contact_set
-                if validation_results[0]:
-                    contact_set.add(validation_results[1])
-                
-                # increment line counter
-                line_counter += 1
-            
+        for batch in iter_contacts(filepath, stats=stats, 
+            validate_fields=validate_fields):
+            data_list.extend(batch)
+
     except FileNotFoundError:
         print("File not found. Starting application with blank contact list.")
+        data_list = []
     except Exception:
         print("Invalid Data detected and no data has been imported.")
+        data_list = []
 
     else:
-        print("LOG: Read {} lines in file: {}".format(line_counter-1, 
+        print("LOG: Read {} lines in file: {}".format(stats["lines"],
             filepath))
-        # for each item in the set, check if length is 7 or 8
-        for item in contact_set:
-            values = str(item).split(",")
-            # if length is 7 generate a unique id
-            if len(values) == 7:
-                # add unique id to list of values
-                values.insert(0, af.generateUniqueID(id_list))
-            # with full 8 parameter list, create new instance of contact
-            # object with values, then add to data_list
-            new_contact = Contact(values)
-            data_list.append(new_contact)
     return data_list
 
-def validate_line(line:list, line_counter:int, id_list:list)->tuple: 
+def iter_contacts(filepath:str, chunk_size:int=CHUNK_SIZE,
+    stats:dict=None, validate_fields:bool=False):
+    '''
+        Generator which streams a file at a certain filepath and yields a
+        list of Contacts for each chunk of chunk_size lines, in the order of
+        the file. Each line is validated as it is read and duplicate lines
+        are skipped, so only one chunk of lines is held at a time no matter
+        the size of the file. A first pass over the file finds its highest
+        id (see scan_max_id), so the lines without an id (or with an id
+        used earlier in the file) are given new ids as they are read which
+        never collide with a later line's id. If a stats dictionary is
+        provided, it is updated with the number of lines read, accepted,
+        rejected and deduped. If validate_fields is True, each chunk of 
+        lines is checked against the Contact field validations by the 
+        batch validator and invalid lines are rejected.
+    '''
+    merger = _ContactMerger(stats, max_id=scan_max_id(filepath))
+    for rows in iter_rows(filepath, chunk_size, merger.stats, 
+        validate_fields):
+        batch = []
+        for line_counter, line in rows:
+            contact = merger.add(line, line_counter)
+            if contact is not None:
+                batch.append(contact)
+        if batch:
+            yield batch
+
+def scan_max_id(filepath:str) -> int:
+    '''
+        Return the highest numeric id of the 8 column lines in the file at
+        filepath, or 0 if it has none. Only the id of each line is looked
+        at, which makes this much faster than reading the Contacts.
+    '''
+    with open_text(filepath) as file:
+        return _max_id(csv.reader(file))
+
+def _scan_file(filepath:str) -> int:
+    '''
+        Worker function for iter_files_parallel. Returns scan_max_id of a
+        file, or 0 if it cannot be read (the error is reported when the 
+        file is parsed).
+    '''
+    try:
+        return scan_max_id(filepath)
+    except Exception:
+        return 0
+
+def _max_id(lines) -> int:
+    '''
+        Return the highest numeric id of the 8 column lines in an iterable
+        of lines (lists of values), or 0 if there is none.
+    '''
+    max_id = 0
+    for line in lines:
+        if len(line) == 8:
+            id_str = line[0].strip()
+            if id_str.isdecimal() and int(id_str) > max_id:
+                max_id = int(id_str)
+    return max_id
+
+def iter_rows(filepath:str, chunk_size:int=CHUNK_SIZE, stats:dict=None,
+    validate_fields:bool=False):
+    '''
+        Generator which streams a file at a certain filepath and yields lists
+        of at most chunk_size valid (line_number, values) rows, in the order
+        of the file. Lines with the wrong number of values are rejected, and
+        so are lines with invalid field values if validate_fields is True.
+        Rows are not deduplicated and no IDs are assigned. If a stats 
+        dictionary is provided, it is updated with the number of lines read
+        and rejected.
+    '''
+    if stats is None:
+        stats = dict()
+    stats.setdefault("lines", 0)
+    stats.setdefault("rejected", 0)
+    pending = []
+
+    with open_text(filepath) as file:
+        reader = csv.reader(file)
+        for line_counter, line in enumerate(reader, 1):
+            stats["lines"] = line_counter
+            if not validate_line(line, line_counter):
+                # blank and header lines are skipped without being rejected
+                if line and line != FIELD_NAMES:
+                    stats["rejected"] += 1
+                continue
+            pending.append((line_counter, line))
+
+            # validate the lines one chunk at a time
+            if len(pending) >= chunk_size:
+                rows = _validate_rows(pending, stats, validate_fields)
+                if rows:
+                    yield rows
+                pending = []
+
+    rows = _validate_rows(pending, stats, validate_fields)
+    if rows:
+        yield rows
+
+def _validate_rows(rows:list, stats:dict, validate_fields:bool) -> list:
+    '''
+        Validate the fields of a chunk of (line_number, values) rows if
+        validate_fields is True, printing an error for each rejected row.
+        Returns the valid rows.
+    '''
+    if validate_fields:
+        errors = []
+        rows = _reject_invalid_fields(rows, errors)
+        for line_counter, message in errors:
+            print(message.format(line_counter))
+        stats["rejected"] += len(errors)
+    return rows
+
+def _reject_invalid_fields(rows:list, errors:list) -> list:
+    '''
+        Validates the fields of a chunk of (line_number, values) rows in one
+        pass with the batch validator. Adds a (line_number, message) tuple
+        to errors for each row which failed and returns the valid rows.
+    '''
+    report = cv.validate_rows([line for line_counter, line in rows])
+    if not report:
+        return rows
+    valid_rows = []
+    for index, row in enumerate(rows):
+        if index in report:
+            fields = ", ".join(report[index])
+            errors.append((row[0], INVALID_FIELD_ERROR.format(fields)))
+        else:
+            valid_rows.append(row)
+    return valid_rows
+
+def read_file_parallel(filepath:str, workers:int=None,
+    stats:dict=None, validate_fields:bool=False) -> list:
+    '''
+        Read a file at a certain filepath using a pool of worker processes.
+        The file is split into line aligned byte ranges and each range is
+        parsed and validated by a worker. Once every range is parsed, the
+        results are merged in file order with the same dedup and id 
+        assignment as iter_contacts, so the returned list of Contacts 
+        matches the serial read_file. Lines which contain a quoted line 
+        break and compressed files are not supported.
+    '''
+    # process pools are only imported when they are used, which keeps the
+    # application's start up fast
+    from concurrent.futures import ProcessPoolExecutor
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    ranges = split_file(filepath, workers * RANGES_PER_WORKER)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # map returns the results in the same order as the ranges
+        results = list(executor.map(_parse_range,
+            [(filepath, start, end, validate_fields) 
+                for start, end in ranges]))
+
+    merger = _ContactMerger(stats, max_id=_max_id([line 
+        for line_count, rows, errors in results 
+        for line_counter, line in rows]))
+    data_list = []
+    line_offset = 0
+    for line_count, rows, errors in results:
+        for line_counter, message in errors:
+            print(message.format(line_offset + line_counter))
+        merger.stats["rejected"] += len(errors)
+        for line_counter, line in rows:
+            contact = merger.add(line, line_offset + line_counter)
+            if contact is not None:
+                data_list.append(contact)
+        line_offset += line_count
+    merger.stats["lines"] = line_offset
+    return data_list
+
+def use_parallel(filepath:str) -> bool:
+    '''
+        Returns True if the file at filepath should be read with 
+        read_file_parallel: an uncompressed file of at least 
+        PARALLEL_MIN_BYTES, on at least PARALLEL_MIN_CPUS cores, which
+        has no quoted values. A quoted value can contain a line break, and
+        a byte range could start in the middle of it.
+    '''
+    return (not filepath.lower().endswith(".gz")
+        and (os.cpu_count() or 1) >= PARALLEL_MIN_CPUS
+        and os.path.getsize(filepath) >= PARALLEL_MIN_BYTES
+        and not has_quotes(filepath))
+
+def has_quotes(filepath:str) -> bool:
+    '''
+        Returns True if the file at filepath contains a quote character.
+        The file is searched one block at a time, which is much faster 
+        than parsing it.
+    '''
+    with open(filepath, 'rb') as file:
+        for block in iter(lambda: file.read(SCAN_BLOCK_SIZE), b""):
+            if b'"' in block:
+                return True
+    return False
+
+def split_file(filepath:str, parts:int) -> list:
+    '''
+        Split a file into at most parts byte ranges. Every range starts at
+        the beginning of a line and ends after a line break, or at the end
+        of the file. Returns a list of (start, end) tuples.
+    '''
+    size = os.path.getsize(filepath)
+    boundaries = [0]
+    with open(filepath, 'rb') as file:
+        for part in range(1, parts):
+            # move to the approximate boundary, then to the next line
+            file.seek(size * part // parts)
+            file.readline()
+            position = file.tell()
+            if boundaries[-1] < position < size:
+                boundaries.append(position)
+    boundaries.append(size)
+    return [(boundaries[i], boundaries[i + 1]) 
+        for i in range(len(boundaries) - 1) 
+        if boundaries[i] < boundaries[i + 1]]
+
+def _parse_range(task:tuple) -> tuple:
+    '''
+        Worker function for read_file_parallel. Parses and validates the
+        lines in one byte range of a file. Returns a tuple of the number of
+        lines in the range, a list of (line_number, values) for valid lines
+        and a list of (line_number, error_message) for rejected lines. Line
+        numbers are relative to the start of the range.
+    '''
+    filepath, start, end, validate_fields = task
+    with open(filepath, 'rb') as file:
+        file.seek(start)
+        data = file.read(end - start)
+    text = data.decode(locale.getpreferredencoding(False))
+    return _parse_rows(csv.reader(io.StringIO(text, newline='')),
+        validate_fields)
+
+def _parse_file(task:tuple) -> tuple:
+    '''
+        Worker function for iter_files_parallel. Parses and validates every
+        line of one file, and returns the same tuple as _parse_range.
+    '''
+    filepath, validate_fields = task
+    with open_text(filepath) as file:
+        return _parse_rows(csv.reader(file), validate_fields)
+
+def _parse_rows(reader, validate_fields:bool) -> tuple:
+    '''
+        Validate every line from a csv reader. Returns a tuple of the number
+        of lines, a list of (line_number, values) for valid lines and a 
+        sorted list of (line_number, error_message) for rejected lines.
+    '''
+    rows = []
+    errors = []
+    line_count = 0
+    for line_counter, line in enumerate(reader, 1):
+        line_count = line_counter
+        if validate_line(line, line_counter, errors):
+            rows.append((line_counter, line))
+    if validate_fields:
+        rows = _reject_invalid_fields(rows, errors)
+        errors.sort()
+    return (line_count, rows, errors)
+
+def iter_files_parallel(filepaths:list, workers:int=None, 
+    stats:dict=None, validate_fields:bool=False):
+    '''
+        Generator which reads many files at once on a pool of workers and
+        yields a list of Contacts for each file. Each file is parsed and 
+        validated by a worker process, or by a single thread when only one
+        worker is used. The workers first find the highest id of every
+        file (see scan_max_id). The files are then merged in the order of
+        filepaths with the same dedup and id assignment as iter_contacts,
+        as soon as every earlier file is done, so the result does not 
+        depend on which worker finishes first. A line is printed as each
+        file is read, and a file which cannot be read is reported and 
+        skipped. If a stats dictionary is provided, it is updated with the
+        number of lines read, accepted, rejected and deduped, and the 
+        number of files which failed.
+    '''
+    from concurrent.futures import (ProcessPoolExecutor, ThreadPoolExecutor,
+        as_completed)
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(filepaths)))
+    # parsed files waiting for an earlier file to be merged, by index
+    results = dict()
+    next_index = 0
+
+    executor_class = ProcessPoolExecutor if workers > 1 else ThreadPoolExecutor
+    with executor_class(max_workers=workers) as executor:
+        # IDs used by more than one file are common, so they are only 
+        # counted
+        merger = _ContactMerger(stats, print_ids=False, max_id=max(
+            executor.map(_scan_file, filepaths), default=0))
+        merger.stats["failed_files"] = 0
+        futures = {executor.submit(_parse_file, (filepath, validate_fields)):
+            index for index, filepath in enumerate(filepaths)}
+        for done, future in enumerate(as_completed(futures), 1):
+            index = futures[future]
+            try:
+                results[index] = future.result()
+            except Exception as error:
+                print("ERROR: Unable to read file: {} ({})".format(
+                    filepaths[index], error))
+                merger.stats["failed_files"] += 1
+                results[index] = None
+            else:
+                print("LOG: [{}/{}] Read {} lines in file: {}".format(done,
+                    len(filepaths), results[index][0], filepaths[index]))
+
+            while next_index in results:
+                result = results.pop(next_index)
+                if result is not None:
+                    batch = _merge_file(merger, result, filepaths[next_index])
+                    if batch:
+                        yield batch
+                next_index += 1
+
+def _merge_file(merger:object, result:tuple, filepath:str) -> list:
+    '''
+        Turn the parsed lines of one file into Contacts with merger, 
+        printing each rejected line with the file's path. Returns the list
+        of Contacts.
+    '''
+    line_count, rows, errors = result
+    for line_counter, message in errors:
+        print("{} ({})".format(message.format(line_counter), filepath))
+    merger.stats["lines"] += line_count
+    merger.stats["rejected"] += len(errors)
+    batch = []
+    for line_counter, line in rows:
+        contact = merger.add(line, line_counter)
+        if contact is not None:
+            batch.append(contact)
+    return batch
+
+def is_contact_file(filepath:str) -> bool:
+    '''
+        Returns True if filepath has a .txt or .csv extension, optionally 
+        followed by .gz. Only the last part of the path is checked, so 
+        folders with a '.' in their name are allowed.
+    '''
+    base, extension = os.path.splitext(filepath)
+    if extension.lower() == ".gz":
+        extension = os.path.splitext(base)[1]
+    return extension.lower() in CONTACT_EXTENSIONS
+
+def expand_paths(path:str) -> list:
+    '''
+        Return the sorted list of files to import for a path. A directory
+        or a glob pattern (such as 'data/*.csv') expands to every contact
+        file it holds or matches, any other path to itself if it is a file.
+    '''
+    if os.path.isdir(path):
+        filepaths = [os.path.join(path, name) for name in os.listdir(path)]
+    elif any(character in path for character in "*?["):
+        filepaths = glob.glob(path)
+    else:
+        return [path] if os.path.isfile(path) else []
+    return sorted([filepath for filepath in filepaths 
+        if os.path.isfile(filepath) and is_contact_file(filepath)])
+
+def open_text(filepath:str):
+    '''
+        Open a file at a certain filepath for reading as text. Files ending
+        in '.gz' (such as compressed exports) are decompressed as they are 
+        read.
+    '''
+    if filepath.lower().endswith(".gz"):
+        # gzip is only imported when a compressed file is read
+        import gzip
+        return gzip.open(filepath, 'rt', newline='')
+    return open(filepath, 'r', newline='')
+
+def validate_line(line:list, line_counter:int, errors:list=None)->bool:
     '''
         Validates line (type = list) by checking it has the proper number of
-        arguments and is not the header line
+        arguments and is not the header line or a blank line. If an errors 
+        list is provided, a (line_counter, message) tuple is added to it 
+        instead of printing the error message.
     '''
     result = True
-    # ignore the column header line 
-    if line != ",".join(af.FIELD_NAMES):
-        # check if line contains an id value, if so add it to 
-        # id_list to ensure that any lines without an id will
-        # generate a unique value
-        if len(line) == 8:
-            id_list.append(line[0])
-        if len(line) == 7 or len(line) == 8:
-            line_str = ",".join(line)
+    # ignore blank lines and the column header line
+    if not line or line == FIELD_NAMES:
+        result = False
+    elif len(line) != 7 and len(line) != 8:
+        result = False
+        if errors is None:
+            print(INVALID_LINE_ERROR.format(line_counter))
         else:
-            result = False
-            print("ERROR: Invalid number of arguments on line {}. {}"
-                .format(
-                    line_counter, 
-                    "Data on this line not imported."))
-    return (result,line_str)
\ No newline at end of file
+            errors.append((line_counter, INVALID_LINE_ERROR))
+    return result
+
+class _ContactMerger(object):
+    '''
+       Turns validated lines into Contacts in file order. Skips lines whose
+       values duplicate an earlier line and keeps the id of every line 
+       which has an unused one. Lines without an id, or whose id was 
+       already used, are given a new id above max_id, the highest id in 
+       the input, so it never collides with the id of a later line. Shared
+       by the serial and parallel import paths so that they produce the
+       same Contacts.
+    '''
+
+    def __init__(self, stats:dict=None, print_ids:bool=True, 
+        max_id:int=0):
+        '''
+            Initialize a new merger which updates the stats dictionary. If
+            print_ids is False, replaced IDs are only counted in the stats.
+        '''
+        self.stats = stats if stats is not None else dict()
+        for key in ("lines", "accepted", "rejected", "deduped", 
+            "replaced_ids"):
+            self.stats[key] = 0
+        self.print_ids = print_ids
+        # dedup keys and ids of every Contact created so far. This is the
+        # only state which grows with the file and it holds no line 
+        # strings.
+        self.__seen_keys = set()
+        self.__seen_ids = set()
+        self.__allocator = IDAllocator(max_id + 1)
+
+    def add(self, line:list, line_counter:int) -> object:
+        '''
+            Create a Contact from a validated line. Returns None if the line
+            duplicates the values of an earlier line.
+        '''
+        contact = Contact(line if len(line) == 8 else [None] + line)
+        key = contact.dedup_key()
+        if key in self.__seen_keys:
+            self.stats["deduped"] += 1
+            return None
+
+        self.__seen_keys.add(key)
+        self.stats["accepted"] += 1
+        if len(line) == 8 and contact.id not in self.__seen_ids:
+            # keep the file's id and make sure it is never allocated
+            self.__allocator.observe(contact.id)
+            self.__seen_ids.add(contact.id)
+            return contact
+
+        if len(line) == 8:
+            self.stats["replaced_ids"] += 1
+            if self.print_ids:
+                print("LOG: Duplicate ID {} on line {} replaced.".format(
+                    contact.id, line_counter))
+        # the new id is above every id in the input, and if max_id was too
+        # low a later line with the same id is given a new id instead
+        contact.id = self.__allocator.allocate()
+        self.__seen_ids.add(contact.id)
+        return contact
+
+
+class FileWatcher(object):
+    '''
+       Follows a contact file which is appended to, such as a feed, so only
+       the lines added since the last check are read. The watcher keeps a
+       checkpoint of the byte offset read up to and of the file's identity
+       (inode, size and modification time). A file which is replaced by a
+       new file (rotated), becomes shorter than the offset (truncated) or is
+       rewritten at the same size is read again from the start. Only 
+       complete lines are read, a line still being written is read by the
+       next check.
+    '''
+
+    # the results of poll
+    UNCHANGED = "UNCHANGED"
+    APPENDED = "APPENDED"
+    RELOADED = "RELOADED"
+    MISSING = "MISSING"
+
+    def __init__(self, filepath:str, checkpoint:dict=None):
+        '''
+            Initialize a new FileWatcher for filepath which starts at the
+            beginning of the file, or at a checkpoint (see checkpoint) of
+            the same file.
+        '''
+        self.filepath = os.path.abspath(filepath)
+        self.offset = 0
+        self.lines = 0
+        self.inode = None
+        self.size = 0
+        self.mtime = None
+        if checkpoint is not None and checkpoint.get("path") == self.filepath:
+            self.offset = checkpoint["offset"]
+            self.lines = checkpoint["lines"]
+            self.inode = tuple(checkpoint["inode"])
+            self.size = checkpoint["size"]
+            self.mtime = checkpoint["mtime"]
+
+    def __repr__(self) -> str:
+        '''
+            Return a short string representation of the watcher.
+        '''
+        return "FileWatcher({}, offset {})".format(self.filepath, 
+            self.offset)
+
+    @classmethod
+    def resume(cls, filepath:str, 
+        checkpoint_file:str=WATCH_CHECKPOINT_FILE) -> object:
+        '''
+            Create a FileWatcher for filepath from the checkpoint saved in
+            checkpoint_file, if it is a checkpoint of the same file.
+        '''
+        checkpoint = None
+        try:
+            with open(checkpoint_file, 'r', encoding="utf-8") as file:
+                checkpoint = json.load(file)
+        except (OSError, ValueError):
+            pass
+        return cls(filepath, checkpoint)
+
+    def checkpoint(self) -> dict:
+        '''
+            Return the watcher's position and the identity of the file as a
+            dictionary which can be saved as JSON.
+        '''
+        return {"path": self.filepath, "offset": self.offset, 
+            "lines": self.lines, "inode": self.inode, "size": self.size, 
+            "mtime": self.mtime}
+
+    def save(self, checkpoint_file:str=WATCH_CHECKPOINT_FILE) -> None:
+        '''
+            Write the checkpoint to checkpoint_file, replacing it in a single
+            step so a crash never leaves half a checkpoint.
+        '''
+        directory = os.path.dirname(os.path.abspath(checkpoint_file))
+        file_handle, temp_path = tempfile.mkstemp(dir=directory,
+            prefix=".watch_", suffix=".tmp")
+        set_file_mode(temp_path)
+        with os.fdopen(file_handle, 'w', encoding="utf-8") as file:
+            json.dump(self.checkpoint(), file)
+        os.replace(temp_path, checkpoint_file)
+
+    def poll(self) -> str:
+        '''
+            Compare the file with the checkpoint. Returns APPENDED if lines
+            were added after the offset, RELOADED if the file was rotated,
+            truncated or rewritten (the offset is moved back to the start),
+            MISSING if the file does not exist and UNCHANGED otherwise.
+        '''
+        try:
+            status = os.stat(self.filepath)
+        except OSError:
+            return self.MISSING
+        inode = (status.st_dev, status.st_ino)
+        result = self.UNCHANGED
+        if self.inode is not None and (inode != self.inode 
+            or status.st_size < self.offset
+            or (status.st_size == self.size 
+            and status.st_mtime_ns != self.mtime)):
+            self.offset = 0
+            self.lines = 0
+            result = self.RELOADED
+        elif status.st_size > self.offset:
+            result = self.APPENDED
+        self.inode = inode
+        self.size = status.st_size
+        self.mtime = status.st_mtime_ns
+        return result
+
+    def iter_rows(self, chunk_size:int=CHUNK_SIZE, stats:dict=None,
+        validate_fields:bool=True):
+        '''
+            Generator which reads the complete lines after the offset and 
+            yields lists of at most chunk_size valid (line_number, values)
+            rows, like iter_rows. The offset is only moved past the lines of
+            a chunk once the next chunk is asked for, which means the chunk
+            has been used. If the caller stops part way through a chunk, 
+            such as on Ctrl+C, its lines are read again by the next call. A 
+            stats dictionary is updated with the number of lines read and
+            rejected.
+        '''
+        if stats is None:
+            stats = dict()
+        stats.setdefault("lines", 0)
+        stats.setdefault("rejected", 0)
+        pending = []
+        # [offset, line count] after the last line read, which becomes the
+        # checkpoint once the rows before it have been used
+        position = [self.offset, self.lines]
+        with open(self.filepath, 'rb') as file:
+            file.seek(self.offset)
+            for line in csv.reader(self.__complete_lines(file, position)):
+                stats["lines"] += 1
+                if not validate_line(line, position[1]):
+                    if line and line != FIELD_NAMES:
+                        stats["rejected"] += 1
+                    continue
+                pending.append((position[1], line))
+                if len(pending) >= chunk_size:
+                    rows = _validate_rows(pending, stats, validate_fields)
+                    pending = []
+                    chunk_end = list(position)
+                    yield rows
+                    self.offset, self.lines = chunk_end
+        if pending:
+            yield _validate_rows(pending, stats, validate_fields)
+        self.offset, self.lines = position
+
+    def __complete_lines(self, file, position:list):
+        '''
+            Generator which returns each complete line of a binary file as 
+            text, moving position (an [offset, line count] list) past it.
+        '''
+        encoding = locale.getpreferredencoding(False)
+        for line in file:
+            if not line.endswith(b"\n"):
+                # the rest of the line has not been written yet
+                break
+            position[0] += len(line)
+            position[1] += 1
+            yield line.decode(encoding)
@@ -0,0 +1,210 @@
+from itertools import combinations
+
+# blocks with more records than this are too common to tell anything apart
+# (such as a shared office phone number) and are not compared
+MAX_BLOCK_SIZE = 1000
+# number of normalized fields which must agree for two records to be
+# reported as likely duplicates
+MATCH_THRESHOLD = 2
+# phone numbers with fewer digits than this are not used for blocking
+MIN_PHONE_DIGITS = 7
+
+# soundex digit of each letter, letters which are not listed are skipped
+SOUNDEX_CODES = dict()
+for letters, digit in (("BFPV", "1"), ("CGJKQSXZ", "2"), ("DT", "3"),
+    ("L", "4"), ("MN", "5"), ("R", "6")):
+    for letter in letters:
+        SOUNDEX_CODES[letter] = digit
+
+
+def soundex(name:str) -> str:
+    '''
+        Return the American Soundex code of a name: its first letter and
+        three digits for the sounds of the following consonants, so names
+        which sound alike (Smith, Smyth) have the same code. Returns an
+        empty string if the name has no letters.
+    '''
+    letters = [character for character in name.upper()
+        if "A" <= character <= "Z"]
+    if not letters:
+        return ""
+    code = letters[0]
+    last_digit = SOUNDEX_CODES.get(letters[0], "")
+    for letter in letters[1:]:
+        digit = SOUNDEX_CODES.get(letter, "")
+        if digit != "" and digit != last_digit:
+            code += digit
+            if len(code) == 4:
+                break
+        # H and W do not separate two consonants with the same digit
+        if letter not in "HW":
+            last_digit = digit
+    return (code + "000")[:4]
+
+def normalize_phone(value:str) -> str:
+    '''
+        Return only the digits of a phone number, so '555-555-5555' and
+        '(555) 555 5555' are the same.
+    '''
+    return "".join([character for character in str(value)
+        if character.isdigit()])
+
+def normalize_text(value:str) -> str:
+    '''
+        Return a value in lower case without surrounding or repeated spaces.
+    '''
+    return " ".join(str(value).lower().split())
+
+
+class DuplicateFinder(object):
+    '''
+       Finds clusters of Contacts which are likely to be the same person.
+       Each Contact is put in a block for each of its blocking keys (phone
+       digits, lowercase email and the soundex of its name), and only the
+       Contacts which share a block are compared, so the work grows with
+       the size of the blocks instead of the square of the whole list.
+       Matching pairs are joined into clusters with a union-find.
+    '''
+
+    def __init__(self):
+        '''
+            Initialize a new DuplicateFinder.
+        '''
+        # ID -> tuple of normalized values compared between records
+        self.__normalized = dict()
+        # blocking key -> list of IDs
+        self.__blocks = dict()
+        # union-find parent of each ID
+        self.__parent = dict()
+        # memo of soundex codes, since names repeat often
+        self.__soundex = dict()
+        self.comparisons = 0
+        self.skipped_blocks = 0
+
+    def add(self, contact:object) -> None:
+        '''
+            Normalize a Contact and add it to its blocks.
+        '''
+        id = str(contact.id)
+        first_name = normalize_text(contact.first_name)
+        last_name = normalize_text(contact.last_name)
+        phone = normalize_phone(contact.phone_number)
+        email = normalize_text(contact.email)
+        company = normalize_text(contact.company)
+        self.__normalized[id] = (first_name + " " + last_name, phone, email,
+            company)
+
+        keys = []
+        if len(phone) >= MIN_PHONE_DIGITS:
+            keys.append(("PHONE", phone))
+        if email != "":
+            keys.append(("EMAIL", email))
+        name_key = self.__sound(first_name) + self.__sound(last_name)
+        if name_key != "":
+            keys.append(("NAME", name_key))
+        for key in keys:
+            block = self.__blocks.get(key)
+            if block is None:
+                block = self.__blocks[key] = []
+            block.append(id)
+
+    def clusters(self) -> list:
+        '''
+            Compare the Contacts within each block and return a list of
+            clusters of likely duplicates. Each cluster is a list of IDs in
+            the order the Contacts were added, and clusters are ordered by
+            their first ID.
+        '''
+        for block in self.__blocks.values():
+            if len(block) < 2:
+                continue
+            if len(block) > MAX_BLOCK_SIZE:
+                self.skipped_blocks += 1
+                continue
+            for id1, id2 in combinations(block, 2):
+                if self.__find(id1) == self.__find(id2):
+                    continue
+                self.comparisons += 1
+                if self.__is_match(id1, id2):
+                    self.__union(id1, id2)
+
+        # group every ID with a parent by its root, in insertion order
+        order = {id: index for index, id in enumerate(self.__normalized)}
+        groups = dict()
+        for id in self.__parent:
+            groups.setdefault(self.__find(id), []).append(id)
+        clusters = [sorted(ids, key=order.get) for ids in groups.values()
+            if len(ids) > 1]
+        clusters.sort(key=lambda ids: order[ids[0]])
+        return clusters
+
+    def __is_match(self, id1:str, id2:str) -> bool:
+        '''
+            Returns True if at least MATCH_THRESHOLD of the non-empty
+            normalized name, phone, email and company values agree.
+        '''
+        matches = 0
+        for value1, value2 in zip(self.__normalized[id1],
+            self.__normalized[id2]):
+            if value1 != "" and value1 == value2:
+                matches += 1
+        return matches >= MATCH_THRESHOLD
+
+    def __sound(self, name:str) -> str:
+        '''
+            Return the memoized soundex code of a name.
+        '''
+        code = self.__soundex.get(name)
+        if code is None:
+            code = self.__soundex[name] = soundex(name)
+        return code
+
+    def __find(self, id:str) -> str:
+        '''
+            Return the root of the cluster containing id.
+        '''
+        parent = self.__parent
+        if id not in parent:
+            return id
+        while parent[id] != id:
+            # path halving keeps the trees shallow
+            parent[id] = parent[parent[id]]
+            id = parent[id]
+        return id
+
+    def __union(self, id1:str, id2:str) -> None:
+        '''
+            Join the clusters containing id1 and id2.
+        '''
+        root1 = self.__find(id1)
+        root2 = self.__find(id2)
+        self.__parent.setdefault(root1, root1)
+        self.__parent.setdefault(root2, root2)
+        self.__parent[root2] = root1
+
+
+def find_duplicates(contacts) -> list:
+    '''
+        Return a list of clusters of likely duplicate Contacts found in an
+        iterable of Contacts. Each cluster is a list of IDs.
+    '''
+    finder = DuplicateFinder()
+    for contact in contacts:
+        finder.add(contact)
+    return finder.clusters()
+
+def merge_values(contacts:list) -> list:
+    '''
+        Return the values of a merged Contact: the values of the first
+        Contact, with any empty value filled from the first of the other
+        Contacts which has one.
+    '''
+    values = contacts[0].to_list()
+    for index, value in enumerate(values):
+        if str(value) == "":
+            for contact in contacts[1:]:
+                other = contact.to_list()[index]
+                if str(other) != "":
+                    values[index] = other
+                    break
+    return values
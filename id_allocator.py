@@ -0,0 +1,47 @@
+class IDAllocator(object):
+    '''
+       Hands out unique Contact ID values. IDs are allocated from a counter
+       that always stays above every ID the allocator has seen, so new IDs
+       never collide with IDs that were loaded from an 8 column file and
+       there is no upper limit on the number of IDs.
+    '''
+
+    def __init__(self, start:int=1):
+        '''
+            Initialize a new IDAllocator which will hand out IDs starting
+            at the start parameter.
+        '''
+        self.__next_id = start
+
+    def __repr__(self) -> str:
+        '''
+            Return a short string representation of the allocator.
+        '''
+        return "IDAllocator(next_id={})".format(self.__next_id)
+
+    def observe(self, id) -> None:
+        '''
+            Record an existing ID value so that it will never be allocated.
+            Non-numeric IDs can never collide with allocated IDs and are
+            ignored.
+        '''
+        id_str = str(id).strip()
+        if id_str.isdecimal() and int(id_str) >= self.__next_id:
+            self.__next_id = int(id_str) + 1
+
+    def allocate(self) -> str:
+        '''
+            Return a new unique ID value as a string.
+        '''
+        new_id = self.__next_id
+        self.__next_id += 1
+        return str(new_id)
+
+    def reserve(self, count:int) -> list:
+        '''
+            Reserve a block of count unique IDs at once and return them as a
+            list of strings. Used by imports to assign IDs in bulk.
+        '''
+        start = self.__next_id
+        self.__next_id += count
+        return [str(i) for i in range(start, start + count)]
@@ -0,0 +1,167 @@
+import json
+import os
+import tempfile
+import time
+
+from contact import Contact
+from contact_writer import set_file_mode
+
+# default journal file, kept next to the data files
+JOURNAL_FILE = "contacts.journal"
+# the journal is forced to disk after this many records, or when this many
+# seconds have passed since the last sync, whichever comes first
+SYNC_EVERY = 32
+SYNC_INTERVAL = 1.0
+# number of changes after which the user is reminded to run 'COMPACT'
+COMPACT_THRESHOLD = 10000
+
+
+class Journal(object):
+    '''
+       Append-only write-ahead journal of the changes made to the contact
+       list. The first record names the base file (an export, import file or
+       snapshot) that the changes apply to, and each following record is one
+       ADD, EDIT or DELETE. Records are JSON lines which are flushed as they
+       are written and synced to disk in batches.
+    '''
+
+    def __init__(self, filepath:str=JOURNAL_FILE):
+        '''
+            Initialize a new Journal for the file at filepath. The file is
+            not opened until the journal is read or reset.
+        '''
+        self.filepath = filepath
+        self.base = None
+        self.count = 0
+        self.__file = None
+        self.__unsynced = 0
+        self.__last_sync = time.monotonic()
+
+    def __repr__(self) -> str:
+        '''
+            Return a short string representation of the journal.
+        '''
+        return "Journal({}, base={}, {} changes)".format(self.filepath,
+            self.base, self.count)
+
+    def read(self) -> list:
+        '''
+            Read the journal file, set the base file, and return a list of
+            every change record in order. A partly written last record,
+            left by a crash, is ignored. Returns an empty list if there is
+            no journal file.
+        '''
+        self.base = None
+        changes = []
+        if not os.path.isfile(self.filepath):
+            return changes
+
+        with open(self.filepath, 'r', encoding="utf-8") as file:
+            for line_counter, line in enumerate(file, 1):
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    print("LOG: Incomplete journal record on line {} "
+                        "ignored.".format(line_counter))
+                    break
+                if record["op"] == "BASE":
+                    self.base = record["path"]
+                else:
+                    changes.append(record)
+        self.count = len(changes)
+        self.__open()
+        return changes
+
+    def append(self, op:str, contact:object=None, id:str=None) -> None:
+        '''
+            Append one change to the journal. ADD and EDIT records hold all
+            of the Contact's values, DELETE records only hold the ID.
+        '''
+        record = {"op": op}
+        if contact is not None:
+            record["contact"] = [str(value) for value in contact.to_list()]
+        if id is not None:
+            record["id"] = str(id)
+        self.__write(record)
+        self.count += 1
+
+    def reset(self, base:str) -> None:
+        '''
+            Start a new, empty journal on top of a new base file. The new
+            journal replaces the old one in a single step, so a crash never
+            leaves a journal without a base.
+        '''
+        self.close()
+        directory = os.path.dirname(os.path.abspath(self.filepath))
+        file_handle, temp_path = tempfile.mkstemp(dir=directory,
+            prefix=".journal_", suffix=".tmp")
+        set_file_mode(temp_path)
+        with os.fdopen(file_handle, 'w', encoding="utf-8") as file:
+            file.write(json.dumps({"op": "BASE",
+                "path": os.path.abspath(base)}) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, self.filepath)
+        self.base = os.path.abspath(base)
+        self.count = 0
+        self.__open()
+
+    def sync(self) -> None:
+        '''
+            Force every record written so far to disk.
+        '''
+        if self.__file is not None and self.__unsynced > 0:
+            self.__file.flush()
+            os.fsync(self.__file.fileno())
+        self.__unsynced = 0
+        self.__last_sync = time.monotonic()
+
+    def close(self) -> None:
+        '''
+            Sync and close the journal file.
+        '''
+        if self.__file is not None:
+            self.sync()
+            self.__file.close()
+            self.__file = None
+
+    def __open(self) -> None:
+        '''
+            Open the journal file for appending.
+        '''
+        if self.__file is None:
+            self.__file = open(self.filepath, 'a', encoding="utf-8")
+
+    def __write(self, record:dict) -> None:
+        '''
+            Write a record, flushing it to the operating system right away
+            and syncing it to disk once a batch of records has built up.
+        '''
+        self.__open()
+        self.__file.write(json.dumps(record) + "\n")
+        self.__file.flush()
+        self.__unsynced += 1
+        if (self.__unsynced >= SYNC_EVERY
+            or time.monotonic() - self.__last_sync >= SYNC_INTERVAL):
+            self.sync()
+
+
+def replay(contact_list, changes:list) -> int:
+    '''
+        Apply a list of journal change records to a ContactStore, in order.
+        Returns the number of changes which were applied.
+    '''
+    applied = 0
+    for record in changes:
+        if record["op"] == "ADD":
+            result = contact_list.add(Contact(record["contact"]))
+        elif record["op"] == "EDIT":
+            contact = Contact(record["contact"])
+            result = contact_list.replace(contact.id, contact)
+        elif record["op"] == "DELETE":
+            result = contact_list.remove(record["id"]) is not None
+        else:
+            result = False
+        if result:
+            applied += 1
+    return applied
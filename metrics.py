@@ -0,0 +1,215 @@
+import io
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+from contact_writer import set_file_mode
+
+# file the metrics are written to when the application ends
+METRICS_FILE = "contact_metrics.json"
+# upper bounds, in milliseconds, of the latency histogram buckets. The last
+# bucket holds every latency above the largest bound.
+LATENCY_BUCKETS = (1, 5, 10, 50, 100, 500, 1000, 5000, 30000)
+# number of functions shown by a profile
+PROFILE_LINES = 25
+
+
+class Metrics(object):
+    '''
+       Collects metrics about the running application: a latency histogram,
+       call count and error counts by exception type for every command,
+       counters (such as the rows accepted, rejected and deduped by
+       imports) and gauges (such as the size of the contact list).
+    '''
+
+    def __init__(self):
+        '''
+            Initialize a new, empty Metrics.
+        '''
+        self.started = time.time()
+        # command -> dictionary of that command's metrics
+        self.commands = dict()
+        self.counters = dict()
+        self.gauges = dict()
+
+    def __repr__(self) -> str:
+        '''
+            Return a short string representation of the metrics.
+        '''
+        return "Metrics({} commands)".format(len(self.commands))
+
+    @contextmanager
+    def measure(self, command:str):
+        '''
+            Context manager which records the latency of the code it wraps
+            as one call of command. An exception is counted by its type and
+            then raised again.
+        '''
+        start = time.perf_counter()
+        error = None
+        try:
+            yield
+        except BaseException as exception:
+            error = type(exception).__name__
+            raise
+        finally:
+            self.record_command(command, time.perf_counter() - start, error)
+
+    def record_command(self, command:str, seconds:float,
+        error:str=None) -> None:
+        '''
+            Record one call of command which took seconds, and the name of
+            the exception it raised, if any.
+        '''
+        metrics = self.commands.get(command)
+        if metrics is None:
+            metrics = self.commands[command] = {"calls": 0,
+                "total_seconds": 0.0, "max_seconds": 0.0,
+                "histogram": [0] * (len(LATENCY_BUCKETS) + 1),
+                "errors": dict()}
+        metrics["calls"] += 1
+        metrics["total_seconds"] += seconds
+        metrics["max_seconds"] = max(metrics["max_seconds"], seconds)
+        metrics["histogram"][_bucket(seconds * 1000)] += 1
+        if error is not None:
+            metrics["errors"][error] = metrics["errors"].get(error, 0) + 1
+
+    def increment(self, counter:str, amount:int=1) -> None:
+        '''
+            Add amount to a counter.
+        '''
+        self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def set_gauge(self, gauge:str, value) -> None:
+        '''
+            Set a gauge to its current value.
+        '''
+        self.gauges[gauge] = value
+
+    def record_import(self, stats:dict) -> None:
+        '''
+            Add the line counts of an import (the stats dictionary filled
+            by csv_filereader) to the import counters.
+        '''
+        self.increment("imports")
+        for key in ("lines", "accepted", "rejected", "deduped"):
+            self.increment("import_" + key, stats.get(key, 0))
+
+    def to_dict(self) -> dict:
+        '''
+            Return every metric as a dictionary which can be written as
+            json.
+        '''
+        commands = dict()
+        for command, metrics in self.commands.items():
+            commands[command] = dict(metrics,
+                mean_seconds=metrics["total_seconds"] / metrics["calls"],
+                p50_ms=_percentile(metrics["histogram"], 0.50),
+                p95_ms=_percentile(metrics["histogram"], 0.95))
+        return {"started": self.started, "uptime_seconds": time.time()
+            - self.started, "latency_buckets_ms": list(LATENCY_BUCKETS),
+            "commands": commands, "counters": dict(self.counters),
+            "gauges": dict(self.gauges)}
+
+    def report(self) -> str:
+        '''
+            Return the metrics formatted as tables for the 'STATS' command.
+        '''
+        lines = ["{:<10} {:>6} {:>7} {:>10} {:>10} {:>10} {:>10}".format(
+            "COMMAND", "CALLS", "ERRORS", "MEAN_MS", "P50_MS", "P95_MS",
+            "MAX_MS")]
+        data = self.to_dict()
+        for command in sorted(data["commands"]):
+            metrics = data["commands"][command]
+            lines.append("{:<10} {:>6} {:>7} {:>10.2f} {:>10} {:>10} "
+                "{:>10.2f}".format(command, metrics["calls"],
+                sum(metrics["errors"].values()),
+                metrics["mean_seconds"] * 1000,
+                _format_bound(metrics["p50_ms"]),
+                _format_bound(metrics["p95_ms"]),
+                metrics["max_seconds"] * 1000))
+            for error, count in sorted(metrics["errors"].items()):
+                lines.append("{:<10} {} x {}".format("", count, error))
+        lines.append("")
+        for name, value in sorted(data["gauges"].items()):
+            lines.append("{:<28} {}".format(name, value))
+        for name, value in sorted(data["counters"].items()):
+            lines.append("{:<28} {}".format(name, value))
+        return "\n".join(lines) + "\n"
+
+    def write(self, filepath:str=METRICS_FILE) -> None:
+        '''
+            Write the metrics to a json file, replacing it in a single step.
+        '''
+        directory = os.path.dirname(os.path.abspath(filepath))
+        file_handle, temp_path = tempfile.mkstemp(dir=directory,
+            prefix=".metrics_", suffix=".tmp")
+        set_file_mode(temp_path)
+        with os.fdopen(file_handle, 'w') as file:
+            json.dump(self.to_dict(), file, indent=2)
+        os.replace(temp_path, filepath)
+
+
+# metrics of the running application, shared by every module
+METRICS = Metrics()
+
+
+@contextmanager
+def profile(enabled:bool=True):
+    '''
+        Context manager which runs the code it wraps under cProfile and
+        prints the functions with the largest cumulative time. Does nothing
+        if enabled is False.
+    '''
+    if not enabled:
+        yield
+        return
+    # the profiler is only imported when it is used, which keeps the
+    # application's start up fast
+    import cProfile
+    import pstats
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        output = io.StringIO()
+        pstats.Stats(profiler, stream=output).sort_stats(
+            "cumulative").print_stats(PROFILE_LINES)
+        print(output.getvalue())
+
+def _bucket(milliseconds:float) -> int:
+    '''
+        Return the index of the histogram bucket for a latency.
+    '''
+    for index, bound in enumerate(LATENCY_BUCKETS):
+        if milliseconds <= bound:
+            return index
+    return len(LATENCY_BUCKETS)
+
+def _percentile(histogram:list, fraction:float) -> float:
+    '''
+        Estimate a percentile from a histogram as the upper bound of the
+        bucket it falls in. Returns None for the last, unbounded bucket.
+    '''
+    target = fraction * sum(histogram)
+    count = 0
+    for index, bucket_count in enumerate(histogram):
+        count += bucket_count
+        if count >= target and bucket_count > 0:
+            if index < len(LATENCY_BUCKETS):
+                return LATENCY_BUCKETS[index]
+            return None
+    return None
+
+def _format_bound(bound:float) -> str:
+    '''
+        Format a percentile bound for the 'STATS' table.
+    '''
+    if bound is None:
+        return ">{}".format(LATENCY_BUCKETS[-1])
+    return "<={}".format(bound)
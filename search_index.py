@@ -0,0 +1,211 @@
+import shlex
+
+# fields matched by prefix, using a trie of their lowercase values
+PREFIX_FIELDS = ("FIRST_NAME", "LAST_NAME")
+# fields matched exactly (ignoring case), using an inverted index. The
+# EMAIL_DOMAIN field is the part of the email after the '@'.
+EXACT_FIELDS = ("EMAIL_DOMAIN", "COMPANY", "RELATIONSHIP")
+SEARCH_FIELDS = PREFIX_FIELDS + EXACT_FIELDS
+
+
+class PrefixTrie(object):
+    '''
+       Trie of lowercase values, where the node at the end of each value
+       holds the set of IDs with that value. Each node is a dictionary from
+       a character to the next node, and the IDS key holds a node's set.
+    '''
+
+    # key of the ID set in a node, which can never be a single character
+    IDS = None
+
+    def __init__(self):
+        '''
+            Initialize a new, empty PrefixTrie.
+        '''
+        self.__root = dict()
+
+    def add(self, value:str, id:str) -> None:
+        '''
+            Add an ID under value.
+        '''
+        node = self.__root
+        for character in value.lower():
+            child = node.get(character)
+            if child is None:
+                child = node[character] = dict()
+            node = child
+        ids = node.get(self.IDS)
+        if ids is None:
+            ids = node[self.IDS] = set()
+        ids.add(id)
+
+    def remove(self, value:str, id:str) -> None:
+        '''
+            Remove an ID from under value. Branches which no longer hold
+            any IDs are removed.
+        '''
+        value = value.lower()
+        path = [self.__root]
+        for character in value:
+            node = path[-1].get(character)
+            if node is None:
+                return
+            path.append(node)
+        ids = path[-1].get(self.IDS)
+        if ids is None:
+            return
+        ids.discard(id)
+        if ids:
+            return
+        del path[-1][self.IDS]
+        # walk back up, removing the nodes which are now empty
+        for depth in range(len(value), 0, -1):
+            if path[depth]:
+                break
+            del path[depth - 1][value[depth - 1]]
+
+    def find(self, prefix:str) -> list:
+        '''
+            Return a list of the ID sets of every value which starts with
+            prefix. The sets are not combined, so the caller can choose the
+            cheapest way to use them.
+        '''
+        node = self.__root
+        for character in prefix.lower():
+            node = node.get(character)
+            if node is None:
+                return []
+        sets = []
+        nodes = [node]
+        while nodes:
+            node = nodes.pop()
+            for key, child in node.items():
+                if key is self.IDS:
+                    sets.append(child)
+                else:
+                    nodes.append(child)
+        return sets
+
+
+class ContactIndex(object):
+    '''
+       Search index over a collection of Contacts. First and last names are
+       kept in prefix tries and the email domain, company and relationship
+       are kept in inverted indexes from each lowercase value to the set of
+       IDs with that value. The index is updated one Contact at a time, so
+       it never has to be rebuilt after an add, edit or delete.
+    '''
+
+    def __init__(self, contacts=None):
+        '''
+            Initialize a new ContactIndex, optionally populated from an
+            iterable of Contact objects.
+        '''
+        self.__tries = {field: PrefixTrie() for field in PREFIX_FIELDS}
+        self.__inverted = {field: dict() for field in EXACT_FIELDS}
+        if contacts is not None:
+            for contact in contacts:
+                self.add(contact)
+
+    def __repr__(self) -> str:
+        '''
+            Return a short string representation of the index.
+        '''
+        return "ContactIndex({})".format(", ".join(SEARCH_FIELDS))
+
+    def add(self, contact:object) -> None:
+        '''
+            Add a Contact to the index.
+        '''
+        id = str(contact.id)
+        for field, trie in self.__tries.items():
+            trie.add(str(getattr(contact, field.lower())), id)
+        for field, index in self.__inverted.items():
+            value = field_value(contact, field)
+            ids = index.get(value)
+            if ids is None:
+                ids = index[value] = set()
+            ids.add(id)
+
+    def remove(self, contact:object) -> None:
+        '''
+            Remove a Contact from the index. The Contact must have the same
+            values as when it was added.
+        '''
+        id = str(contact.id)
+        for field, trie in self.__tries.items():
+            trie.remove(str(getattr(contact, field.lower())), id)
+        for field, index in self.__inverted.items():
+            value = field_value(contact, field)
+            ids = index.get(value)
+            if ids is not None:
+                ids.discard(id)
+                if not ids:
+                    del index[value]
+
+    def search(self, terms:dict) -> set:
+        '''
+            Return the set of IDs of the Contacts which match every one of
+            the terms, a dictionary from a field in SEARCH_FIELDS to the
+            value to match. Names match by prefix and the other fields
+            match exactly, all ignoring case. The term with the fewest
+            matches is found first and only its IDs are checked against
+            the other terms.
+        '''
+        candidates = []
+        for field, value in terms.items():
+            if field in self.__tries:
+                sets = self.__tries[field].find(value)
+            elif field in self.__inverted:
+                ids = self.__inverted[field].get(value.lower())
+                sets = [ids] if ids is not None else []
+            else:
+                raise KeyError(field)
+            if not sets:
+                return set()
+            candidates.append((sum([len(ids) for ids in sets]), sets))
+
+        if not candidates:
+            return set()
+        candidates.sort(key=lambda candidate: candidate[0])
+        result = set().union(*candidates[0][1])
+        for count, sets in candidates[1:]:
+            if len(sets) == 1:
+                result &= sets[0]
+            elif len(result) * len(sets) > count:
+                # combining the sets is cheaper than looking every ID up
+                # in each of them
+                result &= set().union(*sets)
+            else:
+                result = set([id for id in result
+                    if any([id in ids for ids in sets])])
+            if not result:
+                break
+        return result
+
+
+def field_value(contact:object, field:str) -> str:
+    '''
+        Return the lowercase value of an exact match field of a Contact.
+    '''
+    if field == "EMAIL_DOMAIN":
+        return str(contact.email).rpartition("@")[2].lower()
+    return str(getattr(contact, field.lower())).lower()
+
+def parse_query(query:str) -> dict:
+    '''
+        Parse a search query of FIELD=VALUE terms separated by spaces into
+        a dictionary of terms. Values containing spaces can be quoted, and
+        DOMAIN can be used for EMAIL_DOMAIN. Raises a ValueError if a term
+        is not valid.
+    '''
+    terms = dict()
+    for term in shlex.split(query):
+        field, separator, value = term.partition("=")
+        field = field.upper()
+        if field == "DOMAIN":
+            field = "EMAIL_DOMAIN"
+        if separator == "" or field not in SEARCH_FIELDS or value == "":
+            raise ValueError("Invalid search term: {}".format(term))
+        terms[field] = value
+    return terms
@@ -0,0 +1,350 @@
+import json
+import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import app_functions as af
+import contact_writer as cw
+from contact import FIELD_NAMES
+
+# default address of the server started by '--serve'
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8521
+# number of threads which handle requests. Each open connection uses a
+# thread while it is being read from, so this is also the largest number
+# of clients served at the same time.
+SERVER_WORKERS = 16
+# default and largest number of records returned by one 'LIST' request
+PAGE_SIZE = af.PAGE_SIZE
+MAX_PAGE_SIZE = 1000
+# seconds an idle connection is kept open, which also bounds how long the
+# server waits for open connections when it stops
+IDLE_TIMEOUT = 10
+
+
+class RWLock(object):
+    '''
+       Reader-writer lock. Any number of readers can hold the lock at the
+       same time, while a writer holds it alone. Waiting writers are served
+       before new readers, so a steady stream of reads never starves a
+       write.
+    '''
+
+    def __init__(self):
+        '''
+            Initialize a new, unlocked RWLock.
+        '''
+        self.__condition = threading.Condition()
+        self.__readers = 0
+        self.__writing = False
+        self.__waiting_writers = 0
+
+    @contextmanager
+    def read(self):
+        '''
+            Context manager which holds the lock as one of many readers.
+        '''
+        with self.__condition:
+            while self.__writing or self.__waiting_writers:
+                self.__condition.wait()
+            self.__readers += 1
+        try:
+            yield
+        finally:
+            with self.__condition:
+                self.__readers -= 1
+                if self.__readers == 0:
+                    self.__condition.notify_all()
+
+    @contextmanager
+    def write(self):
+        '''
+            Context manager which holds the lock as its only writer.
+        '''
+        with self.__condition:
+            self.__waiting_writers += 1
+            while self.__writing or self.__readers:
+                self.__condition.wait()
+            self.__waiting_writers -= 1
+            self.__writing = True
+        try:
+            yield
+        finally:
+            with self.__condition:
+                self.__writing = False
+                self.__condition.notify_all()
+
+
+class ContactServer(HTTPServer):
+    '''
+       HTTP server which gives many local clients access to one contact
+       list through a JSON API (see ContactRequestHandler). Requests are
+       handled by a bounded pool of threads. Reads share an RWLock and
+       writes hold it alone. A persistent store (SQLite) has a single
+       connection, so every request holds it alone.
+    '''
+
+    def __init__(self, contact_list, host:str=SERVER_HOST,
+        port:int=SERVER_PORT, workers:int=SERVER_WORKERS):
+        '''
+            Initialize a new ContactServer for contact_list, listening on
+            host and port.
+        '''
+        super().__init__((host, port), ContactRequestHandler)
+        self.contact_list = contact_list
+        self.lock = RWLock()
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        # a store is indexed on first use, which must not happen while
+        # more than one reader holds the lock
+        contact_list.build_index()
+
+    def read_lock(self):
+        '''
+            Return the context manager held by requests which only read the
+            contact list.
+        '''
+        if self.contact_list.persistent:
+            return self.lock.write()
+        return self.lock.read()
+
+    def process_request(self, request, client_address) -> None:
+        '''
+            Hand a new connection to the thread pool.
+        '''
+        self.executor.submit(self.__process_request, request,
+            client_address)
+
+    def server_close(self) -> None:
+        '''
+            Stop listening and wait for the requests being handled.
+        '''
+        super().server_close()
+        self.executor.shutdown(wait=True)
+
+    def __process_request(self, request, client_address) -> None:
+        '''
+            Handle every request on a connection, then close it.
+        '''
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+
+class ContactRequestHandler(BaseHTTPRequestHandler):
+    '''
+       Handles the JSON API of a ContactServer:
+
+           GET    /contacts?page=1&size=25&sort=LAST_NAME&desc=1  (LIST)
+           GET    /contacts/<id>                                  (SEARCH)
+           POST   /contacts          {"first_name": ..., ...}     (ADD)
+           PUT    /contacts/<id>     {"title": ..., ...}          (EDIT)
+           DELETE /contacts/<id>                                  (DELETE)
+           POST   /export            {"gzip": false}              (EXPORT)
+
+       Contacts are JSON objects with a lowercase key for each field. ADD,
+       EDIT and DELETE use the same validations as the interactive
+       commands, and fields missing from an EDIT keep their value.
+    '''
+
+    # keep connections open between requests, and send each response as
+    # soon as it is written instead of waiting for the client's ack
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    timeout = IDLE_TIMEOUT
+
+    def do_GET(self) -> None:
+        '''
+            Handle a LIST or SEARCH request.
+        '''
+        path, id, query = self.__parse_path()
+        if path != "contacts":
+            self.__send(404, {"error": "Not found: {}".format(self.path)})
+        elif id is not None:
+            with self.server.read_lock():
+                contact = self.server.contact_list.get(id)
+            if contact is None:
+                self.__send(404, {"error": "Invalid ID value: {}".format(id)})
+            else:
+                self.__send(200, to_json(contact))
+        else:
+            self.__list(query)
+
+    def do_POST(self) -> None:
+        '''
+            Handle an ADD or EXPORT request.
+        '''
+        path, id, query = self.__parse_path()
+        body = self.__read_body()
+        if body is None:
+            return
+        if path == "contacts" and id is None:
+            values = [str(body.get(field.lower(), ""))
+                for field in FIELD_NAMES[1:]]
+            with self.server.lock.write():
+                contact_list = self.server.contact_list
+                id = contact_list.allocate_id()
+                messages = af.apply_add(contact_list, values, id)
+                contact = contact_list.get(id) if not messages else None
+            if messages:
+                self.__send(400, {"errors": messages})
+            else:
+                self.__send(201, to_json(contact))
+        elif path == "export" and id is None:
+            # an export only reads the list, so reads carry on during it
+            with self.server.read_lock():
+                filename = cw.export_file(self.server.contact_list,
+                    compress=bool(body.get("gzip", False)))
+            self.__send(201, {"file": filename})
+        else:
+            self.__send(404, {"error": "Not found: {}".format(self.path)})
+
+    def do_PUT(self) -> None:
+        '''
+            Handle an EDIT request.
+        '''
+        path, id, query = self.__parse_path()
+        if path != "contacts" or id is None:
+            self.__send(404, {"error": "Not found: {}".format(self.path)})
+            return
+        body = self.__read_body()
+        if body is None:
+            return
+        values = [str(body.get(field.lower(), ""))
+            for field in FIELD_NAMES[1:]]
+        with self.server.lock.write():
+            contact_list = self.server.contact_list
+            found = id in contact_list
+            messages = af.apply_edit(contact_list, id, values) if found else []
+            contact = contact_list.get(id)
+        if not found:
+            self.__send(404, {"error": "Invalid ID value: {}".format(id)})
+        elif messages:
+            self.__send(400, {"errors": messages})
+        else:
+            self.__send(200, to_json(contact))
+
+    def do_DELETE(self) -> None:
+        '''
+            Handle a DELETE request.
+        '''
+        path, id, query = self.__parse_path()
+        if path != "contacts" or id is None:
+            self.__send(404, {"error": "Not found: {}".format(self.path)})
+            return
+        with self.server.lock.write():
+            messages = af.apply_delete(self.server.contact_list, id)
+        if messages:
+            self.__send(404, {"error": messages[0]})
+        else:
+            self.__send(200, {"deleted": id})
+
+    def log_message(self, format:str, *args) -> None:
+        '''
+            Requests are not logged, to keep the terminal quiet under load.
+        '''
+        pass
+
+    def __list(self, query:dict) -> None:
+        '''
+            Send one page of the contact list, optionally sorted by a field.
+        '''
+        try:
+            number = int(query.get("page", ["1"])[0])
+            size = min(int(query.get("size", [PAGE_SIZE])[0]), MAX_PAGE_SIZE)
+        except ValueError:
+            self.__send(400, {"error": "page and size must be numbers"})
+            return
+        field = query.get("sort", [None])[0]
+        if field is not None:
+            field = field.upper()
+        if number < 1 or size < 1 or (field is not None
+            and field not in FIELD_NAMES):
+            self.__send(400, {"error": "Invalid page, size or sort field"})
+            return
+        descending = query.get("desc", ["0"])[0] not in ("0", "false", "")
+
+        with self.server.read_lock():
+            contact_list = self.server.contact_list
+            total = len(contact_list)
+            contacts = contact_list.page(number, size, field, descending)
+        self.__send(200, {"page": number, "pages": max(1, -(-total // size)),
+            "total": total, "contacts": [to_json(contact)
+            for contact in contacts]})
+
+    def __parse_path(self) -> tuple:
+        '''
+            Split the request path into its first part, an optional ID and
+            the dictionary of query parameters.
+        '''
+        url = urlsplit(self.path)
+        parts = [part for part in url.path.split("/") if part]
+        id = parts[1] if len(parts) == 2 else None
+        path = parts[0] if 1 <= len(parts) <= 2 else ""
+        return (path, id, parse_qs(url.query))
+
+    def __read_body(self) -> dict:
+        '''
+            Read the request's JSON object. Sends an error and returns None
+            if the body is not a JSON object.
+        '''
+        length = int(self.headers.get("Content-Length", 0))
+        data = self.rfile.read(length) if length > 0 else b"{}"
+        try:
+            body = json.loads(data)
+        except ValueError:
+            body = None
+        if not isinstance(body, dict):
+            self.__send(400, {"error": "The body must be a JSON object"})
+            return None
+        return body
+
+    def __send(self, status:int, body:dict) -> None:
+        '''
+            Send a JSON response.
+        '''
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def to_json(contact:object) -> dict:
+    '''
+        Return a Contact as a dictionary with a lowercase key for each
+        field.
+    '''
+    return {field.lower(): str(value)
+        for field, value in zip(FIELD_NAMES, contact.to_list())}
+
+def serve(contact_list, host:str=SERVER_HOST, port:int=SERVER_PORT,
+    workers:int=SERVER_WORKERS) -> None:
+    '''
+        Serve contact_list until the user presses Ctrl+C or the process is
+        terminated.
+    '''
+    server = ContactServer(contact_list, host, port, workers)
+    signal.signal(signal.SIGTERM, _stop)
+    print("LOG: Serving {} contacts on http://{}:{}/ with {} threads, press "
+        "Ctrl+C to stop.".format(len(contact_list), host,
+        server.server_address[1], workers))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("LOG: Waiting for open connections to close ...")
+    finally:
+        server.server_close()
+    print("LOG: Server stopped.")
+
+def _stop(signal_number:int, frame) -> None:
+    '''
+        Signal handler which stops the server like Ctrl+C does.
+    '''
+    raise KeyboardInterrupt
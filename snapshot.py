@@ -0,0 +1,178 @@
+import mmap
+import os
+import struct
+import tempfile
+from array import array
+
+from contact import Contact
+from contact_writer import set_file_mode
+
+# default snapshot file used by the SAVE and LOAD commands and at startup
+SNAPSHOT_FILE = "contacts.snapshot"
+
+MAGIC = b"CLSNAP01"
+VERSION = 1
+# header: magic, version, record count, string count, and the file offsets
+# of the string offset table, the record table and the string pool
+HEADER = struct.Struct("<8sIQQQQQ")
+# each record is 8 indexes into the string table, one per field
+RECORD = struct.Struct("<8I")
+# the string offset table holds string_count + 1 offsets into the pool
+STRING_OFFSET = struct.Struct("<Q")
+STRING_RANGE = struct.Struct("<2Q")
+
+
+class SnapshotError(Exception):
+    '''
+       Raised when a file is not a valid contact snapshot.
+    '''
+    pass
+
+
+def save_snapshot(contacts, filepath:str=SNAPSHOT_FILE) -> int:
+    '''
+        Write an iterable of Contacts to a binary snapshot file and return
+        the number of records written. Every distinct string is stored once
+        in a string pool and each record is 8 fixed size indexes into it,
+        so any record can be found and decoded without reading the others.
+        The snapshot is written to a temporary file which then replaces
+        filepath, so a failed save never damages an existing snapshot.
+    '''
+    string_index = dict()
+    pool = list()
+    pool_offsets = array('Q', [0])
+    records = array('I')
+
+    for contact in contacts:
+        for value in contact.to_list():
+            value = str(value)
+            index = string_index.get(value)
+            if index is None:
+                index = len(pool)
+                string_index[value] = index
+                encoded = value.encode("utf-8")
+                pool.append(encoded)
+                pool_offsets.append(pool_offsets[-1] + len(encoded))
+            records.append(index)
+
+    record_count = len(records) // 8
+    offsets_start = HEADER.size
+    records_start = offsets_start + STRING_OFFSET.size * len(pool_offsets)
+    pool_start = records_start + RECORD.size * record_count
+
+    directory = os.path.dirname(os.path.abspath(filepath))
+    file_handle, temp_path = tempfile.mkstemp(dir=directory,
+        prefix=".snapshot_", suffix=".tmp")
+    try:
+        set_file_mode(temp_path)
+        with os.fdopen(file_handle, 'wb') as file:
+            file.write(HEADER.pack(MAGIC, VERSION, record_count, len(pool),
+                offsets_start, records_start, pool_start))
+            # arrays are written in native byte order, so convert them to
+            # the little endian order of the format when needed
+            if struct.pack("=I", 1) != struct.pack("<I", 1):
+                pool_offsets.byteswap()
+                records.byteswap()
+            pool_offsets.tofile(file)
+            records.tofile(file)
+            file.write(b"".join(pool))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, filepath)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+    return record_count
+
+def is_snapshot(filepath:str) -> bool:
+    '''
+        Returns True if the file at filepath starts with the snapshot magic
+        bytes.
+    '''
+    try:
+        with open(filepath, 'rb') as file:
+            return file.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+def load_snapshot(filepath:str=SNAPSHOT_FILE) -> object:
+    '''
+        Open a snapshot file and return a SnapshotReader for it. No records
+        are decoded until they are accessed.
+    '''
+    return SnapshotReader(filepath)
+
+
+class SnapshotReader(object):
+    '''
+       Read-only sequence of the Contacts in a snapshot file. The file is
+       memory mapped and a record is only decoded when it is accessed, so
+       opening a snapshot takes the same time no matter how many records
+       it contains.
+    '''
+
+    def __init__(self, filepath:str):
+        '''
+            Initialize a new SnapshotReader by mapping the file at filepath
+            and checking its header.
+        '''
+        self.filepath = filepath
+        with open(filepath, 'rb') as file:
+            # an empty file cannot be mapped, so the size is checked first
+            if os.fstat(file.fileno()).st_size < HEADER.size:
+                raise SnapshotError("{} is not a snapshot file".format(
+                    filepath))
+            self.__map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self.__count, self.__string_count,
+            self.__offsets_start, self.__records_start,
+            self.__pool_start) = HEADER.unpack_from(self.__map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise SnapshotError("{} is not a snapshot file".format(filepath))
+
+    def __len__(self) -> int:
+        '''
+            Return the number of records in the snapshot.
+        '''
+        return self.__count
+
+    def __getitem__(self, index:int) -> Contact:
+        '''
+            Decode and return the record at index as a Contact.
+        '''
+        if index < 0:
+            index += self.__count
+        if index < 0 or index >= self.__count:
+            raise IndexError("snapshot index out of range")
+        indexes = RECORD.unpack_from(self.__map,
+            self.__records_start + RECORD.size * index)
+        return Contact([self.__string(i) for i in indexes])
+
+    def __iter__(self):
+        '''
+            Decode and return every record in order.
+        '''
+        for index in range(self.__count):
+            yield self[index]
+
+    def __repr__(self) -> str:
+        '''
+            Return a short string representation of the reader.
+        '''
+        return "SnapshotReader({}, {} records)".format(self.filepath,
+            self.__count)
+
+    def __string(self, index:int) -> str:
+        '''
+            Decode the string at index in the string pool.
+        '''
+        start, end = STRING_RANGE.unpack_from(self.__map,
+            self.__offsets_start + STRING_OFFSET.size * index)
+        return self.__map[self.__pool_start + start:
+            self.__pool_start + end].decode("utf-8")
+
+    def close(self) -> None:
+        '''
+            Unmap the snapshot file.
+        '''
+        self.__map.close()
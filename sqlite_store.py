@@ -0,0 +1,315 @@
+import sqlite3
+
+from contact import Contact
+from id_allocator import IDAllocator
+
+# default database file used by '--sqlite'
+DATABASE_FILE = "contacts.db"
+# columns of the contacts table, in FIELD_NAMES order
+COLUMNS = ("id", "first_name", "last_name", "phone_number", "email",
+    "company", "title", "relationship")
+# the dedup key is every column except ID
+KEY_COLUMNS = COLUMNS[1:]
+# number of rows fetched from a cursor at a time when iterating
+FETCH_SIZE = 1000
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS contacts (
+        id TEXT PRIMARY KEY,
+        first_name TEXT NOT NULL,
+        last_name TEXT NOT NULL,
+        phone_number TEXT NOT NULL,
+        email TEXT NOT NULL,
+        company TEXT NOT NULL,
+        title TEXT NOT NULL,
+        relationship TEXT NOT NULL,
+        -- lowercase part of the email after the '@', used by search
+        email_domain TEXT NOT NULL
+    );
+    CREATE UNIQUE INDEX IF NOT EXISTS contacts_dedup_key ON contacts (
+        first_name, last_name, phone_number, email, company, title,
+        relationship);
+    CREATE INDEX IF NOT EXISTS contacts_email ON contacts (lower(email));
+    CREATE INDEX IF NOT EXISTS contacts_name ON contacts (
+        lower(last_name), lower(first_name));
+    CREATE INDEX IF NOT EXISTS contacts_first_name ON contacts (
+        lower(first_name));
+    CREATE INDEX IF NOT EXISTS contacts_email_domain ON contacts (
+        email_domain);
+'''
+SELECT_COLUMNS = ", ".join(COLUMNS)
+INSERT_SQL = "INSERT INTO contacts ({}, email_domain) VALUES ({})".format(
+    SELECT_COLUMNS, ", ".join(["?"] * (len(COLUMNS) + 1)))
+# ORDER BY expression of each sort field. Numeric IDs sort by number, the
+# other fields ignore case. SQLite returns ties in no particular order, so
+# rowid keeps them in the order records were added, like the stable sort.
+ORDER_BY = {None: "rowid",
+    "ID": "(id = '' OR id GLOB '*[^0-9]*'), CAST(id AS INTEGER), id, rowid"}
+for column in COLUMNS[1:]:
+    ORDER_BY[column.upper()] = "lower({}), rowid".format(column)
+# SQL condition of each search field, see search_index.SEARCH_FIELDS. Names
+# match by prefix with a range on their lowercase index.
+SEARCH_CONDITIONS = {
+    "FIRST_NAME": "lower(first_name) >= ? AND lower(first_name) < ?",
+    "LAST_NAME": "lower(last_name) >= ? AND lower(last_name) < ?",
+    "EMAIL_DOMAIN": "email_domain = ?",
+    "COMPANY": "lower(company) = ?",
+    "RELATIONSHIP": "lower(relationship) = ?"}
+
+
+class SqliteContactStore(object):
+    '''
+       Container for Contact records kept in a SQLite database file, with
+       the same methods as ContactStore. The table has indexes on ID, email
+       and name, and a unique index on the dedup key (every field except
+       ID), so lookups, uniqueness checks and searches do not scan the
+       table. Iterating the store streams the records from a cursor in the
+       order they were added, so memory use stays flat at any table size.
+       Every change is committed as soon as it is made.
+    '''
+
+    # the records are kept in the database, so replacing them (IMPORT or
+    # LOAD) loads the new records into this store instead of a new one
+    persistent = True
+
+    def __init__(self, filepath:str=DATABASE_FILE, shared:bool=False):
+        '''
+            Initialize a new SqliteContactStore over the database file at
+            filepath, creating the table and indexes if needed. If shared is
+            True, the store can be used by more than one thread, as long as
+            only one thread uses it at a time.
+        '''
+        self.filepath = filepath
+        self.__connection = sqlite3.connect(filepath,
+            check_same_thread=not shared)
+        # write ahead logging makes each commit cheap enough to commit
+        # every change on its own
+        self.__connection.execute("PRAGMA journal_mode=WAL")
+        self.__connection.execute("PRAGMA synchronous=NORMAL")
+        self.__connection.executescript(SCHEMA)
+        # a database is persistent on its own, so it is never journaled
+        self.journal = None
+        self.version = 0
+        self.allocator = IDAllocator()
+        self.__observe_max_id()
+
+    def __len__(self) -> int:
+        '''
+            Return the number of Contact records in the store.
+        '''
+        return self.__connection.execute(
+            "SELECT COUNT(*) FROM contacts").fetchone()[0]
+
+    def __iter__(self):
+        '''
+            Stream the Contact records from a cursor in insertion order.
+        '''
+        return self.__select("SELECT {} FROM contacts ORDER BY rowid".format(
+            SELECT_COLUMNS))
+
+    def __contains__(self, id) -> bool:
+        '''
+            Returns True if a Contact with the provided ID is in the store.
+        '''
+        return self.get(id) is not None
+
+    def __repr__(self) -> str:
+        '''
+            Return a short string representation of the store.
+        '''
+        return "SqliteContactStore({}, {} contacts)".format(self.filepath,
+            len(self))
+
+    def get(self, id:str) -> object:
+        '''
+            Return the Contact with the provided ID, or None if not found.
+        '''
+        row = self.__connection.execute("SELECT {} FROM contacts WHERE "
+            "id = ?".format(SELECT_COLUMNS), (str(id),)).fetchone()
+        return Contact(list(row)) if row is not None else None
+
+    def is_unique(self, contact:object, ignore_id:str=None) -> bool:
+        '''
+            Returns True if no other Contact in the store has the same
+            values (excluding ID) as the contact parameter. The ignore_id
+            parameter allows a record being edited to not match itself.
+        '''
+        row = self.__connection.execute("SELECT id FROM contacts WHERE "
+            + " AND ".join(["{} = ?".format(column)
+            for column in KEY_COLUMNS]), _key_values(contact)).fetchone()
+        return row is None or row[0] == ignore_id
+
+    def add(self, contact:object) -> bool:
+        '''
+            Add a Contact to the end of the store. Returns False and does
+            not add the Contact if its ID or values are already present.
+        '''
+        try:
+            with self.__connection:
+                self.__connection.execute(INSERT_SQL, _row(contact))
+        except sqlite3.IntegrityError:
+            return False
+        self.allocator.observe(contact.id)
+        self.version += 1
+        return True
+
+    def replace(self, id:str, contact:object) -> bool:
+        '''
+            Replace the Contact with the provided ID with a new Contact,
+            keeping its position in the store. Returns False if the ID does
+            not exist or the new values duplicate another Contact.
+        '''
+        id = str(id)
+        contact.id = id
+        try:
+            with self.__connection:
+                cursor = self.__connection.execute("UPDATE contacts SET "
+                    + ", ".join(["{} = ?".format(column)
+                    for column in KEY_COLUMNS]) + ", email_domain = ? WHERE "
+                    "id = ?", _row(contact)[1:] + [id])
+        except sqlite3.IntegrityError:
+            return False
+        if cursor.rowcount == 0:
+            return False
+        self.version += 1
+        return True
+
+    def remove(self, id:str) -> object:
+        '''
+            Remove the Contact with the provided ID from the store and
+            return it, or return None if the ID does not exist.
+        '''
+        contact = self.get(id)
+        if contact is not None:
+            with self.__connection:
+                self.__connection.execute("DELETE FROM contacts WHERE id = ?",
+                    (str(id),))
+            self.version += 1
+        return contact
+
+    def allocate_id(self) -> str:
+        '''
+            Return a new ID value that is not used by any Contact which has
+            been added to the store.
+        '''
+        return self.allocator.allocate()
+
+    def clear(self) -> None:
+        '''
+            Remove all Contact records from the store.
+        '''
+        with self.__connection:
+            self.__connection.execute("DELETE FROM contacts")
+        self.version += 1
+
+    def ids(self) -> list:
+        '''
+            Return a list of every ID in the store, in insertion order.
+        '''
+        return [row[0] for row in self.__connection.execute(
+            "SELECT id FROM contacts ORDER BY rowid")]
+
+    def load(self, batches) -> None:
+        '''
+            Replace every record in the store with the Contacts in an
+            iterable of batches (lists) of Contacts. The records are
+            inserted with executemany in a single transaction, so if
+            anything fails the store keeps its old records. Contacts whose
+            ID or values are already loaded are skipped.
+        '''
+        with self.__connection:
+            self.__connection.execute("DELETE FROM contacts")
+            for batch in batches:
+                self.__connection.executemany(INSERT_SQL.replace("INSERT",
+                    "INSERT OR IGNORE", 1), [_row(contact)
+                    for contact in batch])
+        self.allocator = IDAllocator()
+        self.__observe_max_id()
+        self.version += 1
+
+    def build_index(self) -> None:
+        '''
+            The database indexes are kept up to date by SQLite, so there is
+            nothing to build.
+        '''
+        pass
+
+    def search(self, terms:dict) -> list:
+        '''
+            Return a list of the Contacts which match every one of the
+            search terms (see ContactIndex.search), in ID order, using the
+            table's indexes.
+        '''
+        conditions = []
+        parameters = []
+        for field, value in terms.items():
+            value = value.lower()
+            conditions.append(SEARCH_CONDITIONS[field])
+            if field in ("FIRST_NAME", "LAST_NAME"):
+                # every value starting with the prefix sorts between the
+                # prefix and the prefix followed by the largest character
+                parameters.extend([value, value + "\U0010ffff"])
+            else:
+                parameters.append(value)
+        return list(self.__select("SELECT {} FROM contacts WHERE {} ORDER BY "
+            "{}".format(SELECT_COLUMNS, " AND ".join(conditions),
+            ORDER_BY["ID"]), parameters))
+
+    def page(self, number:int, size:int, field:str=None,
+        descending:bool=False) -> list:
+        '''
+            Return the Contacts on page number (starting at 1) when the
+            store is sorted by field and split into pages of size records.
+            Only that page is read from the database.
+        '''
+        order = ORDER_BY[field]
+        if descending:
+            order = ", ".join([part + " DESC" for part in order.split(", ")])
+        return list(self.__select("SELECT {} FROM contacts ORDER BY {} "
+            "LIMIT ? OFFSET ?".format(SELECT_COLUMNS, order),
+            (size, (number - 1) * size)))
+
+    def close(self) -> None:
+        '''
+            Close the database connection.
+        '''
+        self.__connection.close()
+
+    def __select(self, sql:str, parameters=()):
+        '''
+            Run a query and yield a Contact for each row, fetching the rows
+            in blocks of FETCH_SIZE.
+        '''
+        cursor = self.__connection.execute(sql, parameters)
+        while True:
+            rows = cursor.fetchmany(FETCH_SIZE)
+            if not rows:
+                break
+            for row in rows:
+                yield Contact(list(row))
+
+    def __observe_max_id(self) -> None:
+        '''
+            Make sure the allocator never hands out an ID already in the
+            database.
+        '''
+        row = self.__connection.execute("SELECT MAX(CAST(id AS INTEGER)) "
+            "FROM contacts WHERE id != '' AND id NOT GLOB '*[^0-9]*'"
+            ).fetchone()
+        if row[0] is not None:
+            self.allocator.observe(row[0])
+
+
+def _key_values(contact:object) -> list:
+    '''
+        Return the dedup key values of a Contact as strings.
+    '''
+    return [str(value) for value in contact.to_list()[1:]]
+
+def _row(contact:object) -> list:
+    '''
+        Return the values inserted for a Contact: every field as a string,
+        followed by its lowercase email domain.
+    '''
+    values = [str(value) for value in contact.to_list()]
+    return values + [values[4].rpartition("@")[2].lower()]